@@ -0,0 +1,211 @@
+"""
+Account profiles for managing several Wallapop sellers from one process.
+
+Each profile is a directory under ~/.wallapop-auto-adjust/accounts/<name>
+holding that account's session, cookies, access token cache, HTTP cache and
+product config (products_config.json, or products.db for the SQLite store).
+Every account gets its own WallapopClient, and therefore its own session and
+rate-limit budget; run_accounts() processes accounts in parallel, at most
+``max_parallel`` at a time, and aggregates their results into one report.
+"""
+
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from wallapop_auto_adjust.config import create_config_manager
+from wallapop_auto_adjust.metrics import RequestMetrics, default_metrics
+from wallapop_auto_adjust.session_persistence import default_session_dir
+
+_VALID_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+_print_lock = threading.Lock()
+
+
+def accounts_dir() -> Path:
+    """Root of the account profiles: ~/.wallapop-auto-adjust/accounts."""
+    return default_session_dir() / "accounts"
+
+
+@dataclass(frozen=True)
+class AccountProfile:
+    name: str
+    session_dir: Path
+
+    @classmethod
+    def named(cls, name: str, root: Optional[Path] = None) -> "AccountProfile":
+        """Profile ``name`` under ``root`` (default accounts_dir()).
+
+        Raises ValueError for names that are not safe directory names.
+        """
+        if not _VALID_NAME.match(name or ""):
+            raise ValueError(f"invalid account name: {name!r}")
+        return cls(name=name, session_dir=Path(root or accounts_dir()) / name)
+
+    @property
+    def config_path(self) -> str:
+        """The account's config store; an existing products.db wins."""
+        sqlite_path = self.session_dir / "products.db"
+        if sqlite_path.exists():
+            return str(sqlite_path)
+        return str(self.session_dir / "products_config.json")
+
+
+def discover_profiles(root: Optional[Path] = None) -> List[AccountProfile]:
+    """All profiles that have a directory under ``root``, sorted by name."""
+    root = Path(root or accounts_dir())
+    if not root.is_dir():
+        return []
+    return [
+        AccountProfile.named(entry.name, root)
+        for entry in sorted(root.iterdir())
+        if entry.is_dir() and _VALID_NAME.match(entry.name)
+    ]
+
+
+# Prefix for lines printed on behalf of an account (see _PrefixedOutput)
+_output_prefix: ContextVar[Optional[str]] = ContextVar("output_prefix", default=None)
+
+
+class _PrefixedOutput:
+    """Stand-in for sys.stdout while accounts are processed in parallel.
+
+    Text printed in an account's context (its thread, and worker threads
+    started with that context) is written a whole line at a time with the
+    account prefix, so lines from concurrent accounts never mix.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._partial = threading.local()
+
+    def write(self, text: str) -> int:
+        prefix = _output_prefix.get()
+        if prefix is None:
+            return self.stream.write(text)
+        pending = getattr(self._partial, "text", "") + text
+        *lines, self._partial.text = pending.split("\n")
+        if lines:
+            with _print_lock:
+                for line in lines:
+                    self.stream.write(f"{prefix}{line}\n")
+        return len(text)
+
+    def end_line(self) -> None:
+        """Write out this thread's unterminated line, if any."""
+        if getattr(self._partial, "text", ""):
+            self.write("\n")
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def process_account(profile: AccountProfile, apply: bool = False) -> Dict[str, Any]:
+    """Unattended run (as ``--auto``) for one account.
+
+    Returns a dict with ``products``, ``planned`` and ``updated`` counts and
+    the account's own ``requests`` and ``retries``. Raises RuntimeError when
+    the account has no usable session.
+    """
+    from wallapop_auto_adjust.policy import PolicyEngine
+    from wallapop_auto_adjust.price_adjuster import PriceAdjuster
+    from wallapop_auto_adjust.wallapop_client import WallapopClient
+
+    config_manager = create_config_manager(profile.config_path, write_behind=True)
+    try:
+        policy = PolicyEngine.from_config(config_manager)
+        client = WallapopClient(session_dir=profile.session_dir)
+        spm = client.session_manager
+        # Count this account's requests apart from the others running in parallel
+        metrics = spm.metrics = RequestMetrics(parent=default_metrics)
+        if not spm.load_session():
+            raise RuntimeError("no saved session")
+        ok, token_or_err = spm.get_valid_token()
+        if not ok:
+            raise RuntimeError(f"session refresh failed: {token_or_err}")
+
+        products = client.get_user_products(include_raw=False)
+        config_manager.update_products(products)
+        if client.last_listing_complete:
+            config_manager.remove_sold_products(products)
+        config_manager.save_config()
+
+        price_adjuster = PriceAdjuster(client, config_manager)
+        changes = price_adjuster.plan_all(products, policy)
+        print(f"{len(products)} product(s), {len(changes)} change(s) planned")
+        updated = 0
+        if apply and changes:
+            updated = price_adjuster.apply_price_changes(changes)
+        counts = metrics.summary()
+        return {
+            "products": len(products),
+            "planned": len(changes),
+            "updated": updated,
+            "requests": counts["requests"],
+            "retries": counts["retries"],
+        }
+    finally:
+        config_manager.flush()
+
+
+def run_accounts(
+    profiles: Iterable[AccountProfile],
+    apply: bool = False,
+    max_parallel: Optional[int] = None,
+    process: Callable[..., Dict[str, Any]] = process_account,
+) -> Dict[str, Any]:
+    """Process ``profiles`` in parallel and aggregate the results.
+
+    Args:
+        profiles: Accounts to process
+        apply: Apply planned changes instead of only planning them
+        max_parallel: Accounts processed at the same time (defaults to
+            WALLAPOP_MAX_ACCOUNTS or 2)
+        process: Per-account job, called as ``process(profile, apply=apply)``
+
+    Returns:
+        {"accounts": {name: {"success": bool, ...}}, "totals": {...}}
+    """
+    profiles = list(profiles)
+    if max_parallel is None:
+        max_parallel = int(os.getenv("WALLAPOP_MAX_ACCOUNTS", "2"))
+    max_parallel = max(1, min(max_parallel, len(profiles) or 1))
+
+    output = _PrefixedOutput(sys.stdout)
+
+    def run_one(profile: AccountProfile) -> Dict[str, Any]:
+        token = _output_prefix.set(f"[{profile.name}] ")
+        try:
+            return {"success": True, **process(profile, apply=apply)}
+        except Exception as e:
+            print(f"failed: {e}")
+            return {"success": False, "error": str(e)}
+        finally:
+            output.end_line()
+            _output_prefix.reset(token)
+
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+            results = dict(
+                zip((p.name for p in profiles), executor.map(run_one, profiles))
+            )
+    finally:
+        sys.stdout = output.stream
+
+    totals = {
+        "accounts": len(results),
+        "succeeded": sum(1 for r in results.values() if r["success"]),
+        "failed": sum(1 for r in results.values() if not r["success"]),
+    }
+    for key in ("products", "planned", "updated", "requests", "retries"):
+        totals[key] = sum(r.get(key, 0) for r in results.values())
+    return {"accounts": results, "totals": totals}
@@ -0,0 +1,319 @@
+"""
+Asyncio Wallapop API client.
+
+Runs listing, detail fetching and price updates concurrently from a single event
+loop over one pooled HTTP connection. Authentication (cookie loading and access
+token refresh) is delegated to the same SessionPersistenceManager used by the
+synchronous WallapopClient, and cookie normalization, product normalization and
+payload building are shared with it.
+
+Requires the optional ``httpx`` package
+(``pip install "wallapop-auto-adjust[async]"``).
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from wallapop_auto_adjust.http_retry import IDEMPOTENT_METHODS, RetryPolicy
+from wallapop_auto_adjust.metrics import default_metrics
+from wallapop_auto_adjust.rate_limit import RateLimiter
+from wallapop_auto_adjust.session_persistence import (
+    SessionPersistenceManager,
+    shared_session_manager,
+)
+from wallapop_auto_adjust.wallapop_client import (
+    build_price_update_payload,
+    details_headers,
+    extract_items,
+    listing_headers,
+    next_page_params,
+    normalize_product,
+    update_headers,
+)
+
+
+class AsyncWallapopClient:
+    """Async counterpart of WallapopClient backed by a shared httpx.AsyncClient"""
+
+    def __init__(
+        self,
+        session_manager: Optional[SessionPersistenceManager] = None,
+        max_connections: int = 20,
+        timeout: float = 30.0,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
+        self.session_manager = session_manager or shared_session_manager()
+        # Share the session manager's policy so sync and async retry alike
+        self.retry_policy = (
+            retry_policy
+            or getattr(self.session_manager, "retry_policy", None)
+            or RetryPolicy.from_env()
+        )
+        # Same request budgets as the synchronous client for this account
+        self.rate_limiter = (
+            getattr(self.session_manager, "rate_limiter", None)
+            or RateLimiter.from_env()
+        )
+        self.metrics = getattr(self.session_manager, "metrics", None) or default_metrics
+        self.base_url = "https://api.wallapop.com"
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client = None
+        self._token_lock: Optional[asyncio.Lock] = None
+        self.last_listing_complete = False
+
+    async def __aenter__(self):
+        await self._get_client()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the pooled connection"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_client(self):
+        """Create the shared httpx.AsyncClient from the loaded requests session."""
+        if self._client is not None:
+            return self._client
+        try:
+            import httpx  # type: ignore
+        except Exception as e:
+            raise RuntimeError(
+                "AsyncWallapopClient requires the optional 'httpx' package"
+            ) from e
+
+        spm = self.session_manager
+        if not spm.session:
+            # Cookie normalization happens in load_session; reuse its result
+            await asyncio.to_thread(spm.load_session)
+        if not spm.session:
+            raise RuntimeError("No session available")
+
+        cookies = httpx.Cookies()
+        for c in spm.session.cookies:
+            cookies.set(c.name, c.value, domain=c.domain, path=c.path)
+        self._client = httpx.AsyncClient(
+            headers=dict(spm.session.headers),
+            cookies=cookies,
+            timeout=httpx.Timeout(
+                self.timeout, connect=self.retry_policy.connect_timeout
+            ),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+        return self._client
+
+    async def _get_token(self, stale_token: Optional[str] = None) -> str:
+        """Return a valid access token; concurrent callers share one refresh.
+
+        ``stale_token`` is a token the server rejected. It is replaced through
+        ``refresh_token_single_flight``, so callers that find it already
+        replaced (by another coroutine or a sync thread) reuse the new token.
+        """
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        spm = self.session_manager
+        async with self._token_lock:
+            if stale_token is not None:
+                ok, token_or_error = await asyncio.to_thread(
+                    spm.refresh_token_single_flight, stale_token
+                )
+            else:
+                ok, token_or_error = await asyncio.to_thread(spm.get_valid_token)
+        if not ok:
+            raise Exception(f"Failed to get valid token: {token_or_error}")
+        return token_or_error
+
+    async def _send(self, method: str, url: str, **kwargs):
+        """Send one request, retrying transient failures per the retry policy.
+
+        Every attempt waits for the rate limiter's read or write budget and is
+        recorded in ``self.metrics``.
+        """
+        import httpx  # type: ignore
+
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            wait = self.rate_limiter.reserve(method)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            started = time.perf_counter()
+            try:
+                response = await self._client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                self.metrics.record(
+                    method, url, "error", time.perf_counter() - started, attempt > 0
+                )
+                if (
+                    attempt >= policy.max_retries
+                    or method.upper() not in IDEMPOTENT_METHODS
+                ):
+                    raise
+                await asyncio.sleep(policy.backoff(attempt))
+                attempt += 1
+                continue
+            self.metrics.record(
+                method,
+                url,
+                response.status_code,
+                time.perf_counter() - started,
+                attempt > 0,
+            )
+            self.rate_limiter.observe(method, response)
+            if attempt < policy.max_retries and policy.should_retry_status(
+                method, response.status_code
+            ):
+                await asyncio.sleep(policy.delay(attempt, response))
+                attempt += 1
+                continue
+            response.retries = attempt
+            return response
+
+    async def make_authenticated_request(self, method: str, url: str, **kwargs):
+        """
+        Make an authenticated request with automatic token refresh
+
+        Args:
+            method: HTTP method (GET, POST, etc.)
+            url: Request URL
+            **kwargs: Additional arguments for httpx
+
+        Returns:
+            httpx.Response: The response object
+        """
+        await self._get_client()
+        token = await self._get_token()
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers["Authorization"] = f"Bearer {token}"
+        response = await self._send(method, url, headers=headers, **kwargs)
+
+        # If we get 401, try refreshing token once
+        if response.status_code == 401:
+            token = await self._get_token(stale_token=token)
+            headers["Authorization"] = f"Bearer {token}"
+            response = await self._send(method, url, headers=headers, **kwargs)
+        return response
+
+    async def get_user_products(self, max_pages: int = 1000) -> List[Dict[str, Any]]:
+        """Fetch all products for the authenticated user, following pagination.
+
+        As with the synchronous client, ``self.last_listing_complete`` tells
+        whether every page was fetched.
+        """
+        self.last_listing_complete = False
+        products: List[Dict[str, Any]] = []
+        try:
+            await self._get_client()
+            url = f"{self.base_url}/api/v3/user/items"
+            params: Optional[Dict[str, str]] = None
+            seen_cursors = set()
+            for _ in range(max_pages):
+                kwargs: Dict[str, Any] = {
+                    "headers": listing_headers(self._client.cookies)
+                }
+                if params:
+                    kwargs["params"] = params
+                response = await self.make_authenticated_request("GET", url, **kwargs)
+                if response.status_code != 200:
+                    print(f"Failed to fetch products: {response.status_code}")
+                    return products
+                raw = response.json()
+                items = extract_items(raw)
+                products.extend(normalize_product(p) for p in items)
+
+                params = next_page_params(response, raw)
+                cursor_key = tuple(sorted(params.items())) if params else None
+                if not items or not params or cursor_key in seen_cursors:
+                    self.last_listing_complete = True
+                    return products
+                seen_cursors.add(cursor_key)
+            print(f"Stopped fetching products after {max_pages} pages")
+        except Exception as e:
+            print(f"Error fetching user products: {e}")
+        return products
+
+    async def get_product_details(self, product_id: str) -> Dict[str, Any]:
+        """Get detailed product information for editing"""
+        try:
+            await self._get_client()
+            response = await self.make_authenticated_request(
+                "GET",
+                f"{self.base_url}/api/v3/items/{product_id}/edit",
+                params={"language": "es"},
+                headers=details_headers(self._client.cookies),
+            )
+            if response.status_code == 200:
+                return response.json()
+            print(f"Failed to get product details: {response.status_code}")
+            return {}
+        except Exception as e:
+            print(f"Error getting product details: {e}")
+            return {}
+
+    async def _update_one(self, product_id: str, new_price: float) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result: Dict[str, Any] = {
+            "success": False,
+            "price": new_price,
+            "status_code": None,
+            "error": None,
+        }
+        try:
+            details = await self.get_product_details(product_id)
+            if not details:
+                result["error"] = "Could not get current product details"
+                return result
+            response = await self.make_authenticated_request(
+                "PUT",
+                f"{self.base_url}/api/v3/items/{product_id}",
+                json=build_price_update_payload(details, new_price),
+                headers=update_headers(self._client.cookies),
+            )
+            result["status_code"] = response.status_code
+            if response.status_code in (200, 204):
+                result["success"] = True
+            else:
+                result["error"] = (
+                    f"HTTP {response.status_code} {response.text[:200]}".strip()
+                )
+        except Exception as e:
+            result["error"] = str(e)
+        finally:
+            result["elapsed"] = time.perf_counter() - started
+        return result
+
+    async def update_product_price(self, product_id: str, new_price: float) -> bool:
+        """Update product price"""
+        result = await self._update_one(product_id, new_price)
+        if not result["success"]:
+            print(f"Update failed: {result['error']}")
+        return result["success"]
+
+    async def update_prices_batch(
+        self, changes: Dict[str, float], concurrency: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Update many prices concurrently; same report shape as WallapopClient."""
+        if not changes:
+            return {}
+        await self._get_client()
+        # Obtain the token once before fanning out
+        await self._get_token()
+        semaphore = asyncio.Semaphore(concurrency or self.max_connections)
+
+        async def run(pid: str, price: float):
+            async with semaphore:
+                return pid, await self._update_one(pid, price)
+
+        results = await asyncio.gather(
+            *(run(pid, price) for pid, price in changes.items())
+        )
+        return dict(results)
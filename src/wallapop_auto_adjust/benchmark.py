@@ -0,0 +1,503 @@
+"""
+Benchmark harness with a local stand-in for the Wallapop API.
+
+MockWallapopServer runs in a child process and serves a synthetic catalogue on
+127.0.0.1 for the endpoints the tool uses:
+
+    GET  /api/auth/federated-session   access token
+    GET  /api/v3/user/items            listing pages (X-NextPage, ETag/304)
+    GET  /api/v3/items/{id}/edit       edit details
+    PUT  /api/v3/items/{id}            price update
+
+with configurable per-request latency, jitter, error rate (503s) and catalogue
+size. run_benchmark() drives the real WallapopClient, PriceAdjuster and config
+store against it (requests to the Wallapop hosts are routed to the local
+server) and returns throughput, per-phase timings, p50/p95 latency per
+endpoint, request counts and peak memory:
+
+    python -m wallapop_auto_adjust.benchmark --products 2000 --latency-ms 20
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Hosts whose requests are routed to the mock server during a benchmark
+WALLAPOP_HOSTS = ("api.wallapop.com", "es.wallapop.com", "feature-flag.wallapop.com")
+STATS_PATH = "/__bench__/stats"
+BENCH_COOKIES = {
+    "__Secure-next-auth.session-token": "bench-session",
+    "__Host-next-auth.csrf-token": "bench-csrf",
+    "device_id": "bench-device",
+}
+
+_ENDPOINTS = (
+    ("GET", re.compile(r"^/api/auth/federated-session$"), "federated-session"),
+    ("GET", re.compile(r"^/api/v3/user/items$"), "listing"),
+    ("GET", re.compile(r"^/api/v3/items/[^/]+/edit$"), "edit"),
+    ("PUT", re.compile(r"^/api/v3/items/[^/]+$"), "update"),
+)
+
+
+def endpoint_name(method: str, path: str) -> str:
+    """Short name of a benchmarked endpoint ("other" for anything else)."""
+    for endpoint_method, pattern, name in _ENDPOINTS:
+        if method == endpoint_method and pattern.match(path):
+            return name
+    return "other"
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (``q`` in 0-100) of ``values``."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+class _Catalogue:
+    """Server-side state: the synthetic items and per-endpoint counters."""
+
+    def __init__(
+        self,
+        products: int,
+        page_size: int,
+        latency_ms: float,
+        jitter_ms: float,
+        error_rate: float,
+        seed: int,
+    ):
+        self.page_size = page_size
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.version = 0
+        self.counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        now_ms = int(time.time() * 1000)
+        self.items = {}
+        for i in range(products):
+            item_id = f"bench{i:06d}"
+            self.items[item_id] = {
+                "id": item_id,
+                "title": f"Item {i}",
+                "price": {
+                    "amount": float(self.rng.randint(5, 500)),
+                    "currency": "EUR",
+                },
+                "modified_date": now_ms - 86400000 * self.rng.randint(1, 30),
+                "category_id": str(12000 + i % 20),
+            }
+        self.order = list(self.items)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self.lock:
+            return {name: dict(statuses) for name, statuses in self.counts.items()}
+
+    def _details(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **item,
+            "title": {"original": item["title"]},
+            "description": {"original": f"Benchmark item {item['id']}"},
+            "taxonomy": [{"id": "12000"}, {"id": item["category_id"]}],
+            "location": {"latitude": 40.4168, "longitude": -3.7038},
+            "shipping": {"user_allows_shipping": True, "max_weight_kg": 2},
+            "type_attributes": {"condition": {"value": "good"}},
+        }
+
+    def handle(
+        self, method: str, path: str, query: str, body: bytes, headers: Any
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        """Status, JSON body (None for no body) and headers for one request."""
+        endpoint = endpoint_name(method, path)
+        with self.lock:
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+            failed = endpoint != "other" and self.rng.random() < self.error_rate
+        time.sleep(delay)
+        status, payload, extra = (503, {"error": "injected"}, {})
+        if not failed:
+            status, payload, extra = self._dispatch(
+                endpoint, path, query, body, headers
+            )
+        with self.lock:
+            self.counts[endpoint][str(status)] += 1
+        return status, payload, extra
+
+    def _dispatch(self, endpoint, path, query, body, headers):
+        if endpoint == "federated-session":
+            return 200, {"token": f"bench-token-{time.monotonic_ns()}"}, {}
+        if endpoint == "listing":
+            since = int((parse_qs(query).get("since") or ["0"])[0])
+            with self.lock:
+                etag = f'"{self.version}-{since}"'
+                ids = self.order[since : since + self.page_size]
+                page = [dict(self.items[i]) for i in ids]
+            extra = {"ETag": etag}
+            if since + self.page_size < len(self.order):
+                extra["X-NextPage"] = f"since={since + self.page_size}"
+            if headers.get("If-None-Match") == etag:
+                return 304, None, extra
+            return 200, page, extra
+        if endpoint in ("edit", "update"):
+            item_id = path.split("/")[4]
+            with self.lock:
+                item = self.items.get(item_id)
+                if item is None:
+                    return 404, {"error": "not found"}, {}
+                if endpoint == "edit":
+                    return 200, self._details(item), {}
+                try:
+                    new_price = json.loads(body)["price"]["cash_amount"]
+                except (ValueError, KeyError, TypeError):
+                    return 400, {"error": "bad payload"}, {}
+                item["price"] = {"amount": float(new_price), "currency": "EUR"}
+                item["modified_date"] = int(time.time() * 1000)
+                self.version += 1
+            return 200, {"id": item_id}, {}
+        return 404, {"error": "not found"}, {}
+
+
+def _make_handler(catalogue: _Catalogue):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # One buffered write per response, so keep-alive requests are not
+        # held back by Nagle's algorithm and delayed ACKs
+        wbufsize = 64 * 1024
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _handle(self, method: str) -> None:
+            parts = urlsplit(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            if parts.path == STATS_PATH:
+                status, payload, headers = 200, catalogue.snapshot(), {}
+            else:
+                status, payload, headers = catalogue.handle(
+                    method, parts.path, parts.query, body, self.headers
+                )
+            data = b"" if payload is None else json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if payload is not None:
+                self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_PUT(self):
+            self._handle("PUT")
+
+        def do_POST(self):
+            self._handle("POST")
+
+    return Handler
+
+
+def _serve(options: Dict[str, Any], port_queue) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(_Catalogue(**options)))
+    server.daemon_threads = True
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+class MockWallapopServer:
+    def __init__(
+        self,
+        products: int = 500,
+        page_size: int = 40,
+        latency_ms: float = 20.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 1,
+    ):
+        """
+        Args:
+            products: Catalogue size
+            page_size: Items per listing page
+            latency_ms: Delay added to every request
+            jitter_ms: Extra random delay of up to this much per request
+            error_rate: Probability of answering an API request with a 503
+            seed: Seed for prices, jitter and injected errors
+        """
+        self.options = {
+            "products": products,
+            "page_size": page_size,
+            "latency_ms": latency_ms,
+            "jitter_ms": jitter_ms,
+            "error_rate": error_rate,
+            "seed": seed,
+        }
+        self.port: Optional[int] = None
+        self._process = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "MockWallapopServer":
+        port_queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(self.options, port_queue), daemon=True
+        )
+        self._process.start()
+        self.port = port_queue.get(timeout=30)
+        return self
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Requests served so far: {endpoint: {status: count}}."""
+        return requests.get(self.url + STATS_PATH, timeout=10).json()
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(5)
+            self._process = None
+
+    def __enter__(self) -> "MockWallapopServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class LoopbackAdapter(HTTPAdapter):
+    """Transport adapter that sends every request to a local server instead."""
+
+    def __init__(self, target_url: str, pool_size: int = 32):
+        super().__init__(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.target_netloc = urlsplit(target_url).netloc
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request = request.copy()
+        request.url = urlunsplit(
+            ("http", self.target_netloc, parts.path, parts.query, "")
+        )
+        return super().send(request, **kwargs)
+
+
+def _max_rss_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def run_benchmark(
+    products: int = 500,
+    page_size: int = 40,
+    latency_ms: float = 20.0,
+    jitter_ms: float = 0.0,
+    error_rate: float = 0.0,
+    store: str = "json",
+    max_workers: Optional[int] = None,
+    read_rate: float = 0.0,
+    write_rate: float = 0.0,
+    seed: int = 1,
+    trace_memory: bool = True,
+    verbose: bool = False,
+) -> Dict[str, Any]:
+    """Run one full pass (token, listing, plan, apply) against a mock server.
+
+    Every listed product is repriced by 5% through a pricing rule. ``store``
+    is "json" or "sqlite"; ``read_rate``/``write_rate`` configure the client's
+    rate limiter (0 disables it). Client output is suppressed unless
+    ``verbose``. Returns the report as a dict.
+    """
+    from wallapop_auto_adjust.config import create_config_manager
+    from wallapop_auto_adjust.policy import PolicyEngine, PriceRule
+    from wallapop_auto_adjust.price_adjuster import PriceAdjuster
+    from wallapop_auto_adjust.rate_limit import RateLimiter
+    from wallapop_auto_adjust.wallapop_client import WallapopClient
+
+    server_options = dict(
+        products=products,
+        page_size=page_size,
+        latency_ms=latency_ms,
+        jitter_ms=jitter_ms,
+        error_rate=error_rate,
+        seed=seed,
+    )
+    latencies: Dict[str, List[float]] = defaultdict(list)
+
+    def record(response, *args, **kwargs):
+        name = endpoint_name(response.request.method, urlsplit(response.url).path)
+        latencies[name].append(response.elapsed.total_seconds() * 1000)
+
+    phases: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def phase(name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            phases[name] = time.perf_counter() - started
+
+    output = (
+        contextlib.nullcontext()
+        if verbose
+        else contextlib.redirect_stdout(io.StringIO())
+    )
+    with (
+        MockWallapopServer(**server_options) as server,
+        tempfile.TemporaryDirectory(prefix="wallapop-bench-") as tmp,
+        output,
+    ):
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+
+        client = WallapopClient(session_dir=Path(tmp) / "session")
+        if max_workers:
+            client.max_workers = max_workers
+        spm = client.session_manager
+        spm.rate_limiter = RateLimiter(read_rate=read_rate, write_rate=write_rate)
+        # Only strategies that talk to the (mocked) hosts through the session
+        spm.REFRESH_STRATEGIES = ("federated_session", "federated_session_query")
+        spm.load_from_cookies_dict(BENCH_COOKIES)
+        adapter = LoopbackAdapter(server.url)
+        for host in WALLAPOP_HOSTS:
+            spm.session.mount(f"https://{host}", adapter)
+        spm.session.hooks["response"].append(record)
+
+        config_name = "products.db" if store == "sqlite" else "products_config.json"
+        config = create_config_manager(str(Path(tmp) / config_name), write_behind=True)
+        policy = PolicyEngine([PriceRule(name="benchmark", multiplier=0.95)])
+        adjuster = PriceAdjuster(client, config)
+
+        with phase("token"):
+            ok, token_or_err = spm.get_valid_token()
+        if not ok:
+            raise RuntimeError(f"benchmark token request failed: {token_or_err}")
+        with phase("listing"):
+            listed = client.get_user_products(include_raw=False)
+            config.update_products(listed)
+        with phase("plan"):
+            changes = adjuster.plan_all(listed, policy)
+        with phase("apply"):
+            updated = adjuster.apply_price_changes(changes)
+        with phase("flush"):
+            config.flush()
+
+        total = time.perf_counter() - started
+        heap_peak = None
+        if trace_memory:
+            heap_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        server_counts = server.stats()
+        if hasattr(config, "close"):
+            config.close()
+
+    return {
+        "config": {**server_options, "store": store, "max_workers": client.max_workers},
+        "products": len(listed),
+        "planned": len(changes),
+        "updated": updated,
+        "total_seconds": round(total, 4),
+        "phases": {name: round(seconds, 4) for name, seconds in phases.items()},
+        "throughput": {
+            "products_per_second": round(len(listed) / total, 2) if total else None,
+            "updates_per_second": (
+                round(updated / phases["apply"], 2) if phases["apply"] else None
+            ),
+        },
+        "latency_ms": {
+            name: {
+                "count": len(values),
+                "p50": round(percentile(values, 50), 2),
+                "p95": round(percentile(values, 95), 2),
+                "max": round(max(values), 2),
+            }
+            for name, values in sorted(latencies.items())
+        },
+        "requests": {
+            "total": sum(sum(s.values()) for s in server_counts.values()),
+            "by_endpoint": server_counts,
+        },
+        "memory": {
+            "python_heap_peak_kb": heap_peak // 1024 if heap_peak else None,
+            "max_rss_kb": _max_rss_kb(),
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m wallapop_auto_adjust.benchmark",
+        description="Benchmark a full price-adjustment pass against a local "
+        "mock Wallapop server and print a JSON report.",
+    )
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fraction of 503 answers"
+    )
+    parser.add_argument("--store", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--max-workers", type=int)
+    parser.add_argument("--read-rate", type=float, default=0.0)
+    parser.add_argument("--write-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--no-tracemalloc",
+        action="store_true",
+        help="skip Python heap tracking (it slows the run down)",
+    )
+    parser.add_argument("--output", metavar="FILE", help="write the report here")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(
+        products=args.products,
+        page_size=args.page_size,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        store=args.store,
+        max_workers=args.max_workers,
+        read_rate=args.read_rate,
+        write_rate=args.write_rate,
+        seed=args.seed,
+        trace_memory=not args.no_tracemalloc,
+    )
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
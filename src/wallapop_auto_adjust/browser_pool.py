@@ -0,0 +1,212 @@
+"""
+Long-lived headless browsers for the Selenium token fallback.
+
+Starting Chrome costs several seconds and a few hundred MB, so instead of a
+fresh ``uc.Chrome`` per fallback, WALLAPOP_BROWSER_POOL=1 keeps one browser per
+account alive between refreshes (each with its own user data directory).
+A browser is health-checked before every use and relaunched if it died;
+browsers idle for WALLAPOP_BROWSER_IDLE_SECONDS (default 300) are shut down,
+and at most WALLAPOP_BROWSER_POOL_SIZE (default 2) run at the same time.
+"""
+
+import atexit
+import contextlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Worker:
+    driver: Any = None
+    last_used: float = 0.0
+    launches: int = 0
+    uses: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def _quit(driver: Any) -> None:
+    with contextlib.suppress(Exception):
+        driver.quit()
+
+
+def is_healthy(driver: Any) -> bool:
+    """True when the browser still answers WebDriver commands."""
+    try:
+        return bool(driver.window_handles)
+    except Exception:
+        return False
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        idle_timeout: float = 300.0,
+        max_browsers: int = 2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            idle_timeout: Seconds a browser may sit unused before it is quit
+            max_browsers: Browsers kept at once; the least recently used idle
+                one is quit to make room
+            clock: Monotonic time source
+        """
+        self.idle_timeout = idle_timeout
+        self.max_browsers = max(1, max_browsers)
+        self.clock = clock
+        self._workers: Dict[str, _Worker] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> "BrowserPool":
+        return cls(
+            idle_timeout=float(os.getenv("WALLAPOP_BROWSER_IDLE_SECONDS", "300")),
+            max_browsers=int(os.getenv("WALLAPOP_BROWSER_POOL_SIZE", "2")),
+        )
+
+    def _worker(self, key: str) -> _Worker:
+        with self._lock:
+            worker = self._workers.get(key)
+            if worker is None:
+                self._make_room()
+                worker = self._workers[key] = _Worker(last_used=self.clock())
+            return worker
+
+    def _make_room(self) -> None:
+        """Quit idle browsers (LRU first) until a new one fits. Holds _lock."""
+        running = [(k, w) for k, w in self._workers.items() if w.driver is not None]
+        for key, worker in sorted(running, key=lambda kw: kw[1].last_used):
+            if len(running) < self.max_browsers:
+                break
+            if worker.lock.acquire(blocking=False):
+                try:
+                    _quit(worker.driver)
+                    worker.driver = None
+                finally:
+                    worker.lock.release()
+                running = [(k, w) for k, w in running if k != key]
+                logger.debug(f"Browser pool full; closed browser for {key}")
+
+    @contextlib.contextmanager
+    def lease(self, key: str, launch: Callable[[], Any]) -> Iterator[Any]:
+        """Exclusive use of the browser for ``key``, launching it if needed.
+
+        ``launch()`` starts a new browser; it is called on first use and when
+        the pooled browser fails its health check. The browser stays open
+        after the ``with`` block.
+        """
+        worker = self._worker(key)
+        with worker.lock:
+            if worker.driver is not None and not is_healthy(worker.driver):
+                logger.debug(f"Pooled browser for {key} is unresponsive; relaunching")
+                _quit(worker.driver)
+                worker.driver = None
+            if worker.driver is None:
+                worker.driver = launch()
+                worker.launches += 1
+            worker.uses += 1
+            try:
+                yield worker.driver
+            finally:
+                worker.last_used = self.clock()
+        self._ensure_reaper()
+
+    def discard(self, key: str) -> None:
+        """Quit the browser for ``key`` (e.g. before reusing its profile)."""
+        with self._lock:
+            worker = self._workers.pop(key, None)
+        if worker is not None:
+            with worker.lock:
+                if worker.driver is not None:
+                    _quit(worker.driver)
+                    worker.driver = None
+
+    def reap_idle(self, now: Optional[float] = None) -> int:
+        """Quit browsers idle for longer than ``idle_timeout``; returns count."""
+        now = self.clock() if now is None else now
+        closed = 0
+        with self._lock:
+            workers = list(self._workers.items())
+        for key, worker in workers:
+            if not worker.lock.acquire(blocking=False):
+                continue  # in use
+            try:
+                if (
+                    worker.driver is not None
+                    and now - worker.last_used >= self.idle_timeout
+                ):
+                    _quit(worker.driver)
+                    worker.driver = None
+                    closed += 1
+                    logger.debug(f"Closed idle browser for {key}")
+            finally:
+                worker.lock.release()
+        return closed
+
+    def _ensure_reaper(self) -> None:
+        with self._lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._stop.clear()
+            self._reaper = threading.Thread(
+                target=self._reap_loop, name="browser-pool-reaper", daemon=True
+            )
+            self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        interval = max(1.0, min(30.0, self.idle_timeout / 2))
+        while not self._stop.wait(interval):
+            self.reap_idle()
+            with self._lock:
+                if all(w.driver is None for w in self._workers.values()):
+                    # Nothing left to watch; the next lease restarts the reaper
+                    self._reaper = None
+                    return
+
+    def shutdown(self) -> None:
+        """Quit every pooled browser and stop the idle reaper."""
+        self._stop.set()
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers = {}
+        for worker in workers:
+            with worker.lock:
+                if worker.driver is not None:
+                    _quit(worker.driver)
+                    worker.driver = None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-key launch/use counts and whether a browser is running."""
+        with self._lock:
+            return {
+                key: {
+                    "running": worker.driver is not None,
+                    "launches": worker.launches,
+                    "uses": worker.uses,
+                }
+                for key, worker in self._workers.items()
+            }
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> Optional[BrowserPool]:
+    """The process-wide pool, or None unless WALLAPOP_BROWSER_POOL=1."""
+    global _pool
+    if os.getenv("WALLAPOP_BROWSER_POOL", "0") != "1":
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool.from_env()
+            atexit.register(_pool.shutdown)
+        return _pool
@@ -5,6 +5,8 @@ Wallapop Auto Price Adjuster CLI (packaged)
 """
 from __future__ import annotations
 
+import argparse
+import atexit
 import os
 import sys
 from dotenv import load_dotenv
@@ -12,32 +14,394 @@ from dotenv import load_dotenv
 # Load environment variables from .env if present
 load_dotenv()
 
-from wallapop_auto_adjust.config import ConfigManager
+from wallapop_auto_adjust.accounts import (
+    AccountProfile,
+    discover_profiles,
+    run_accounts,
+)
+from wallapop_auto_adjust.config import create_config_manager
+from wallapop_auto_adjust.journal import (
+    RunJournal,
+    journal_enabled,
+    journal_path,
+    resume_interrupted,
+)
+from wallapop_auto_adjust.metrics import (
+    default_metrics,
+    export_from_env,
+    serve_from_env,
+)
 from wallapop_auto_adjust.wallapop_client import WallapopClient
+from wallapop_auto_adjust.plan import apply_plan, build_plan, load_plan, write_plan
+from wallapop_auto_adjust.policy import PolicyEngine
 from wallapop_auto_adjust.price_adjuster import PriceAdjuster
-from wallapop_auto_adjust.session_persistence import SessionPersistenceManager
+from wallapop_auto_adjust.profiling import PhaseProfiler
+from wallapop_auto_adjust.session_persistence import (
+    default_session_dir,
+    shared_session_manager,
+)
 import importlib
 
 
-def main() -> None:
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="wallapop-auto-adjust",
+        description="Adjust the prices of your Wallapop listings.",
+    )
+    parser.add_argument(
+        "--auto",
+        action="store_true",
+        help="decide without prompts, from settings.rules and each product's "
+        "adjustment; only prints the planned changes unless --apply is given",
+    )
+    parser.add_argument(
+        "--apply",
+        action="store_true",
+        help="with --auto, apply the planned changes",
+    )
+    parser.add_argument(
+        "--account",
+        metavar="NAME",
+        help="use the account profile NAME (session and config under "
+        "~/.wallapop-auto-adjust/accounts/NAME)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print wall-clock and CPU time per phase "
+        "(login, fetch, decide, config sync, adjustments)",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        metavar="DIR",
+        help="also save the breakdown (phases.json) and a cProfile dump "
+        "per phase (<phase>.pstats, main thread only) to DIR",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="also record the peak traced memory of each phase",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    daemon = subparsers.add_parser(
+        "daemon",
+        help="keep running and reprice each product when its delay expires",
+    )
+    daemon.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="only print the changes that would be made",
+    )
+    daemon.add_argument(
+        "--listing-interval",
+        type=float,
+        default=60.0,
+        metavar="MINUTES",
+        help="how often to re-fetch the product list (default: 60)",
+    )
+    plan = subparsers.add_parser(
+        "plan",
+        help="decide every price change unattended and save them to a plan "
+        "file, without changing anything on Wallapop",
+    )
+    plan.add_argument(
+        "--output",
+        dest="plan_file",
+        metavar="FILE",
+        help="plan file to write (default: price_plan.json in the session "
+        "directory)",
+    )
+    apply = subparsers.add_parser(
+        "apply",
+        help="apply a plan file written by 'plan'; safe to re-run",
+    )
+    apply.add_argument(
+        "plan_file",
+        nargs="?",
+        metavar="FILE",
+        help="plan file to apply (default: price_plan.json in the session "
+        "directory)",
+    )
+    apply.add_argument(
+        "--max-workers",
+        type=int,
+        metavar="N",
+        help="price updates sent at the same time (default: WALLAPOP_MAX_WORKERS)",
+    )
+    accounts = subparsers.add_parser(
+        "accounts",
+        help="run unattended for several account profiles in parallel",
+    )
+    accounts.add_argument(
+        "names",
+        nargs="*",
+        metavar="NAME",
+        help="profiles to process (default: every profile)",
+    )
+    accounts.add_argument(
+        "--apply",
+        action="store_true",
+        dest="apply_changes",
+        help="apply the planned changes (default: only plan them)",
+    )
+    accounts.add_argument(
+        "--max-parallel",
+        type=int,
+        metavar="N",
+        help="accounts processed at the same time "
+        "(default: WALLAPOP_MAX_ACCOUNTS or 2)",
+    )
+    return parser
+
+
+def run_all_accounts(args: argparse.Namespace) -> None:
+    """Process several account profiles and print an aggregated report."""
+    try:
+        profiles = [AccountProfile.named(n) for n in args.names]
+    except ValueError as e:
+        print(f"Invalid account: {e}")
+        return
+    profiles = profiles or discover_profiles()
+    if not profiles:
+        print("No account profiles found. Log in with --account NAME first.")
+        return
+    mode = "apply" if args.apply_changes else "dry run"
+    print(f"Processing {len(profiles)} account(s) ({mode})...")
+    report = run_accounts(
+        profiles, apply=args.apply_changes, max_parallel=args.max_parallel
+    )
+    for name, result in report["accounts"].items():
+        if result["success"]:
+            print(
+                f"  {name}: {result['products']} products, "
+                f"{result['planned']} planned, {result['updated']} updated, "
+                f"{result['requests']} API requests"
+            )
+        else:
+            print(f"  {name}: FAILED ({result['error']})")
+    totals = report["totals"]
+    print(
+        f"\n✓ {totals['succeeded']}/{totals['accounts']} account(s) succeeded. "
+        f"Updated {totals['updated']} of {totals['planned']} planned change(s)."
+    )
+
+
+def _open_account(profile: AccountProfile | None):
+    """Config, pricing policy and a logged-in client for unattended commands.
+
+    Prints the problem and returns None when the pricing rules are invalid or
+    there is no usable saved session.
+    """
+    config_manager = create_config_manager(
+        profile.config_path if profile else None, write_behind=True
+    )
+    try:
+        policy = PolicyEngine.from_config(config_manager)
+    except ValueError as e:
+        print(f"Invalid pricing rules: {e}")
+        return None
+
+    wallapop_client = WallapopClient(
+        session_dir=profile.session_dir if profile else None
+    )
+    spm = wallapop_client.session_manager
+    ok, token_or_err = (
+        spm.get_valid_token() if spm.load_session() else (False, "no saved session")
+    )
+    if not ok:
+        print(f"No valid session ({token_or_err}).")
+        print("Run once without arguments to log in.")
+        return None
+    return config_manager, policy, wallapop_client
+
+
+def default_plan_path(profile: AccountProfile | None) -> str:
+    directory = profile.session_dir if profile else default_session_dir()
+    return str(directory / "price_plan.json")
+
+
+def run_plan(args: argparse.Namespace, profile: AccountProfile | None) -> None:
+    """Decide all changes in one pass and save them as a plan file."""
+    print("Wallapop Auto Price Adjuster (plan)")
+    print("=" * 30)
+    opened = _open_account(profile)
+    if opened is None:
+        return
+    config_manager, policy, wallapop_client = opened
+
+    print("\nFetching your products...")
+    products = wallapop_client.get_user_products(include_raw=False)
+    if not products:
+        print("No products found.")
+        return
+    config_manager.update_products(products)
+    if wallapop_client.last_listing_complete:
+        config_manager.remove_sold_products(products)
+    config_manager.save_config()
+
+    plan = build_plan(
+        wallapop_client,
+        PriceAdjuster(wallapop_client, config_manager),
+        products,
+        policy,
+        account=profile.name if profile else None,
+    )
+    path = args.plan_file or default_plan_path(profile)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    write_plan(path, plan)
+    config_manager.flush()
+    print(f"\n✓ Planned {len(plan['items'])} change(s) for {len(products)} products.")
+    print(f"Plan saved to: {path}")
+
+
+def run_apply(args: argparse.Namespace, profile: AccountProfile | None) -> None:
+    """Apply the pending entries of a plan file and record their outcome."""
+    print("Wallapop Auto Price Adjuster (apply)")
+    print("=" * 30)
+    path = args.plan_file or default_plan_path(profile)
+    try:
+        plan = load_plan(path)
+    except (OSError, ValueError) as e:
+        print(f"Cannot read plan: {e}")
+        return
+    account = profile.name if profile else None
+    if plan.get("account") != account:
+        print(
+            f"Plan was made for account {plan.get('account') or '(default)'}; "
+            f"use the same --account to apply it."
+        )
+        return
+    opened = _open_account(profile)
+    if opened is None:
+        return
+    config_manager, _, wallapop_client = opened
+
+    price_adjuster = PriceAdjuster(wallapop_client, config_manager)
+    try:
+        counts = apply_plan(
+            wallapop_client, price_adjuster, plan, max_workers=args.max_workers
+        )
+    finally:
+        # Outcomes are saved even when interrupted, so a re-run skips them
+        write_plan(path, plan)
+        config_manager.flush()
+    summary = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+    print(f"\n✓ Plan applied: {summary or 'nothing to do'}.")
+
+
+def run_daemon(args: argparse.Namespace, profile: AccountProfile | None) -> None:
+    """Long-running mode: warm session, in-memory state, wake when items are due."""
+    import signal
+
+    from wallapop_auto_adjust.daemon import PriceDaemon
+
+    print("Wallapop Auto Price Adjuster (daemon)")
+    print("=" * 30)
+    opened = _open_account(profile)
+    if opened is None:
+        return
+    config_manager, policy, wallapop_client = opened
+    spm = wallapop_client.session_manager
+    # Keep the access token fresh between wake-ups
+    spm.start_background_refresh()
+
+    daemon = PriceDaemon(
+        wallapop_client,
+        config_manager,
+        PriceAdjuster(wallapop_client, config_manager),
+        policy,
+        apply=not args.dry_run,
+        listing_interval=args.listing_interval * 60,
+    )
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    print(f"Running with {len(policy.rules)} pricing rule(s). Ctrl+C stops.")
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        config_manager.flush()
+        spm.stop_background_refresh()
+    print("Daemon stopped.")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        profile = AccountProfile.named(args.account) if args.account else None
+    except ValueError as e:
+        parser.error(str(e))
+    # WALLAPOP_METRICS_PORT / _FILE / WALLAPOP_OPENMETRICS_FILE (see metrics)
+    serve_from_env()
+    atexit.register(export_from_env)
+    if args.command == "accounts":
+        return run_all_accounts(args)
+    if args.command == "daemon":
+        return run_daemon(args, profile)
+    if args.command == "plan":
+        return run_plan(args, profile)
+    if args.command == "apply":
+        return run_apply(args, profile)
+    if args.apply and not args.auto:
+        parser.error("--apply requires --auto")
+    profiler = PhaseProfiler(
+        enabled=bool(args.profile or args.profile_dir or args.profile_memory),
+        output_dir=args.profile_dir,
+        trace_memory=args.profile_memory,
+    )
+    try:
+        run_once(args, profile, profiler)
+    finally:
+        profiler.finish()
+
+
+def run_once(
+    args: argparse.Namespace,
+    profile: AccountProfile | None,
+    profiler: PhaseProfiler,
+) -> None:
+    """One interactive or unattended pass over the account's products."""
+    session_dir = profile.session_dir if profile else None
     print("Wallapop Auto Price Adjuster")
     print("=" * 30)
+    if profile:
+        print(f"Account: {profile.name}")
 
-    # Initialize components
-    config_manager = ConfigManager()
-    spm = SessionPersistenceManager()
+    # Initialize components; config writes are batched and flushed at exit.
+    # WALLAPOP_CONFIG_PATH=products.db selects the SQLite store.
+    config_manager = create_config_manager(
+        profile.config_path if profile else None, write_behind=True
+    )
+    policy = None
+    if args.auto:
+        try:
+            policy = PolicyEngine.from_config(config_manager)
+        except ValueError as e:
+            print(f"Invalid pricing rules: {e}")
+            return
+        print(f"Unattended mode: {len(policy.rules)} pricing rule(s) loaded.")
+    # The same manager (session, pool and token) is reused by the cookie guide
+    # and every WallapopClient below, so the run authenticates once
+    spm = shared_session_manager(session_dir)
     print("\n1. Logging into Wallapop (session-first)...")
+    profiler.begin("login")
 
-    # 1) Try session-based auth first (from ~/.wallapop-auto-adjust)
+    # 1) Try session-based auth first (from ~/.wallapop-auto-adjust or the profile)
     session_ok = spm.load_session()
     if session_ok:
-        ok, token_or_err = spm.refresh_access_token()
+        # Reuses the access token saved by a previous run while it is still valid
+        ok, token_or_err = spm.get_valid_token()
         session_ok = ok
         if not ok:
             print(f"   ⚠️ Session refresh failed: {token_or_err}")
     else:
         print("   ℹ️ No existing session found.")
 
+    if not session_ok and args.auto:
+        print("No valid session. Run once without --auto to log in.")
+        return
+
     # 2) If no session, offer Automatic (selenium) or Manual cookie copy
     if not session_ok:
         print("\nNo valid session. Choose a login method:")
@@ -51,7 +415,7 @@ def main() -> None:
             # Automatic login via modern client
             try:
                 # Use WallapopClient's built-in automatic login
-                auto_client = WallapopClient()
+                auto_client = WallapopClient(session_dir=session_dir)
                 email = os.getenv("WALLAPOP_EMAIL") or input("Email: ")
                 password = os.getenv("WALLAPOP_PASSWORD") or input("Password: ")
                 if not auto_client.login(email, password):
@@ -69,7 +433,7 @@ def main() -> None:
                     CookieExtractionGuide,
                 )
 
-                guide = CookieExtractionGuide()
+                guide = CookieExtractionGuide(base_dir=session_dir)
                 if not guide.run():
                     print("Manual cookie extraction did not complete. Exiting.")
                     return
@@ -78,47 +442,91 @@ def main() -> None:
                 return
 
     # With a valid/renewable session, use the modern client (it will load the session)
-    wallapop_client = WallapopClient()
+    wallapop_client = WallapopClient(session_dir=session_dir)
     price_adjuster = PriceAdjuster(wallapop_client, config_manager)
+    if os.getenv("WALLAPOP_BACKGROUND_REFRESH"):
+        # Renew the access token ahead of expiry instead of inline during updates
+        wallapop_client.session_manager.start_background_refresh()
+
+    journal = None
+    if not (args.auto and not args.apply) and journal_enabled():
+        path = journal_path(session_dir or default_session_dir())
+        resumed = resume_interrupted(path, price_adjuster)
+        if resumed is not None:
+            wallapop_client.session_manager.stop_background_refresh()
+            print(f"\n✓ Interrupted run completed. Updated {resumed} products.")
+            print("Run again for a full pass over your products.")
+            return
+        # Checkpoint every decided change and update outcome (see journal)
+        journal = RunJournal.begin(path)
+        price_adjuster.journal = journal
 
-    # Get user products
-    print("\n2. Fetching your products...")
-    products = wallapop_client.get_user_products()
+    # Fetch the whole listing before any prompt, so a slow answer cannot let
+    # the pagination cursor or the access token expire mid-listing
+    print("\n2. Fetching your products and processing price adjustments...")
+    profiler.begin("fetch_products")
+    products = wallapop_client.get_user_products(include_raw=False)
 
     if not products:
         print("No products found. This could be due to:")
         print("  - No products listed on your account")
         print("  - Expired session (try re-running the application)")
         print("  - API authentication issues")
+        if journal is not None:
+            journal.finish()
         return
 
-    # Update config with discovered products
-    print(f"\n3. Found {len(products)} products. Updating configuration...")
+    # Register the products before deciding so adjustments can be stored
     config_manager.update_products(products)
+    # Interactive runs include the time spent answering prompts here
+    profiler.begin("decide")
+    changes = []
+    for product in price_adjuster.due_products(products, policy):
+        change = price_adjuster.plan_product_price(product, policy)
+        if change:
+            changes.append(change)
+            if journal is not None:
+                journal.record_change(change)
 
-    # Remove sold products from config
-    sold_products = config_manager.remove_sold_products(products)
-    if sold_products:
-        print(f"\n📦 Removed {len(sold_products)} sold product(s) from configuration:")
-        for product_name in sold_products:
-            print(f"   - {product_name}")
+    print(f"\n3. Found {len(products)} products. Updating configuration...")
+    profiler.begin("config_sync")
+
+    # Remove sold products from config (only when the full listing was fetched)
+    if wallapop_client.last_listing_complete:
+        sold_products = config_manager.remove_sold_products(products)
+        if sold_products:
+            print(
+                f"\n📦 Removed {len(sold_products)} sold product(s) from configuration:"
+            )
+            for product_name in sold_products:
+                print(f"   - {product_name}")
+        else:
+            print("\n✅ No sold products to remove from configuration.")
     else:
-        print("\n✅ No sold products to remove from configuration.")
+        print("\n⚠️ Product listing was incomplete; not removing any products.")
 
     config_manager.save_config()
 
-    # Process price adjustments
-    print("\n4. Processing price adjustments...")
-    updated_count = 0
-
-    for product in products:
-        if price_adjuster.adjust_product_price(product):
-            updated_count += 1
+    # Apply all confirmed decisions in one batch
+    profiler.begin("adjustments")
+    if args.auto and not args.apply:
+        print(f"\n4. Planned {len(changes)} price adjustment(s) (dry run).")
+        print("   Re-run with --auto --apply to apply them.")
+        updated_count = 0
+    else:
+        print(f"\n4. Applying {len(changes)} price adjustment(s)...")
+        updated_count = price_adjuster.apply_price_changes(changes)
 
     # Save final config
-    config_manager.save_config()
+    config_manager.flush()
+    if journal is not None:
+        journal.finish()
+    wallapop_client.session_manager.stop_background_refresh()
+    profiler.end()
 
     print(f"\n✓ Process completed. Updated {updated_count} products.")
+    totals = default_metrics.summary()
+    print(f"API requests: {totals['requests']} ({totals['retries']} retries)")
     print(f"Configuration saved to: {config_manager.config_path}")
 
 
@@ -1,59 +1,162 @@
+import atexit
+import bisect
 import json
 import os
+import tempfile
+import time
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+
+from wallapop_auto_adjust.product import to_epoch_seconds
+
+DEFAULT_SETTINGS: Dict[str, Any] = {"delay_days": 1}
+
+SECONDS_PER_DAY = 86400
+
+# Config paths with these suffixes are stored in SQLite instead of JSON
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+def iso_last_modified(last_mod: Any) -> Any:
+    """Convert a millisecond/second timestamp to a local ISO string."""
+    if isinstance(last_mod, (int, float)):
+        return (
+            datetime.fromtimestamp(last_mod / 1000 if last_mod > 1e10 else last_mod)
+            .astimezone()
+            .isoformat()
+        )
+    return last_mod
+
+
+def write_json_atomic(path: str, data: Dict[str, Any]):
+    """Write JSON atomically: temp file in the same directory, fsync, then rename."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def create_config_manager(config_path: Optional[str] = None, **kwargs):
+    """Open the product state store for ``config_path``.
+
+    The path defaults to WALLAPOP_CONFIG_PATH or products_config.json. Paths
+    ending in .db/.sqlite/.sqlite3 use SQLiteConfigManager; anything else uses
+    the JSON ConfigManager. Keyword arguments are passed to the store.
+
+    When the SQLite database does not exist yet and a products_config.json sits
+    in the same directory, its products and settings are imported, so switching
+    stores keeps every adjustment and last_modified date.
+    """
+    config_path = (
+        config_path or os.getenv("WALLAPOP_CONFIG_PATH") or "products_config.json"
+    )
+    if config_path.lower().endswith(SQLITE_SUFFIXES):
+        from wallapop_auto_adjust.sqlite_config import SQLiteConfigManager
+
+        is_new = not os.path.exists(config_path)
+        store = SQLiteConfigManager(config_path, **kwargs)
+        json_path = os.path.join(
+            os.path.dirname(os.path.abspath(config_path)), "products_config.json"
+        )
+        if is_new and os.path.exists(json_path):
+            imported = store.import_json(json_path)
+            print(f"Imported {imported} product(s) from {json_path} into {config_path}")
+        return store
+    return ConfigManager(config_path, **kwargs)
 
 
 class ConfigManager:
-    def __init__(self, config_path: str = "products_config.json"):
+    def __init__(
+        self,
+        config_path: str = "products_config.json",
+        write_behind: bool = False,
+        flush_interval: float = 5.0,
+    ):
+        """
+        Args:
+            config_path: Path of the JSON config file
+            write_behind: When True, save_config() only marks the config dirty and
+                the file is rewritten by the first save_config() call at least
+                ``flush_interval`` seconds after the last write, by flush() or
+                close(), or at interpreter exit. There is no background timer:
+                pending changes are lost if the process is killed.
+            flush_interval: Minimum seconds between writes in write-behind mode
+        """
         self.config_path = config_path
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
         self.config = self._load_config()
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        # Due-date index: product id -> (raw last_modified, epoch seconds) and a
+        # list of (epoch seconds, product id) kept sorted; built on first use
+        self._due_products: Optional[Dict[str, Any]] = None
+        self._due_ts: Dict[str, Tuple[Any, float]] = {}
+        self._due_index: List[Tuple[float, str]] = []
+        if write_behind:
+            atexit.register(self.flush)
 
     def _load_config(self) -> Dict[str, Any]:
         if os.path.exists(self.config_path):
             with open(self.config_path, "r") as f:
                 return json.load(f)
-        return {"products": {}, "settings": {"delay_days": 1}}
+        return {"products": {}, "settings": dict(DEFAULT_SETTINGS)}
+
+    def _write_config(self):
+        write_json_atomic(self.config_path, self.config)
+        self._dirty = False
+        self._last_flush = time.monotonic()
 
     def save_config(self):
-        with open(self.config_path, "w") as f:
-            json.dump(self.config, f, indent=2)
+        if not self.write_behind:
+            self._write_config()
+            return
+        self._dirty = True
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self._write_config()
+
+    def flush(self):
+        """Write pending changes (write-behind mode) to disk."""
+        if self._dirty:
+            self._write_config()
+
+    def close(self):
+        """Write pending changes; the exit-time flush is no longer needed."""
+        self.flush()
+        atexit.unregister(self.flush)
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
 
     def update_products(self, products: List[Dict[str, Any]]):
         """Update config with new products, preserving existing settings"""
         for product in products:
             product_id = product["id"]
             if product_id not in self.config["products"]:
-                # Convert timestamp to ISO format if needed
-                last_mod = product.get("last_modified")
-                if isinstance(last_mod, (int, float)):
-                    last_mod = (
-                        datetime.fromtimestamp(
-                            last_mod / 1000 if last_mod > 1e10 else last_mod
-                        )
-                        .astimezone()
-                        .isoformat()
-                    )
-
                 self.config["products"][product_id] = {
                     "name": product["name"],
                     "adjustment": "keep",
-                    "last_modified": last_mod,
+                    "last_modified": iso_last_modified(product.get("last_modified")),
                 }
             else:
                 # Update name and last_modified in case they changed
                 self.config["products"][product_id]["name"] = product["name"]
                 if product.get("last_modified"):
-                    last_mod = product["last_modified"]
-                    if isinstance(last_mod, (int, float)):
-                        last_mod = (
-                            datetime.fromtimestamp(
-                                last_mod / 1000 if last_mod > 1e10 else last_mod
-                            )
-                            .astimezone()
-                            .isoformat()
-                        )
-                    self.config["products"][product_id]["last_modified"] = last_mod
+                    self.config["products"][product_id]["last_modified"] = (
+                        iso_last_modified(product["last_modified"])
+                    )
+            self._reindex_product(product_id)
 
     def remove_sold_products(self, current_products: List[Dict[str, Any]]) -> List[str]:
         """Remove products from config that are no longer in the current product list (i.e., sold)
@@ -81,18 +184,125 @@ class ConfigManager:
             )
             removed_products.append(f"{product_name} ({product_id})")
             del self.config["products"][product_id]
+            self._reindex_product(product_id)
 
         return removed_products
 
     def get_product_config(self, product_id: str) -> Dict[str, Any]:
         return self.config["products"].get(product_id, {})
 
+    def set_adjustment(self, product_id: str, adjustment: str):
+        if product_id in self.config["products"]:
+            self.config["products"][product_id]["adjustment"] = adjustment
+            self.save_config()
+
     def update_last_modified(self, product_id: str, date: str = None):
         if date is None:
             date = datetime.now().astimezone().isoformat()
         if product_id in self.config["products"]:
             self.config["products"][product_id]["last_modified"] = date
+            self._reindex_product(product_id)
             self.save_config()
 
     def get_delay_days(self) -> int:
         return self.config["settings"].get("delay_days", 1)
+
+    # Due-date index
+    @staticmethod
+    def _parse_timestamp(last_modified: Any) -> float:
+        """Epoch seconds of a last_modified value; never-modified sorts first."""
+        ts = to_epoch_seconds(last_modified)
+        return float("-inf") if ts is None else ts
+
+    def _ensure_due_index(self):
+        products = self.config["products"]
+        if self._due_products is products and len(self._due_ts) == len(products):
+            return
+        self._due_ts = {
+            pid: (
+                entry.get("last_modified"),
+                self._parse_timestamp(entry.get("last_modified")),
+            )
+            for pid, entry in products.items()
+        }
+        self._due_index = sorted((ts, pid) for pid, (_, ts) in self._due_ts.items())
+        self._due_products = products
+
+    def _sync_due_index(self):
+        """Reindex products whose last_modified was edited directly in self.config."""
+        self._ensure_due_index()
+        products = self.config["products"]
+        stale = [pid for pid in self._due_ts if pid not in products]
+        stale += [
+            pid
+            for pid, entry in products.items()
+            if pid not in self._due_ts
+            or self._due_ts[pid][0] != entry.get("last_modified")
+        ]
+        for product_id in stale:
+            self._reindex_product(product_id)
+
+    def _reindex_product(self, product_id: str):
+        """Refresh one product's position in the due-date index (if built)."""
+        products = self.config["products"]
+        if self._due_products is not products:
+            return
+        old = self._due_ts.pop(product_id, None)
+        if old is not None:
+            i = bisect.bisect_left(self._due_index, (old[1], product_id))
+            if i < len(self._due_index) and self._due_index[i] == (old[1], product_id):
+                del self._due_index[i]
+        entry = products.get(product_id)
+        if entry is not None:
+            raw = entry.get("last_modified")
+            ts = self._parse_timestamp(raw)
+            self._due_ts[product_id] = (raw, ts)
+            bisect.insort(self._due_index, (ts, product_id))
+
+    def last_modified_timestamp(self, product_id: str) -> float:
+        """Parsed last_modified of a product (-inf if never modified)."""
+        self._ensure_due_index()
+        entry = self.config["products"].get(product_id)
+        raw = entry.get("last_modified") if entry else None
+        cached = self._due_ts.get(product_id)
+        if cached is None or cached[0] != raw:
+            # Edited directly in self.config since indexing
+            self._reindex_product(product_id)
+            cached = self._due_ts.get(product_id)
+        return cached[1] if cached else float("-inf")
+
+    def is_due(
+        self,
+        product_id: str,
+        now: Optional[float] = None,
+        delay_days: Optional[int] = None,
+    ) -> bool:
+        """Whether at least ``delay_days`` (default: setting) passed since the last change."""
+        if delay_days is None:
+            delay_days = self.get_delay_days()
+        if delay_days == 0:
+            return True
+        now = time.time() if now is None else now
+        return now - self.last_modified_timestamp(product_id) >= (
+            delay_days * SECONDS_PER_DAY
+        )
+
+    def due_product_ids(
+        self, now: Optional[float] = None, delay_days: Optional[int] = None
+    ) -> List[str]:
+        """Ids of all products that are due, oldest change first (one bisect)."""
+        if delay_days is None:
+            delay_days = self.get_delay_days()
+        # Comparing raw values is cheap next to parsing; keeps the bisect in
+        # step with is_due when entries were edited without update_last_modified
+        self._sync_due_index()
+        if delay_days == 0:
+            return [pid for _, pid in self._due_index]
+        now = time.time() if now is None else now
+        cutoff = now - delay_days * SECONDS_PER_DAY
+        end = bisect.bisect_right(self._due_index, cutoff, key=lambda e: e[0])
+        return [pid for _, pid in self._due_index[:end]]
+
+    def get_rules(self) -> List[Dict[str, Any]]:
+        """Pricing rules for unattended runs (see policy.PolicyEngine)."""
+        return self.config["settings"].get("rules", [])
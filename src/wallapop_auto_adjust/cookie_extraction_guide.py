@@ -35,7 +35,7 @@ import json
 import os
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Dict, Optional
 
 
 class CookieExtractionGuide:
@@ -43,18 +43,27 @@ class CookieExtractionGuide:
 
     # Use the current callback URL as a constant; we pre-fill this in the template
 
-    def __init__(self):
+    def __init__(self, base_dir: Optional[Path] = None):
         self.required_cookies = REQUIRED_COOKIES
         self.optional_cookies = OPTIONAL_COOKIES
         # Resolve repo root for the editable template file
         repo_root = Path(__file__).resolve().parents[2]
         # Session home under user directory (same as SessionPersistenceManager)
-        base_dir = Path.home() / ".wallapop-auto-adjust"
+        self._profile_dir = base_dir
+        base_dir = Path(base_dir) if base_dir else Path.home() / ".wallapop-auto-adjust"
         base_dir.mkdir(parents=True, exist_ok=True)
+        self.base_dir = base_dir
         self.session_file = base_dir / "session_data.json"
         self.cookies_file = base_dir / "cookies.json"
         self.root_cookies_path = repo_root / "cookies.json"
 
+    def _session_manager(self, manager_cls):
+        # The account's shared manager: the session and token validated here are
+        # the ones the rest of the run uses
+        from .session_persistence import shared_session_manager
+
+        return shared_session_manager(self._profile_dir, factory=manager_cls)
+
     def show_welcome(self):
         print("=" * 60)
         print("🔑 WALLAPOP MANUAL COOKIE SETUP")
@@ -222,7 +231,7 @@ class CookieExtractionGuide:
                 return False
 
         try:
-            spm = SessionPersistenceManager()
+            spm = self._session_manager(SessionPersistenceManager)
             # Load from the provided cookies dict (no persistence yet)
             if not spm.load_from_cookies_dict(cookies):
                 print("❌ Failed to initialize session from provided cookies")
@@ -249,9 +258,13 @@ class CookieExtractionGuide:
         try:
             from .session_persistence import SessionPersistenceManager
 
-            spm = SessionPersistenceManager()
-            if spm.load_session():
-                ok, _ = spm.refresh_access_token()
+            spm = self._session_manager(SessionPersistenceManager)
+            if spm.current_token and not spm.needs_token_refresh():
+                print("🟢 Using existing saved session")
+                return True
+            # A session already loaded by the caller has had its refresh attempt
+            if spm.session is None and spm.load_session():
+                ok, _ = spm.get_valid_token()
                 if ok:
                     print("🟢 Using existing saved session")
                     return True
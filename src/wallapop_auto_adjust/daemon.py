@@ -0,0 +1,160 @@
+"""
+Long-running scheduler mode.
+
+Instead of a cold start per cron run, the daemon keeps one WallapopClient (warm
+session, access token and connection pool), the product list and the config in
+memory. Each product sits in a priority queue keyed by the time its delay
+window expires; the daemon sleeps until the earliest due time (or the next
+periodic listing refresh), then plans and applies only the products that are
+due, using the unattended pricing policy.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from wallapop_auto_adjust.config import SECONDS_PER_DAY
+
+
+class PriceDaemon:
+    def __init__(
+        self,
+        client,
+        config_manager,
+        price_adjuster,
+        policy,
+        apply: bool = True,
+        listing_interval: float = 3600.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            client: WallapopClient used for listing and updates
+            config_manager: ConfigManager (or SQLiteConfigManager)
+            price_adjuster: PriceAdjuster deciding and recording changes
+            policy: PolicyEngine with the pricing rules
+            apply: When False, due changes are only printed
+            listing_interval: Seconds between product listing refreshes
+            clock: Wall-clock time source (epoch seconds)
+        """
+        self.client = client
+        self.config = config_manager
+        self.adjuster = price_adjuster
+        self.policy = policy
+        self.apply = apply
+        self.listing_interval = listing_interval
+        self.clock = clock
+        self.products: Dict[str, Any] = {}
+        self.next_listing_at = 0.0
+        self._queue: List[Tuple[float, int, str]] = []
+        # Latest due time per product; queue entries that disagree are stale
+        self._scheduled: Dict[str, float] = {}
+        self._seq = itertools.count()
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _delay_seconds(self, product: Any) -> float:
+        rule = self.policy.rule_for(product) if self.policy is not None else None
+        delay_days = rule.delay_days if rule and rule.delay_days is not None else None
+        if delay_days is None:
+            delay_days = self.config.get_delay_days()
+        return delay_days * SECONDS_PER_DAY
+
+    def schedule(self, product_id: str, due: float) -> None:
+        self._scheduled[product_id] = due
+        heapq.heappush(self._queue, (due, next(self._seq), product_id))
+
+    def due_time(self, product: Any) -> float:
+        last = self.config.last_modified_timestamp(product["id"])
+        return last + self._delay_seconds(product)
+
+    def next_due_time(self) -> Optional[float]:
+        """Earliest pending due time (stale queue entries are discarded)."""
+        while self._queue:
+            due, _, pid = self._queue[0]
+            if self._scheduled.get(pid) == due:
+                return due
+            heapq.heappop(self._queue)
+        return None
+
+    def refresh_listing(self) -> bool:
+        """Fetch the product list, sync the config and rebuild the queue.
+
+        An incomplete listing is merged into the current state instead of
+        replacing it.
+        """
+        products = self.client.get_user_products(include_raw=False)
+        self.next_listing_at = self.clock() + self.listing_interval
+        if not products and not self.client.last_listing_complete:
+            print("Listing failed; keeping the current schedule.")
+            return False
+        self.config.update_products(products)
+        if self.client.last_listing_complete:
+            for removed in self.config.remove_sold_products(products):
+                print(f"Removed sold product: {removed}")
+        self.config.save_config()
+
+        if self.client.last_listing_complete:
+            self.products = {p["id"]: p for p in products}
+            self._queue = []
+            self._scheduled = {}
+        else:
+            # Products on the pages that failed stay scheduled as they were
+            print("Listing was incomplete; updating only the products received.")
+            self.products.update((p["id"], p) for p in products)
+        for product in products:
+            self.schedule(product["id"], self.due_time(product))
+        print(f"Tracking {len(self.products)} product(s).")
+        return True
+
+    def tick(self, now: Optional[float] = None) -> int:
+        """Plan and apply every product due at ``now``; returns changes made."""
+        now = self.clock() if now is None else now
+        due_products = []
+        while (next_due := self.next_due_time()) is not None and next_due <= now:
+            _, _, pid = heapq.heappop(self._queue)
+            del self._scheduled[pid]
+            if pid in self.products:
+                due_products.append(self.products[pid])
+        if not due_products:
+            return 0
+
+        changes = self.adjuster.plan_all(due_products, self.policy)
+        updated = 0
+        if changes and self.apply:
+            updated = self.adjuster.apply_price_changes(changes)
+            for change in changes:
+                product = self.products.get(change["id"])
+                if change.get("applied") and product is not None:
+                    # Keep the in-memory listing current without re-fetching it
+                    product.price_cents = round(change["new_price"] * 100)
+        self.config.save_config()
+
+        # Next window opens one delay from now (at least one listing interval,
+        # so a zero delay does not spin); failed updates are retried then too
+        for product in due_products:
+            wait = max(self._delay_seconds(product), self.listing_interval)
+            self.schedule(product["id"], max(self.due_time(product), now + wait))
+        return updated
+
+    def run(self, max_ticks: Optional[int] = None) -> None:
+        """Loop until stop() (or ``max_ticks`` wake-ups) sleeping between due times."""
+        ticks = 0
+        while not self._stop.is_set():
+            now = self.clock()
+            if now >= self.next_listing_at:
+                self.refresh_listing()
+            self.tick(now)
+            ticks += 1
+            if max_ticks is not None and ticks >= max_ticks:
+                break
+            wake_at = self.next_listing_at
+            next_due = self.next_due_time()
+            if next_due is not None:
+                wake_at = min(wake_at, next_due)
+            self._stop.wait(max(0.0, wake_at - self.clock()))
+        self.config.flush()
@@ -0,0 +1,77 @@
+"""
+Cache of item edit details used to build price-update payloads.
+
+A price update needs the item's edit details (title, description, category,
+location, shipping...) to rebuild the PUT body. Fetching them right before each
+PUT doubles the request count, so details are cached per item id together with
+the item's modified date: entries come only from the /edit endpoint (fetched
+in bulk ahead of time or on demand), and are dropped when the listing reports a
+newer modified date or after the item is updated. Listing items are never used
+as edit details: their shape differs from /edit and a PUT built from them can
+silently drop fields such as the condition or the shipping weight.
+"""
+
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from wallapop_auto_adjust.product import to_epoch_seconds
+
+
+def details_version(details: Dict[str, Any]) -> Optional[float]:
+    """Modified date of an item payload as epoch seconds (None if absent)."""
+    return to_epoch_seconds(
+        details.get("modified_date")
+        or details.get("modified_at")
+        or details.get("last_modified")
+    )
+
+
+class EditDetailsCache:
+    """Thread-safe in-memory map of item id -> (modified date, edit details)"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Optional[float], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, product_id: object) -> bool:
+        return product_id in self._entries
+
+    def get(
+        self, product_id: str, modified: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Cached details, or None when missing or older than ``modified``."""
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is None:
+                return None
+            version, details = entry
+            if modified is not None and version is not None and version != modified:
+                del self._entries[product_id]
+                return None
+            return details
+
+    def put(
+        self,
+        product_id: str,
+        details: Dict[str, Any],
+        modified: Optional[float] = None,
+    ) -> None:
+        if modified is None:
+            modified = details_version(details)
+        with self._lock:
+            self._entries[product_id] = (modified, details)
+
+    def observe(self, product_id: str, modified: Optional[float]) -> None:
+        """Drop the entry if the item has changed since it was cached."""
+        self.get(product_id, modified)
+
+    def invalidate(self, product_id: str) -> None:
+        with self._lock:
+            self._entries.pop(product_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,179 @@
+"""
+On-disk HTTP cache for conditional GET requests.
+
+Responses that carry an ETag or Last-Modified validator are stored under a
+cache directory (by default ~/.wallapop-auto-adjust/http_cache), keyed by URL,
+query parameters and the account identity. The next request for the same key
+sends If-None-Match / If-Modified-Since; when the server answers 304 the stored
+body is served instead, so an unchanged listing costs no payload bytes. The
+cache is capped in size and evicts least recently used entries.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+# Response headers worth replaying with a cached body
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "X-NextPage")
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class HttpCache:
+    def __init__(self, cache_dir: Path, max_bytes: int = 20 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: Directory holding the index and cached bodies
+            max_bytes: Total size of cached bodies before LRU eviction
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.index_file = self.cache_dir / "index.json"
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict[str, Any]] = None, identity: str = ""):
+        """Cache key for a GET of ``url`` with ``params`` by account ``identity``."""
+        canonical = json.dumps(
+            [url, sorted((params or {}).items()), identity or ""], default=str
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        if self._index is None:
+            try:
+                with open(self.index_file, "r") as f:
+                    self._index = json.load(f)
+            except Exception:
+                self._index = {}
+        return self._index
+
+    def _save_index(self) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.index_file, json.dumps(self._index).encode("utf-8"))
+
+    def _body_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.body"
+
+    def conditional_headers(self, key: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a cached entry."""
+        with self._lock:
+            entry = self._load_index().get(key)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, key: str, response: Any) -> bool:
+        """Store a 200 response that has a validator. Returns True if stored."""
+        headers = getattr(response, "headers", None) or {}
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return False
+        body = response.content
+        if len(body) > self.max_bytes:
+            return False
+        try:
+            with self._lock:
+                index = self._load_index()
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                _write_atomic(self._body_path(key), body)
+                index[key] = {
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "headers": {h: headers[h] for h in _KEPT_HEADERS if h in headers},
+                    "size": len(body),
+                    "last_used": time.time(),
+                }
+                self._evict()
+                self._save_index()
+            return True
+        except Exception as e:
+            logger.debug(f"HTTP cache store failed: {e}")
+            return False
+
+    def cached_response(self, key: str, not_modified: Any = None):
+        """Rebuild a 200 response from the cache (e.g. to answer a 304).
+
+        Returns None when the entry or its body is missing.
+        """
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if not entry:
+                return None
+            try:
+                body = self._body_path(key).read_bytes()
+            except OSError:
+                index.pop(key, None)
+                return None
+            entry["last_used"] = time.time()
+            try:
+                self._save_index()
+            except Exception:
+                pass
+
+        response = requests.Response()
+        response.status_code = 200
+        response._content = body
+        response.headers = CaseInsensitiveDict(entry.get("headers") or {})
+        # Validators and pagination from the 304 take precedence
+        for name, value in (getattr(not_modified, "headers", None) or {}).items():
+            if name in _KEPT_HEADERS or name.lower() in ("etag", "last-modified"):
+                response.headers[name] = value
+        response.url = getattr(not_modified, "url", None)
+        response.encoding = "utf-8"
+        response.from_cache = True
+        return response
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until under ``max_bytes``."""
+        index = self._index
+        total = sum(entry.get("size", 0) for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            total -= index[key].get("size", 0)
+            del index[key]
+            try:
+                self._body_path(key).unlink()
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._load_index()):
+                try:
+                    self._body_path(key).unlink()
+                except OSError:
+                    pass
+            self._index = {}
+            if self.index_file.exists():
+                self._save_index()
@@ -0,0 +1,136 @@
+"""
+Retry policy for HTTP calls to Wallapop.
+
+Transient failures (429, 5xx, connection errors and timeouts) are retried with
+full-jitter exponential backoff, honouring the server's Retry-After header when
+present. Every call gets a (connect, read) timeout so a hung connection cannot
+stall a run. The number of retries a call needed is recorded on the returned
+response as ``response.retries``.
+"""
+
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, FrozenSet, Optional, Tuple
+
+import requests
+
+# Methods that are safe to resend after a 5xx or a dropped connection
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass
+class RetryPolicy:
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    retry_statuses: FrozenSet[int] = field(
+        default_factory=lambda: frozenset({429, 500, 502, 503, 504})
+    )
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """Policy configured from WALLAPOP_MAX_RETRIES, WALLAPOP_BACKOFF_BASE,
+        WALLAPOP_CONNECT_TIMEOUT and WALLAPOP_READ_TIMEOUT."""
+        defaults = cls()
+        return cls(
+            max_retries=int(_env_float("WALLAPOP_MAX_RETRIES", defaults.max_retries)),
+            backoff_base=_env_float("WALLAPOP_BACKOFF_BASE", defaults.backoff_base),
+            connect_timeout=_env_float(
+                "WALLAPOP_CONNECT_TIMEOUT", defaults.connect_timeout
+            ),
+            read_timeout=_env_float("WALLAPOP_READ_TIMEOUT", defaults.read_timeout),
+        )
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number ``attempt`` (0-based)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def should_retry_status(self, method: str, status_code: int) -> bool:
+        if status_code not in self.retry_statuses:
+            return False
+        # A 429 was rejected before processing, so any method can be resent
+        return status_code == 429 or method.upper() in IDEMPOTENT_METHODS
+
+    def delay(self, attempt: int, response: Any = None) -> float:
+        retry_after = None
+        if response is not None:
+            headers = getattr(response, "headers", None) or {}
+            retry_after = parse_retry_after(headers.get("Retry-After"))
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return self.backoff(attempt)
+
+
+def request_with_retries(
+    send: Callable[..., Any],
+    method: str,
+    url: str,
+    policy: RetryPolicy,
+    sleep: Callable[[float], None] = time.sleep,
+    **kwargs,
+):
+    """Call ``send(method, url, **kwargs)`` retrying transient failures.
+
+    The policy timeout is applied unless the caller passed one. Returns the last
+    response with ``response.retries`` set; re-raises the last connection error
+    if every attempt failed to connect.
+    """
+    kwargs.setdefault("timeout", policy.timeout)
+    attempt = 0
+    while True:
+        try:
+            response = send(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= policy.max_retries or (
+                method.upper() not in IDEMPOTENT_METHODS
+            ):
+                raise
+            sleep(policy.backoff(attempt))
+            attempt += 1
+            continue
+        if attempt < policy.max_retries and policy.should_retry_status(
+            method, response.status_code
+        ):
+            sleep(policy.delay(attempt, response))
+            attempt += 1
+            continue
+        try:
+            response.retries = attempt
+        except AttributeError:
+            pass
+        return response
@@ -0,0 +1,230 @@
+"""
+Checkpoint journal that lets an interrupted run resume.
+
+While a run applies price changes it appends one JSON line per event to
+``run_journal.jsonl`` in the session directory: the start of the run, every
+planned change, and the outcome (done or failed) of every update. Writes are
+fsynced in batches (every SYNC_EVERY records or SYNC_INTERVAL seconds) and
+always at the end of the run, so journaling costs far less than the full
+config save that ``update_last_modified`` triggers.
+
+If the process is killed, the next run replays the journal: updates recorded
+as done are written back to the config, and only the changes without an
+outcome are applied. The listing is not fetched again. Unsynced outcomes can
+be lost in a crash, but re-sending those price updates is harmless because
+the update sets an absolute price. Set WALLAPOP_JOURNAL=0 to disable.
+"""
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILE = "run_journal.jsonl"
+SYNC_EVERY = 32
+SYNC_INTERVAL = 1.0
+# Interrupted runs older than this are started afresh instead of resumed
+RESUME_MAX_AGE = 24 * 3600
+
+# Fields of a planned change kept in the journal
+_CHANGE_FIELDS = (
+    "id",
+    "name",
+    "current_price",
+    "new_price",
+    "adjustment",
+    "rule",
+    "reason",
+)
+
+
+def journal_enabled() -> bool:
+    return os.getenv("WALLAPOP_JOURNAL", "1") != "0"
+
+
+def journal_path(session_dir: Path) -> Path:
+    return Path(session_dir) / JOURNAL_FILE
+
+
+@dataclass
+class JournalState:
+    """What a journal says about its run."""
+
+    started: float
+    finished: bool = False
+    changes: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    done: Dict[str, float] = field(default_factory=dict)
+    failed: Dict[str, Optional[str]] = field(default_factory=dict)
+
+    @property
+    def pending(self) -> Dict[str, Dict[str, Any]]:
+        """Planned changes without a recorded outcome."""
+        return {
+            pid: change
+            for pid, change in self.changes.items()
+            if pid not in self.done and pid not in self.failed
+        }
+
+
+def replay(path: Path) -> Optional[JournalState]:
+    """Read a journal; None when there is none. A torn last line is ignored."""
+    try:
+        f = open(path)
+    except FileNotFoundError:
+        return None
+    state = None
+    with f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.debug(f"Ignoring unreadable journal line in {path}")
+                continue
+            op = record.get("op")
+            if op == "start":
+                state = JournalState(started=record["ts"])
+            elif state is None:
+                continue
+            elif op == "change":
+                change = {name: record.get(name) for name in _CHANGE_FIELDS}
+                state.changes[record["id"]] = change
+            elif op == "done":
+                state.done[record["id"]] = record["ts"]
+                state.failed.pop(record["id"], None)
+            elif op == "failed":
+                state.failed[record["id"]] = record.get("error")
+            elif op == "end":
+                state.finished = True
+    return state
+
+
+class RunJournal:
+    def __init__(
+        self,
+        path: Path,
+        mode: str = "w",
+        sync_every: int = SYNC_EVERY,
+        sync_interval: float = SYNC_INTERVAL,
+    ):
+        """
+        Args:
+            path: Journal file
+            mode: "w" starts a new run, "a" continues the journal of an
+                interrupted one
+            sync_every: Records written between fsyncs
+            sync_interval: Seconds after which pending records are fsynced
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.sync_every = max(1, sync_every)
+        self.sync_interval = sync_interval
+        self._file = open(self.path, mode)
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @classmethod
+    def begin(cls, path: Path, **kwargs) -> "RunJournal":
+        """Start the journal of a new run, replacing the previous one."""
+        journal = cls(path, "w", **kwargs)
+        journal._append({"op": "start", "ts": time.time()}, sync=True)
+        return journal
+
+    @classmethod
+    def resume(cls, path: Path, **kwargs) -> "RunJournal":
+        """Continue appending to the journal of an interrupted run."""
+        journal = cls(path, "a", **kwargs)
+        journal._append({"op": "resume", "ts": time.time()}, sync=True)
+        return journal
+
+    def _append(self, record: Dict[str, Any], sync: bool = False) -> None:
+        if self._file is None:
+            return
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._unsynced += 1
+        if (
+            sync
+            or self._unsynced >= self.sync_every
+            or time.monotonic() - self._last_sync >= self.sync_interval
+        ):
+            self.sync()
+
+    def sync(self) -> None:
+        """Flush and fsync the records written so far."""
+        if self._file is None or not self._unsynced:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def record_change(self, change: Dict[str, Any]) -> None:
+        record = {name: change.get(name) for name in _CHANGE_FIELDS}
+        self._append({"op": "change", **record})
+
+    def record_result(
+        self, product_id: str, success: bool, error: Optional[str] = None
+    ) -> None:
+        if success:
+            self._append({"op": "done", "id": product_id, "ts": time.time()})
+        else:
+            self._append({"op": "failed", "id": product_id, "error": error})
+
+    def finish(self) -> None:
+        """Mark the run complete and close the journal."""
+        if self._file is None:
+            return
+        self._append({"op": "end", "ts": time.time()}, sync=True)
+        self.close()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+
+def resume_interrupted(path: Path, price_adjuster, now: Optional[float] = None):
+    """Finish the run recorded in ``path`` if it was interrupted recently.
+
+    Outcomes already in the journal are written back to the config, then the
+    pending changes are applied. Returns the number of products updated over
+    the whole run, or None when there is nothing left to apply.
+    """
+    state = replay(path)
+    now = time.time() if now is None else now
+    if state is None or state.finished or now - state.started > RESUME_MAX_AGE:
+        return None
+    for product_id, ts in state.done.items():
+        date = datetime.fromtimestamp(ts).astimezone().isoformat()
+        price_adjuster.config.update_last_modified(product_id, date)
+    pending = list(state.pending.values())
+    journal = RunJournal.resume(path)
+    if not pending:
+        price_adjuster.config.flush()
+        journal.finish()
+        return None
+
+    started = datetime.fromtimestamp(state.started).strftime("%Y-%m-%d %H:%M")
+    print(
+        f"\n↻ Resuming the interrupted run started {started}: "
+        f"{len(pending)} of {len(state.changes)} change(s) left."
+    )
+    price_adjuster.journal = journal
+    try:
+        updated = price_adjuster.apply_price_changes(pending)
+    except BaseException:
+        # Still unfinished: the next run resumes again
+        journal.close()
+        raise
+    finally:
+        price_adjuster.journal = None
+    # The run only counts as complete once the config holds its outcomes
+    price_adjuster.config.flush()
+    journal.finish()
+    return len(state.done) + updated
@@ -0,0 +1,260 @@
+"""
+Per-request metrics for the HTTP calls made by a run.
+
+Every request sent through SessionPersistenceManager._http (API calls and
+token refreshes) and the async client is recorded in a process-wide
+RequestMetrics: request counts by method, endpoint and status, retries, and a
+latency histogram per endpoint. Endpoints are labelled by host and path with
+item ids replaced by ``{id}``.
+
+The data is available as a JSON run summary (summary()) and in the OpenMetrics
+text format (to_openmetrics()). Set WALLAPOP_METRICS_FILE and/or
+WALLAPOP_OPENMETRICS_FILE to have the CLI write them at the end of a run, or
+WALLAPOP_METRICS_PORT to serve /metrics on 127.0.0.1 while it runs.
+"""
+
+import logging
+import os
+import re
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from wallapop_auto_adjust.config import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram bucket upper bounds in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+_VERSION_SEGMENT = re.compile(r"^v\d+$")
+
+
+def endpoint_label(url: str) -> str:
+    """``host/path`` of ``url`` with id-like path segments replaced by {id}."""
+    parts = urlsplit(url)
+    segments = [
+        "{id}" if re.search(r"\d", seg) and not _VERSION_SEGMENT.match(seg) else seg
+        for seg in parts.path.split("/")
+    ]
+    return f"{parts.netloc}{'/'.join(segments)}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items())
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, count) pairs including +Inf, as OpenMetrics expects."""
+        pairs, running = [], 0
+        for bound, hits in zip(LATENCY_BUCKETS, self.buckets):
+            running += hits
+            pairs.append((repr(bound), running))
+        pairs.append(("+Inf", self.count))
+        return pairs
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding quantile ``q`` (None if empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for le, seen in self.cumulative():
+            if seen >= rank:
+                return self.max if le == "+Inf" else min(float(le), self.max)
+        return self.max
+
+
+class RequestMetrics:
+    """Thread-safe request counters and latency histograms."""
+
+    def __init__(self, parent: Optional["RequestMetrics"] = None):
+        """
+        Args:
+            parent: Also record every request there (e.g. per-account metrics
+                feeding the process-wide default_metrics)
+        """
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self._retries: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._latency: Dict[Tuple[str, str], _Histogram] = defaultdict(_Histogram)
+
+    def record(
+        self, method: str, url: str, status: Any, seconds: float, retry: bool = False
+    ) -> None:
+        """Record one HTTP attempt.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            status: Status code, or "error" when no response was received
+            seconds: Time until the response (or the failure)
+            retry: Whether the attempt repeated a failed one
+        """
+        key = (method.upper(), endpoint_label(url))
+        with self._lock:
+            self._requests[key + (str(status),)] += 1
+            self._latency[key].observe(seconds)
+            if retry:
+                self._retries[key] += 1
+        if self.parent is not None:
+            self.parent.record(method, url, status, seconds, retry)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._requests.clear()
+            self._retries.clear()
+            self._latency.clear()
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-serialisable run summary, by "METHOD endpoint"."""
+        with self._lock:
+            endpoints: Dict[str, Dict[str, Any]] = {}
+            for (method, endpoint), hist in sorted(self._latency.items()):
+                statuses = {
+                    status: count
+                    for (m, e, status), count in sorted(self._requests.items())
+                    if (m, e) == (method, endpoint)
+                }
+                endpoints[f"{method} {endpoint}"] = {
+                    "requests": hist.count,
+                    "statuses": statuses,
+                    "retries": self._retries.get((method, endpoint), 0),
+                    "latency_seconds": {
+                        "mean": round(hist.total / hist.count, 6),
+                        "p50": hist.quantile(0.5),
+                        "p95": hist.quantile(0.95),
+                        "max": round(hist.max, 6),
+                    },
+                }
+            return {
+                "requests": sum(self._requests.values()),
+                "retries": sum(self._retries.values()),
+                "endpoints": endpoints,
+            }
+
+    def to_openmetrics(self) -> str:
+        """Metrics in the OpenMetrics text exposition format."""
+        lines = [
+            "# TYPE wallapop_http_requests counter",
+            "# HELP wallapop_http_requests HTTP requests sent, by response status.",
+        ]
+        with self._lock:
+            for (method, endpoint, status), count in sorted(self._requests.items()):
+                labels = _labels(method=method, endpoint=endpoint, status=status)
+                lines.append(f"wallapop_http_requests_total{{{labels}}} {count}")
+            lines += [
+                "# TYPE wallapop_http_retries counter",
+                "# HELP wallapop_http_retries Retries after transient failures.",
+            ]
+            for (method, endpoint), count in sorted(self._retries.items()):
+                labels = _labels(method=method, endpoint=endpoint)
+                lines.append(f"wallapop_http_retries_total{{{labels}}} {count}")
+            lines += [
+                "# TYPE wallapop_http_request_duration_seconds histogram",
+                "# UNIT wallapop_http_request_duration_seconds seconds",
+                "# HELP wallapop_http_request_duration_seconds HTTP request latency.",
+            ]
+            name = "wallapop_http_request_duration_seconds"
+            for (method, endpoint), hist in sorted(self._latency.items()):
+                labels = _labels(method=method, endpoint=endpoint)
+                for le, count in hist.cumulative():
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+                lines.append(f"{name}_count{{{labels}}} {hist.count}")
+                lines.append(f"{name}_sum{{{labels}}} {hist.total:.6f}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_summary(self, path: str) -> None:
+        write_json_atomic(path, self.summary())
+
+    def write_openmetrics(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_openmetrics())
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve /metrics (OpenMetrics) from a daemon thread; returns the server."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_openmetrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(
+            target=server.serve_forever, name="metrics-server", daemon=True
+        ).start()
+        return server
+
+
+# Shared by every session manager (and account) in the process
+default_metrics = RequestMetrics()
+
+
+def serve_from_env(metrics: RequestMetrics = default_metrics):
+    """Start the /metrics endpoint when WALLAPOP_METRICS_PORT is set."""
+    port = os.getenv("WALLAPOP_METRICS_PORT")
+    if not port:
+        return None
+    try:
+        server = metrics.serve(int(port))
+    except (OSError, ValueError) as e:
+        print(f"Could not serve metrics on port {port}: {e}")
+        return None
+    print(f"Serving metrics on http://127.0.0.1:{server.server_address[1]}/metrics")
+    return server
+
+
+def export_from_env(metrics: RequestMetrics = default_metrics) -> None:
+    """Write the JSON summary / OpenMetrics files named by the environment."""
+    for env, write in (
+        ("WALLAPOP_METRICS_FILE", metrics.write_summary),
+        ("WALLAPOP_OPENMETRICS_FILE", metrics.write_openmetrics),
+    ):
+        path = os.getenv(env)
+        if not path:
+            continue
+        try:
+            write(path)
+        except OSError as e:
+            logger.debug(f"Could not write {env}={path}: {e}")
+            print(f"Could not write metrics to {path}: {e}")
@@ -0,0 +1,181 @@
+"""
+Serialized price-change plans (``plan`` / ``apply`` commands).
+
+``plan`` evaluates every product against the pricing rules in one pass and
+writes the changes to a plan file without sending any write to Wallapop. Each
+entry records the item id, old and new price, the reason, and a hash of the
+edit payload inputs (title, description, category, location, shipping...).
+
+``apply`` executes a plan concurrently. Before each PUT the item's current edit
+details are checked: an item already at its new price is marked applied
+without a write, and an item whose price or payload inputs changed since
+planning is skipped as stale. Entry statuses are written back to the plan
+file, so running ``apply`` again only retries what did not succeed.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from wallapop_auto_adjust.config import write_json_atomic
+from wallapop_auto_adjust.wallapop_client import build_price_update_payload
+
+PLAN_VERSION = 1
+
+# Entry statuses; "pending" and "failed" entries are (re)tried by apply
+PENDING = "pending"
+APPLIED = "applied"
+ALREADY_APPLIED = "already_applied"
+STALE = "stale"
+FAILED = "failed"
+RETRY_STATUSES = (PENDING, FAILED)
+
+
+def payload_input_hash(details: Dict[str, Any]) -> str:
+    """Hash of everything in the price-update payload except the price."""
+    payload = build_price_update_payload(details, 0.0)
+    payload.pop("price", None)
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def details_price(details: Dict[str, Any]) -> Optional[float]:
+    """Current price from item edit details (None when not present)."""
+    price = details.get("price")
+    if isinstance(price, dict):
+        price = price.get("amount", price.get("cash_amount"))
+    try:
+        return None if price is None else round(float(price), 2)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_plan(
+    client,
+    price_adjuster,
+    products: List[Dict[str, Any]],
+    policy,
+    account: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Decide the changes for ``products`` and describe them as a plan.
+
+    Edit details of the planned items are fetched from /edit (read-only,
+    concurrently) for the payload hash.
+    """
+    changes = price_adjuster.plan_all(products, policy)
+    planned_ids = [change["id"] for change in changes]
+    # Hash the item as /edit returns it now, as apply will see it
+    for product_id in planned_ids:
+        client.details_cache.invalidate(product_id)
+    client.prefetch_product_details(planned_ids)
+    items = []
+    for change in changes:
+        details = client.details_cache.get(change["id"])
+        items.append(
+            {
+                "id": change["id"],
+                "name": change["name"],
+                "old_price": change["current_price"],
+                "new_price": change["new_price"],
+                "reason": change["reason"],
+                "adjustment": change.get("adjustment"),
+                "rule": change.get("rule"),
+                "input_hash": payload_input_hash(details) if details else None,
+                "status": PENDING,
+            }
+        )
+    return {
+        "version": PLAN_VERSION,
+        "created_at": datetime.now().astimezone().isoformat(),
+        "account": account,
+        "items": items,
+    }
+
+
+def write_plan(path: str, plan: Dict[str, Any]) -> None:
+    write_json_atomic(path, plan)
+
+
+def load_plan(path: str) -> Dict[str, Any]:
+    """Read a plan file; raises ValueError when it is not a usable plan."""
+    with open(path) as f:
+        plan = json.load(f)
+    if not isinstance(plan, dict) or plan.get("version") != PLAN_VERSION:
+        raise ValueError(f"{path} is not a version {PLAN_VERSION} plan file")
+    return plan
+
+
+def stale_reason(item: Dict[str, Any], details: Dict[str, Any]) -> Optional[str]:
+    """Why ``item`` must not be written given the item's current details."""
+    current = details_price(details)
+    if current is not None and current == round(item["new_price"], 2):
+        return ALREADY_APPLIED
+    if current is not None and current != round(item["old_price"], 2):
+        return f"{STALE}: price is now €{current:.2f}"
+    expected = item.get("input_hash")
+    if expected and payload_input_hash(details) != expected:
+        return f"{STALE}: listing edited since planning"
+    return None
+
+
+def apply_plan(
+    client,
+    price_adjuster,
+    plan: Dict[str, Any],
+    max_workers: Optional[int] = None,
+) -> Dict[str, int]:
+    """Apply the pending and failed entries of ``plan`` in place.
+
+    Every entry's ``status`` (and ``error`` for failures and stale items) is
+    updated. Returns the number of entries per status.
+    """
+    todo = {
+        item["id"]: item
+        for item in plan["items"]
+        if item.get("status", PENDING) in RETRY_STATUSES
+    }
+    # Apply compares against the item as it is now, not a cached copy
+    for product_id in todo:
+        client.details_cache.invalidate(product_id)
+
+    report = client.update_prices_batch(
+        {pid: item["new_price"] for pid, item in todo.items()},
+        max_workers=max_workers,
+        check=lambda pid, details: stale_reason(todo[pid], details),
+    )
+    for product_id, item in todo.items():
+        result = report.get(product_id) or {}
+        skipped = result.get("skipped")
+        item.pop("error", None)
+        print(f"\n→ {item['name']}")
+        if skipped == ALREADY_APPLIED:
+            item["status"] = ALREADY_APPLIED
+            price_adjuster.config.update_last_modified(product_id)
+            print(f"  Already at €{item['new_price']:.2f}")
+        elif skipped:
+            item["status"] = STALE
+            item["error"] = skipped
+            print(f"  Skipped - {skipped}")
+        else:
+            change = {
+                "id": product_id,
+                "name": item["name"],
+                "current_price": item["old_price"],
+                "new_price": item["new_price"],
+                "adjustment": item.get("adjustment"),
+                "rule": item.get("rule"),
+            }
+            if not result.get("success") and result.get("error"):
+                item["error"] = result["error"]
+                print(f"  {result['error']}")
+            success = price_adjuster.record_price_update(
+                change, bool(result.get("success"))
+            )
+            item["status"] = APPLIED if success else FAILED
+
+    counts: Dict[str, int] = {}
+    for item in plan["items"]:
+        status = item.get("status", PENDING)
+        counts[status] = counts.get(status, 0) + 1
+    return counts
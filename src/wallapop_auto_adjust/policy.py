@@ -0,0 +1,148 @@
+"""
+Declarative pricing rules for unattended runs.
+
+Rules live in the config under ``settings.rules`` and are evaluated in order;
+the first rule matching a product decides its new price:
+
+    {"settings": {"rules": [
+        {"name": "bikes", "category_id": "17000", "multiplier": 0.95,
+         "floor": 80, "delay_days": 7},
+        {"name": "pinned", "ids": ["abc123"], "keep": true},
+        {"name": "rest", "step": -1, "floor": 5, "ceiling": 500}
+    ]}}
+
+Match keys: ``ids``, ``category_id``, ``name_contains`` (a rule without match
+keys matches every product). Actions: ``multiplier``, ``step`` (absolute euros,
+applied after the multiplier), ``floor``, ``ceiling``, ``keep`` and
+``delay_days`` (minimum days between changes, overriding the global setting).
+Products matched by no rule fall back to their own ``adjustment`` multiplier.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+_MATCH_KEYS = ("ids", "category_id", "name_contains")
+_ACTION_KEYS = ("multiplier", "step", "floor", "ceiling", "keep", "delay_days")
+
+
+@dataclass(frozen=True)
+class PriceRule:
+    name: str = ""
+    ids: Tuple[str, ...] = ()
+    category_id: Optional[str] = None
+    name_contains: Optional[str] = None
+    multiplier: Optional[float] = None
+    step: Optional[float] = None
+    floor: Optional[float] = None
+    ceiling: Optional[float] = None
+    keep: bool = False
+    delay_days: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], index: int = 0) -> "PriceRule":
+        """Build a rule from its config dict; raises ValueError if malformed."""
+        if not isinstance(data, dict):
+            raise ValueError(f"rule #{index + 1} must be an object")
+        name = str(data.get("name") or f"rule {index + 1}")
+        unknown = set(data) - set(_MATCH_KEYS) - set(_ACTION_KEYS) - {"name"}
+        if unknown:
+            raise ValueError(f"{name}: unknown key(s) {', '.join(sorted(unknown))}")
+
+        def number(key: str) -> Optional[float]:
+            value = data.get(key)
+            if value is None:
+                return None
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name}: '{key}' must be a number") from None
+
+        ids = data.get("ids") or ()
+        if isinstance(ids, str):
+            ids = (ids,)
+        rule = cls(
+            name=name,
+            ids=tuple(str(i) for i in ids),
+            category_id=str(data["category_id"]) if data.get("category_id") else None,
+            name_contains=data.get("name_contains") or None,
+            multiplier=number("multiplier"),
+            step=number("step"),
+            floor=number("floor"),
+            ceiling=number("ceiling"),
+            keep=bool(data.get("keep", False)),
+            delay_days=(
+                int(number("delay_days"))
+                if data.get("delay_days") is not None
+                else None
+            ),
+        )
+        if rule.multiplier is not None and rule.multiplier <= 0:
+            raise ValueError(f"{name}: 'multiplier' must be positive")
+        if (
+            rule.floor is not None
+            and rule.ceiling is not None
+            and rule.floor > rule.ceiling
+        ):
+            raise ValueError(f"{name}: 'floor' is above 'ceiling'")
+        return rule
+
+    def matches(self, product: Dict[str, Any]) -> bool:
+        if self.ids and str(product.get("id")) not in self.ids:
+            return False
+        if self.category_id and str(product.get("category_id")) != self.category_id:
+            return False
+        if self.name_contains and (
+            self.name_contains.lower() not in str(product.get("name") or "").lower()
+        ):
+            return False
+        return True
+
+    def apply(self, price: float) -> float:
+        """New price for ``price`` (rounded to cents, never below €1)."""
+        if self.keep:
+            return price
+        new_price = price
+        if self.multiplier is not None:
+            new_price *= self.multiplier
+        if self.step is not None:
+            new_price += self.step
+        if self.floor is not None:
+            # A floor never raises a price that is already below it
+            new_price = max(new_price, min(self.floor, price))
+        if self.ceiling is not None:
+            new_price = min(new_price, self.ceiling)
+        return max(round(new_price, 2), 1.0)
+
+    def describe(self) -> str:
+        parts = []
+        if self.keep:
+            parts.append("keep")
+        if self.multiplier is not None:
+            parts.append(f"×{self.multiplier:g}")
+        if self.step is not None:
+            parts.append(f"{self.step:+g}€")
+        if self.floor is not None:
+            parts.append(f"floor €{self.floor:g}")
+        if self.ceiling is not None:
+            parts.append(f"ceiling €{self.ceiling:g}")
+        return f"{self.name} ({', '.join(parts) or 'no change'})"
+
+
+class PolicyEngine:
+    """Ordered list of PriceRules; the first matching rule wins."""
+
+    def __init__(self, rules: Optional[List[PriceRule]] = None):
+        self.rules = list(rules or [])
+
+    @classmethod
+    def from_config(cls, config_manager) -> "PolicyEngine":
+        raw_rules = config_manager.get_rules()
+        if not isinstance(raw_rules, list):
+            raise ValueError("settings.rules must be a list")
+        return cls([PriceRule.from_dict(r, i) for i, r in enumerate(raw_rules)])
+
+    def rule_for(self, product: Dict[str, Any]) -> Optional[PriceRule]:
+        for rule in self.rules:
+            if rule.matches(product):
+                return rule
+        return None
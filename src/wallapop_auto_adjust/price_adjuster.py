@@ -1,5 +1,11 @@
-from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+from wallapop_auto_adjust.policy import PolicyEngine, PriceRule
+
+try:  # Optional: vectorized batch pricing
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None
 
 
 RESERVED_STATUSES = {
@@ -27,55 +33,80 @@ KNOWN_FLAG_KEYS = {
 }
 
 
+MIN_PRICE = 1.0
+
+
+def calculate_new_price(current_price: float, adjustment: Any) -> float:
+    """New price for one product: multiplier applied, rounded to cents, min €1."""
+    if adjustment == "keep":
+        return current_price
+
+    new_price = current_price * float(adjustment)
+    new_price = round(new_price, 2)
+
+    # Enforce minimum price of €1
+    if new_price < MIN_PRICE:
+        new_price = MIN_PRICE
+
+    return new_price
+
+
+def calculate_new_prices(current_prices, adjustments) -> Any:
+    """calculate_new_price over whole arrays of prices and adjustments.
+
+    ``adjustments`` holds multipliers or "keep". Results are identical to the
+    scalar function element by element. Uses NumPy when installed; returns a
+    NumPy array if ``current_prices`` is one, otherwise a list.
+    """
+    if len(current_prices) != len(adjustments):
+        raise ValueError("current_prices and adjustments differ in length")
+    if np is None:
+        return [calculate_new_price(p, a) for p, a in zip(current_prices, adjustments)]
+
+    keep = np.fromiter((a == "keep" for a in adjustments), dtype=bool)
+    factors = np.fromiter(
+        (1.0 if a == "keep" else float(a) for a in adjustments), dtype=float
+    )
+    prices = np.asarray(current_prices, dtype=float)
+    raw = prices * factors
+    scaled = raw * 100
+    # rint(x * 100) / 100 matches round(x, 2) except where x * 100 sits on a
+    # .5 tie (the product can be off by an ulp); redo those with round()
+    new = np.rint(scaled) / 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie & ~keep):
+        new[i] = round(float(raw[i]), 2)
+    new = np.maximum(new, MIN_PRICE)
+    new = np.where(keep, prices, new)
+    if isinstance(current_prices, np.ndarray):
+        return new
+    return new.tolist()
+
+
 class PriceAdjuster:
     def __init__(self, wallapop_client, config_manager):
         self.client = wallapop_client
         self.config = config_manager
+        # Optional RunJournal recording the outcome of every update
+        self.journal = None
 
-    def should_update_price(self, product_id: str) -> bool:
-        """Check if enough time has passed since last update"""
-        delay_days = self.config.get_delay_days()
-        if delay_days == 0:
-            return True
+    def should_update_price(
+        self, product_id: str, delay_days: Optional[int] = None
+    ) -> bool:
+        """Check if enough time has passed since last update
 
-        product_config = self.config.get_product_config(product_id)
-        last_modified = product_config.get("last_modified")
-
-        if not last_modified:
-            return True
-
-        try:
-            # Handle different date formats
-            if isinstance(last_modified, (int, float)):
-                # Unix timestamp
-                last_date = datetime.fromtimestamp(
-                    last_modified / 1000 if last_modified > 1e10 else last_modified
-                )
-            else:
-                # ISO string date
-                last_date = datetime.fromisoformat(
-                    str(last_modified).replace("Z", "+00:00")
-                )
-
-            days_passed = (datetime.now().astimezone() - last_date).days
-            return days_passed >= delay_days
-        except:
-            # If date parsing fails, allow update
-            return True
+        ``delay_days`` overrides the global setting (e.g. from a pricing rule).
+        Uses the config's parsed due-date index instead of re-parsing dates.
+        """
+        return self.config.is_due(product_id, delay_days=delay_days)
 
     def calculate_new_price(self, current_price: float, adjustment: Any) -> float:
         """Calculate new price based on adjustment"""
-        if adjustment == "keep":
-            return current_price
-
-        new_price = current_price * float(adjustment)
-        new_price = round(new_price, 2)
+        return calculate_new_price(current_price, adjustment)
 
-        # Enforce minimum price of €1
-        if new_price < 1.0:
-            new_price = 1.0
-
-        return new_price
+    def calculate_new_prices(self, current_prices, adjustments) -> Any:
+        """Calculate new prices for many products at once (see calculate_new_prices)"""
+        return calculate_new_prices(current_prices, adjustments)
 
     def get_user_adjustment(
         self,
@@ -110,8 +141,16 @@ class PriceAdjuster:
             print("  Invalid input, using default")
             return default_adjustment
 
-    def adjust_product_price(self, product: Dict[str, Any]) -> bool:
-        """Adjust single product price"""
+    def plan_product_price(
+        self, product: Dict[str, Any], policy: Optional[PolicyEngine] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Decide whether a product's price should change.
+
+        Runs all skip checks, then asks for the adjustment and the confirmation,
+        or with a ``policy`` decides unattended from the pricing rules. Does not
+        contact the API. Returns the change as a dict with ``id``, ``name``,
+        ``current_price``, ``new_price``, ``adjustment`` and ``reason``, or None.
+        """
         product_id = product["id"]
         product_name = product["name"]
         current_price = product["price"]
@@ -143,17 +182,22 @@ class PriceAdjuster:
             print(
                 f"Skipping {product_name} (€{current_price:.2f}) - product is {status_label}"
             )
-            return False
+            return None
 
-        if not self.should_update_price(product_id):
+        rule = policy.rule_for(product) if policy is not None else None
+        delay_days = rule.delay_days if rule is not None else None
+        if not self.should_update_price(product_id, delay_days=delay_days):
             print(
                 f"Skipping {product_name} (€{current_price:.2f}) - delay period not met"
             )
-            return False
+            return None
 
         product_config = self.config.get_product_config(product_id)
         default_adjustment = product_config.get("adjustment", "keep")
 
+        if policy is not None:
+            return self._plan_from_policy(product, rule, default_adjustment)
+
         # Get user decision
         adjustment = self.get_user_adjustment(
             product_name,
@@ -164,40 +208,157 @@ class PriceAdjuster:
 
         # Update config if user changed the adjustment
         if adjustment != default_adjustment:
-            self.config.config["products"][product_id]["adjustment"] = adjustment
-            self.config.save_config()
+            self.config.set_adjustment(product_id, adjustment)
 
         if adjustment == "keep":
             print(f"  Keeping current price")
-            return False
+            return None
 
         new_price = self.calculate_new_price(current_price, adjustment)
 
         if new_price == current_price:
             print(f"  No change needed")
-            return False
+            return None
 
         print(f"  Current: €{current_price:.2f} → New: €{new_price:.2f}")
         confirm = input("  Apply this change? (y/n) [y]: ").lower().strip()
 
-        if confirm in ["y", "yes", ""]:
-            success = self.client.update_product_price(product_id, new_price)
-            if success:
-                self.config.update_last_modified(product_id)  # This now auto-saves
-
-                # Switch to "keep" if price hit minimum limit
-                if new_price == 1.0 and current_price * float(adjustment) < 1.0:
-                    self.config.config["products"][product_id]["adjustment"] = "keep"
-                    self.config.save_config()
-                    print(
-                        f"  ✓ Updated: €{current_price:.2f} → €{new_price:.2f} (switched to 'keep' - minimum reached)"
-                    )
-                else:
-                    print(f"  ✓ Updated: €{current_price:.2f} → €{new_price:.2f}")
-                return True
-            else:
-                print(f"  ✗ Failed to update")
-        else:
+        if confirm not in ["y", "yes", ""]:
             print(f"  Skipped - user declined")
+            return None
+
+        return {
+            "id": product_id,
+            "name": product_name,
+            "current_price": current_price,
+            "new_price": new_price,
+            "adjustment": adjustment,
+            "reason": f"adjustment {adjustment}",
+        }
+
+    def _plan_from_policy(
+        self,
+        product: Dict[str, Any],
+        rule: Optional[PriceRule],
+        default_adjustment: Any,
+    ) -> Optional[Dict[str, Any]]:
+        """Unattended decision: the matching rule, else the product's adjustment."""
+        current_price = product["price"]
+        if rule is not None:
+            new_price = rule.apply(current_price)
+            reason = f"rule {rule.describe()}"
+        elif default_adjustment == "keep":
+            return None
+        else:
+            new_price = self.calculate_new_price(current_price, default_adjustment)
+            reason = f"adjustment {default_adjustment}"
+
+        if new_price == current_price:
+            return None
 
-        return False
+        print(
+            f"→ {product['name']}: €{current_price:.2f} → €{new_price:.2f} ({reason})"
+        )
+        return {
+            "id": product["id"],
+            "name": product["name"],
+            "current_price": current_price,
+            "new_price": new_price,
+            "adjustment": default_adjustment if rule is None else None,
+            "rule": rule.name if rule is not None else None,
+            "reason": reason,
+        }
+
+    def due_products(
+        self, products: List[Dict[str, Any]], policy: Optional[PolicyEngine] = None
+    ) -> List[Dict[str, Any]]:
+        """Drop products whose delay period is not met, using one due-index query.
+
+        Products must already be registered in the config. Products matched by
+        a rule with its own ``delay_days`` are kept; plan_product_price checks
+        them against that delay.
+        """
+        due = set(self.config.due_product_ids())
+        kept = []
+        for product in products:
+            rule = policy.rule_for(product) if policy is not None else None
+            has_own_delay = rule is not None and rule.delay_days is not None
+            if product["id"] in due or has_own_delay:
+                kept.append(product)
+        skipped = len(products) - len(kept)
+        if skipped:
+            print(f"Skipping {skipped} product(s) - delay period not met")
+        return kept
+
+    def plan_all(
+        self, products: List[Dict[str, Any]], policy: PolicyEngine
+    ) -> List[Dict[str, Any]]:
+        """Evaluate every due product against the policy in one pass."""
+        changes = []
+        for product in self.due_products(products, policy):
+            change = self.plan_product_price(product, policy)
+            if change:
+                changes.append(change)
+        return changes
+
+    def record_price_update(self, change: Dict[str, Any], success: bool) -> bool:
+        """Persist the outcome of an applied change and report it to the user."""
+        product_id = change["id"]
+        current_price = change["current_price"]
+        new_price = change["new_price"]
+        adjustment = change["adjustment"]
+
+        if self.journal is not None:
+            self.journal.record_result(product_id, success, change.get("error"))
+
+        if not success:
+            print(f"  ✗ Failed to update")
+            return False
+
+        self.config.update_last_modified(product_id)  # This now auto-saves
+
+        # Switch to "keep" if price hit minimum limit (multiplier adjustments only)
+        if (
+            change.get("rule") is None
+            and new_price == 1.0
+            and current_price * float(adjustment) < 1.0
+        ):
+            self.config.set_adjustment(product_id, "keep")
+            print(
+                f"  ✓ Updated: €{current_price:.2f} → €{new_price:.2f} (switched to 'keep' - minimum reached)"
+            )
+        else:
+            print(f"  ✓ Updated: €{current_price:.2f} → €{new_price:.2f}")
+        return True
+
+    def adjust_product_price(self, product: Dict[str, Any]) -> bool:
+        """Adjust single product price"""
+        change = self.plan_product_price(product)
+        if change is None:
+            return False
+        success = self.client.update_product_price(change["id"], change["new_price"])
+        return self.record_price_update(change, success)
+
+    def apply_price_changes(self, changes: List[Dict[str, Any]]) -> int:
+        """Apply confirmed changes concurrently and return how many succeeded.
+
+        Each change dict gets ``applied`` set to whether its update succeeded.
+        """
+        if not changes:
+            return 0
+        report = self.client.update_prices_batch(
+            {change["id"]: change["new_price"] for change in changes}
+        )
+        updated_count = 0
+        for change in changes:
+            result = report.get(change["id"]) or {}
+            print(f"\n→ {change['name']}")
+            if not result.get("success") and result.get("error"):
+                change["error"] = result["error"]
+                print(f"  {result['error']}")
+            change["applied"] = self.record_price_update(
+                change, bool(result.get("success"))
+            )
+            if change["applied"]:
+                updated_count += 1
+        return updated_count
@@ -0,0 +1,200 @@
+"""
+Compact product record for listings.
+
+A Product keeps only the fields the adjuster needs, in a slotted dataclass:
+price as integer cents, last_modified as epoch seconds, status as an enum and
+item flags as a bitmask. The original API payload is kept as compact JSON and
+decoded only when accessed. For compatibility the record also supports the dict
+API used by existing code (product["price"], product.get("flags"), ...).
+"""
+
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+class ProductStatus(str, Enum):
+    AVAILABLE = "available"
+    RESERVED = "reserved"
+
+
+# Bit positions of the item flags reported by the API
+FLAG_BITS: Dict[str, int] = {
+    name: 1 << i
+    for i, name in enumerate(
+        (
+            "reserved",
+            "sold",
+            "pending",
+            "blocked",
+            "on_hold",
+            "pending_reserved",
+            "banned",
+            "favorite",
+            "expired",
+            "bumped",
+            "is_refurbished",
+            "has_warranty",
+            "to_review",
+        )
+    )
+}
+
+# Flags always present in the flags dict, even when not set
+BASE_FLAGS = ("reserved", "sold", "pending", "blocked", "on_hold")
+
+_DICT_KEYS = (
+    "id",
+    "name",
+    "price",
+    "last_modified",
+    "status",
+    "reserved",
+    "flags",
+    "category_id",
+)
+
+
+def _extract_flag(value: Any) -> bool:
+    if isinstance(value, dict):
+        return bool(value.get("flag"))
+    return bool(value)
+
+
+def to_epoch_seconds(value: Any) -> Optional[float]:
+    """Epoch seconds from a millisecond/second timestamp or an ISO date string."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return value / 1000 if value > 1e10 else float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _to_cents(price_raw: Any) -> int:
+    if isinstance(price_raw, dict) and "amount" in price_raw:
+        return round(float(price_raw.get("amount") or 0) * 100)
+    try:
+        return int(round(price_raw or 0))
+    except Exception:
+        return 0
+
+
+@dataclass(slots=True)
+class Product:
+    id: str
+    name: str
+    price_cents: int
+    last_modified: Optional[float] = None
+    status: ProductStatus = ProductStatus.AVAILABLE
+    flag_bits: int = 0
+    # Names of active flags the API reported that are not in FLAG_BITS
+    extra_flags: Tuple[str, ...] = ()
+    raw_json: Optional[bytes] = None
+    category_id: Optional[str] = None
+
+    @classmethod
+    def from_payload(cls, p: Dict[str, Any], include_raw: bool = True) -> "Product":
+        """Build a Product from an item payload of the listing endpoint."""
+        on_hold = p.get("on_hold") or p.get("onhold")
+        flag_bits = 0
+        extra = []
+        for key, value in p.items():
+            if key in ("on_hold", "onhold"):
+                continue
+            if key in FLAG_BITS:
+                if _extract_flag(value):
+                    flag_bits |= FLAG_BITS[key]
+            elif isinstance(value, dict) and "flag" in value and value.get("flag"):
+                extra.append(key)
+        if _extract_flag(on_hold):
+            flag_bits |= FLAG_BITS["on_hold"]
+
+        reserved = bool(flag_bits & FLAG_BITS["reserved"])
+        category_id = p.get("category_id")
+        taxonomy = p.get("taxonomy")
+        if category_id is None and isinstance(taxonomy, list) and taxonomy:
+            category_id = (taxonomy[-1] or {}).get("id")
+        return cls(
+            id=p.get("id") or p.get("item_id"),
+            name=p.get("title") or p.get("name") or "",
+            price_cents=_to_cents(p.get("price")),
+            last_modified=to_epoch_seconds(
+                p.get("modified_date") or p.get("last_modified")
+            ),
+            status=ProductStatus.RESERVED if reserved else ProductStatus.AVAILABLE,
+            flag_bits=flag_bits,
+            extra_flags=tuple(extra),
+            raw_json=(
+                json.dumps(p, separators=(",", ":")).encode("utf-8")
+                if include_raw
+                else None
+            ),
+            category_id=str(category_id) if category_id is not None else None,
+        )
+
+    @property
+    def price(self) -> float:
+        return self.price_cents / 100.0
+
+    @property
+    def reserved(self) -> bool:
+        return bool(self.flag_bits & FLAG_BITS["reserved"])
+
+    def has_flag(self, name: str) -> bool:
+        bit = FLAG_BITS.get(name)
+        if bit is not None:
+            return bool(self.flag_bits & bit)
+        return name in self.extra_flags
+
+    @property
+    def flags(self) -> Dict[str, bool]:
+        flags = {name: self.has_flag(name) for name in BASE_FLAGS}
+        for name, bit in FLAG_BITS.items():
+            if self.flag_bits & bit:
+                flags[name] = True
+        for name in self.extra_flags:
+            flags[name] = True
+        return flags
+
+    @property
+    def raw(self) -> Optional[Dict[str, Any]]:
+        """The original API payload, decoded on access (None when not kept)."""
+        if self.raw_json is None:
+            return None
+        return json.loads(self.raw_json)
+
+    # Dict API kept for compatibility with code written against plain dicts
+    def _keys(self) -> Tuple[str, ...]:
+        return _DICT_KEYS + (("_raw",) if self.raw_json is not None else ())
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._keys():
+            raise KeyError(key)
+        if key == "_raw":
+            return self.raw
+        if key == "status":
+            return self.status.value
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys()
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._keys()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self._keys()}
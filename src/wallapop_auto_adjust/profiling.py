@@ -0,0 +1,152 @@
+"""
+Per-phase timing for a CLI run (``--profile``).
+
+A run is split into phases (login, fetch_products, decide, config_sync,
+adjustments). PhaseProfiler records wall-clock and CPU time and the number of
+API requests for each phase and, on request, a cProfile dump and the
+tracemalloc peak. Phases are delimited with ``begin(name)``, which also ends
+the previous one, so early returns in the CLI still close the phase that was
+running.
+
+cProfile only sees the thread that enabled it. Work done by the
+update_prices_batch worker threads is missing from the ``adjustments`` dump:
+there the main thread only shows waiting on the pool. Wall time, CPU time
+(process-wide) and request counts do include the workers.
+"""
+
+import cProfile
+import os
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from wallapop_auto_adjust.config import write_json_atomic
+from wallapop_auto_adjust.metrics import RequestMetrics, default_metrics
+
+
+@dataclass
+class PhaseTiming:
+    name: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    requests: int = 0
+    peak_memory_bytes: Optional[int] = None
+    pstats_file: Optional[str] = None
+
+
+class PhaseProfiler:
+    def __init__(
+        self,
+        enabled: bool = True,
+        output_dir: Optional[str] = None,
+        trace_memory: bool = False,
+        metrics: RequestMetrics = default_metrics,
+    ):
+        """
+        Args:
+            enabled: When False every method is a no-op
+            output_dir: Directory for ``phases.json`` and one cProfile dump
+                per phase (``<phase>.pstats``); no cProfile without it
+            trace_memory: Record the tracemalloc peak of each phase
+            metrics: Request counters used for the per-phase request count
+        """
+        self.enabled = enabled
+        self.output_dir = output_dir
+        self.trace_memory = trace_memory
+        self.metrics = metrics
+        self.phases: List[PhaseTiming] = []
+        self._current: Optional[PhaseTiming] = None
+        self._started = (0.0, 0.0, 0)
+        self._profile: Optional[cProfile.Profile] = None
+        self._owns_tracemalloc = False
+
+    def _request_count(self) -> int:
+        return self.metrics.summary()["requests"]
+
+    def begin(self, name: str) -> None:
+        """End the running phase (if any) and start ``name``."""
+        if not self.enabled:
+            return
+        self.end()
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+            tracemalloc.reset_peak()
+        if self.output_dir:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._current = PhaseTiming(name)
+        self._started = (
+            time.perf_counter(),
+            time.process_time(),
+            self._request_count(),
+        )
+
+    def end(self) -> None:
+        """End the running phase."""
+        phase = self._current
+        if phase is None:
+            return
+        wall, cpu, requests = self._started
+        phase.wall_seconds = time.perf_counter() - wall
+        phase.cpu_seconds = time.process_time() - cpu
+        if self._profile is not None:
+            self._profile.disable()
+            os.makedirs(self.output_dir, exist_ok=True)
+            phase.pstats_file = os.path.join(self.output_dir, f"{phase.name}.pstats")
+            self._profile.dump_stats(phase.pstats_file)
+            self._profile = None
+        phase.requests = self._request_count() - requests
+        if self.trace_memory:
+            phase.peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+        self.phases.append(phase)
+        self._current = None
+
+    def report(self) -> Dict[str, Any]:
+        """Per-phase breakdown plus totals."""
+        return {
+            "phases": [vars(phase).copy() for phase in self.phases],
+            "total": {
+                "wall_seconds": sum(p.wall_seconds for p in self.phases),
+                "cpu_seconds": sum(p.cpu_seconds for p in self.phases),
+                "requests": sum(p.requests for p in self.phases),
+            },
+        }
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """End the last phase, then print and (with output_dir) save the report."""
+        if not self.enabled:
+            return None
+        self.end()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        report = self.report()
+        self.print_report(report)
+        if self.output_dir:
+            path = os.path.join(self.output_dir, "phases.json")
+            write_json_atomic(path, report)
+            print(f"Profile saved to: {self.output_dir}")
+        return report
+
+    @staticmethod
+    def print_report(report: Dict[str, Any]) -> None:
+        total_wall = report["total"]["wall_seconds"] or 1.0
+        print("\nProfile (wall / CPU seconds, API requests):")
+        for phase in report["phases"]:
+            line = (
+                f"  {phase['name']:<15} {phase['wall_seconds']:8.3f}s "
+                f"{phase['cpu_seconds']:8.3f}s "
+                f"{phase['wall_seconds'] / total_wall:6.1%} "
+                f"{phase['requests']:5d} req"
+            )
+            if phase["peak_memory_bytes"] is not None:
+                line += f"  peak {phase['peak_memory_bytes'] / 1024 / 1024:.1f} MB"
+            print(line)
+        total = report["total"]
+        print(
+            f"  {'total':<15} {total['wall_seconds']:8.3f}s "
+            f"{total['cpu_seconds']:8.3f}s {'':6} {total['requests']:5d} req"
+        )
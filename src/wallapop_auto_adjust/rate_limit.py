@@ -0,0 +1,132 @@
+"""
+Client-side rate limiting for Wallapop API calls.
+
+Requests draw from token buckets: one for reads (GET/HEAD) and one for writes
+(PUT/POST/...). A bucket refills at ``rate`` tokens per second up to ``capacity``
+(the allowed burst). When the API answers 429, the bucket halves its rate and
+pauses for the Retry-After period; successful responses raise the rate again
+step by step up to the configured ceiling (additive increase, multiplicative
+decrease), so throughput settles near what the API tolerates.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from wallapop_auto_adjust.http_retry import parse_retry_after
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            rate: Sustained requests per second (also the ceiling after throttling)
+            capacity: Burst size; defaults to one second worth of requests
+            min_rate: Lowest rate throttling can reduce to
+            clock: Monotonic time source
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - max(self._updated, self._paused_until))
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = max(now, self._updated)
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds the caller must wait."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            wait = max(0.0, self._paused_until - now)
+            # Tokens may go negative: later callers queue behind earlier ones
+            self._tokens -= 1
+            if self._tokens < 0:
+                wait += -self._tokens / self.rate
+            return wait
+
+    def acquire(self, sleep: Callable[[float], None] = time.sleep) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            sleep(wait)
+        return wait
+
+    def throttle(self, retry_after: Optional[float] = None) -> None:
+        """Back off after a 429: halve the rate and honour Retry-After."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+    def recover(self) -> None:
+        """Raise the rate again after a successful call."""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class RateLimiter:
+    """Separate read and write token buckets shared by all API calls."""
+
+    def __init__(
+        self,
+        read_rate: float = 8.0,
+        write_rate: float = 2.0,
+        read_burst: Optional[float] = None,
+        write_burst: Optional[float] = None,
+    ):
+        self.read = TokenBucket(read_rate, read_burst) if read_rate > 0 else None
+        self.write = TokenBucket(write_rate, write_burst) if write_rate > 0 else None
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """Limiter configured from WALLAPOP_READ_RATE and WALLAPOP_WRITE_RATE
+        (requests per second, 0 disables)."""
+        return cls(
+            read_rate=float(os.getenv("WALLAPOP_READ_RATE", "8")),
+            write_rate=float(os.getenv("WALLAPOP_WRITE_RATE", "2")),
+        )
+
+    def bucket_for(self, method: str) -> Optional[TokenBucket]:
+        return self.read if method.upper() in READ_METHODS else self.write
+
+    def reserve(self, method: str) -> float:
+        bucket = self.bucket_for(method)
+        return bucket.reserve() if bucket else 0.0
+
+    def acquire(self, method: str, sleep: Callable[[float], None] = time.sleep):
+        wait = self.reserve(method)
+        if wait > 0:
+            sleep(wait)
+        return wait
+
+    def observe(self, method: str, response: Any) -> None:
+        """Adjust the bucket for ``method`` from the response status."""
+        bucket = self.bucket_for(method)
+        if bucket is None or response is None:
+            return
+        status = getattr(response, "status_code", None)
+        if status == 429:
+            headers = getattr(response, "headers", None) or {}
+            bucket.throttle(parse_retry_after(headers.get("Retry-After")))
+        elif isinstance(status, int) and status < 400:
+            bucket.recover()
@@ -51,7 +51,7 @@ class SessionManager:
     def test_session(self, test_url):
         """Test if current session is valid"""
         try:
-            response = self.session.get(test_url)
+            response = self.session.get(test_url, timeout=10)
             return response.status_code == 200
         except:
             return False
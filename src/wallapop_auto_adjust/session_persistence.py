@@ -5,15 +5,158 @@ Advanced Session Manager for Wallapop Auto-Adjust
 Handles 30-day session persistence with automatic 5-minute token refresh
 """
 
+import base64
+import hashlib
 import json
 import os
 import logging
 import requests
 import contextlib
+import threading
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, Optional, Tuple
 
+from wallapop_auto_adjust.browser_pool import get_browser_pool
+from wallapop_auto_adjust.http_retry import RetryPolicy, request_with_retries
+from wallapop_auto_adjust.metrics import default_metrics
+from wallapop_auto_adjust.rate_limit import RateLimiter
+
+# Canonical NextAuth cookie names and their single-underscore aliases
+_COOKIE_ALIAS_PAIRS = [
+    ("_Secure-next-auth.session-token", "__Secure-next-auth.session-token"),
+    ("_Host-next-auth.csrf-token", "__Host-next-auth.csrf-token"),
+    ("_Secure-next-auth.callback-url", "__Secure-next-auth.callback-url"),
+]
+
+
+def normalize_cookies(cookies: Dict[str, str]) -> Dict[str, str]:
+    """Sanitize cookie values and add NextAuth name aliases.
+
+    Values are trimmed and stripped of accidental surrounding quotes. Browsers use
+    double underscores for __Host-/__Secure- cookies; either variant is accepted and
+    both are returned so downstream lookups work with any spelling.
+    """
+    sanitized: Dict[str, str] = {}
+    for k, v in cookies.items():
+        if isinstance(v, str):
+            vv = v.strip()
+            # Remove accidental surrounding quotes
+            if (vv.startswith('"') and vv.endswith('"')) or (
+                vv.startswith("'") and vv.endswith("'")
+            ):
+                vv = vv[1:-1]
+            sanitized[k] = vv
+        else:
+            sanitized[k] = v
+
+    normalized: Dict[str, str] = dict(sanitized)
+    for single, double in _COOKIE_ALIAS_PAIRS:
+        if single in sanitized and double not in normalized:
+            normalized[double] = sanitized[single]
+        if double in sanitized and single not in normalized:
+            # Also expose a single-underscore alias for downstream lookups
+            normalized[single] = sanitized[double]
+    return normalized
+
+
+def cookie_domain(name: str) -> str:
+    """Canonical domain for a Wallapop cookie (based on browser behavior).
+
+    - __Host-next-auth.csrf-token, __Secure-next-auth.callback-url and other
+      __Host- cookies are host-only on es.wallapop.com
+    - __Secure-next-auth.session-token, device_id, accessToken (and most others)
+      live on .wallapop.com
+    """
+    if (
+        name == "__Host-next-auth.csrf-token"
+        or name == "__Secure-next-auth.callback-url"
+        or name.startswith("__Host-")
+    ):
+        return "es.wallapop.com"
+    return ".wallapop.com"
+
+
+def _should_set_cookie(name: str) -> bool:
+    """Single-underscore aliases are for internal lookups only, never sent."""
+    return not (
+        name.startswith("_Secure-next-auth.") or name.startswith("_Host-next-auth.")
+    )
+
+
+def install_cookies(jar, normalized: Dict[str, str]) -> None:
+    """Set normalized cookies on a requests cookie jar under their canonical domains."""
+    from requests.cookies import create_cookie
+
+    for name, value in normalized.items():
+        if not _should_set_cookie(name):
+            continue
+        # Ensure path is root so requests includes cookie broadly
+        try:
+            ck = create_cookie(
+                name=name,
+                value=value,
+                domain=cookie_domain(name),
+                path="/",
+                secure=True,
+            )
+            # Remove any existing cookie entries with the same name across domains/paths (best effort)
+            try:
+                for c in list(jar):
+                    if c.name == name:
+                        with contextlib.suppress(Exception):
+                            jar.clear(domain=c.domain, path=c.path, name=c.name)
+            except Exception:
+                pass
+            jar.set_cookie(ck)
+        except Exception:
+            # Fallback to simple set with canonical domain
+            try:
+                jar.set(name, value, domain=cookie_domain(name), path="/", secure=True)
+            except Exception:
+                jar.set(name, value)
+
+
+# Realistic default headers for browser-like requests
+DEFAULT_SESSION_HEADERS = {
+    "accept": "application/json, text/plain, */*",
+    "accept-language": "en-US,en;q=0.9",
+    "cache-control": "no-cache",
+    "pragma": "no-cache",
+    "referer": "https://es.wallapop.com/app/catalog/published",
+    "origin": "https://es.wallapop.com",
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-origin",
+    "sec-gpc": "1",
+    "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36",
+    "dnt": "1",
+}
+
+
+def _jwt_expiry(token: str) -> Optional[datetime]:
+    """Return the exp claim of a JWT as a local naive datetime, or None if not decodable."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload.encode("ascii")))
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            return datetime.fromtimestamp(exp)
+    except Exception:
+        pass
+    return None
+
+
+def default_session_dir() -> Path:
+    """Home of the default account's session files: ~/.wallapop-auto-adjust."""
+    return Path.home() / ".wallapop-auto-adjust"
+
+
+class _SessionExpired(Exception):
+    """Raised by a refresh strategy when the server rejects the session cookies."""
+
 
 class SessionPersistenceManager:
     """Manages persistent sessions with automatic token refresh"""
@@ -22,15 +165,24 @@ class SessionPersistenceManager:
         self,
         session_file: str = "session_data.json",
         cookies_file: str = "cookies.json",
+        token_file: str = "token.json",
+        base_dir: Optional[Path] = None,
     ):
-        # Place all session artifacts under user home by default (no env override)
-        base_dir = Path.home() / ".wallapop-auto-adjust"
+        # Place all session artifacts under user home by default (no env override);
+        # account profiles pass their own directory
+        legacy_home = base_dir is None
+        base_dir = Path(base_dir) if base_dir is not None else default_session_dir()
+        self.base_dir = base_dir
         try:
             base_dir.mkdir(parents=True, exist_ok=True)
         except Exception:
             pass
         self.session_file = base_dir / session_file
         self.cookies_file = base_dir / cookies_file
+        self.token_file = base_dir / token_file
+        self.refresh_stats_file = base_dir / "refresh_stats.json"
+        # Chrome user data for the pooled browser fallback (one per account)
+        self.browser_profile_dir = base_dir / "browser_profile"
         self.logger = logging.getLogger(__name__)
         # Enable verbose debug if requested
         if os.getenv("WALLAPOP_DEBUG"):
@@ -46,7 +198,7 @@ class SessionPersistenceManager:
         # One-time migration from legacy repo-local .session directory
         try:
             legacy_dir = Path(__file__).resolve().parents[2] / ".session"
-            if legacy_dir.exists():
+            if legacy_home and legacy_dir.exists():
                 for fname in (session_file, cookies_file):
                     src = legacy_dir / fname
                     dst = base_dir / fname
@@ -68,6 +220,23 @@ class SessionPersistenceManager:
         self.token_refresh_url = "https://es.wallapop.com/api/auth/federated-session"
         self.token_lifetime_minutes = 5
         self.refresh_buffer_seconds = 30  # Refresh 30 seconds before expiry
+        # Which refresh strategy produced the current token, and persisted per-strategy stats
+        self.last_refresh_strategy: Optional[str] = None
+        self._refresh_stats: Optional[Dict[str, Dict[str, float]]] = None
+        self._last_refresh_status: Optional[int] = None
+        # Single-flight refresh coordination and optional background refresher
+        self._refresh_lock = threading.Lock()
+        self._refresh_generation = 0
+        self._last_refresh_result: Optional[Tuple[bool, Optional[str]]] = None
+        self._background_thread: Optional[threading.Thread] = None
+        self._background_stop = threading.Event()
+        self.background_retry_seconds = 30
+        # Timeouts and retry/backoff for every request made on the session
+        self.retry_policy = RetryPolicy.from_env()
+        # Read/write request budgets for API calls (make_authenticated_request)
+        self.rate_limiter = RateLimiter.from_env()
+        # Request counts, retries and latencies (see metrics)
+        self.metrics = default_metrics
         # Optional: enable HTTP/2 fallback via httpx if installed
         self._http2_available = False
         with contextlib.suppress(Exception):
@@ -130,134 +299,8 @@ class SessionPersistenceManager:
             self.session = requests.Session()
             cookies = self.session_data.get("cookies", {})
 
-            # Sanitize cookie values: trim whitespace/newlines and strip surrounding quotes
-            sanitized: Dict[str, str] = {}
-            for k, v in cookies.items():
-                if isinstance(v, str):
-                    vv = v.strip()
-                    # Remove accidental surrounding quotes
-                    if (vv.startswith('"') and vv.endswith('"')) or (
-                        vv.startswith("'") and vv.endswith("'")
-                    ):
-                        vv = vv[1:-1]
-                    sanitized[k] = vv
-                else:
-                    sanitized[k] = v
-            cookies = sanitized
-
-            # Normalize NextAuth cookie names: browsers use double underscores for __Host-/__Secure-
-            # Accept either variant in cookies.json and set both to maximize compatibility
-            normalized: Dict[str, str] = dict(cookies)
-            mapping_pairs = [
-                ("_Secure-next-auth.session-token", "__Secure-next-auth.session-token"),
-                ("_Host-next-auth.csrf-token", "__Host-next-auth.csrf-token"),
-                ("_Secure-next-auth.callback-url", "__Secure-next-auth.callback-url"),
-            ]
-            for single, double in mapping_pairs:
-                if single in cookies and double not in normalized:
-                    normalized[double] = cookies[single]
-                if double in cookies and single not in normalized:
-                    # Also expose a single-underscore alias for downstream lookups
-                    normalized[single] = cookies[double]
-
-            from requests.cookies import create_cookie
-
-            # Only set canonical cookie names to avoid duplicates; prefer double-underscore
-            def should_set_cookie(name: str) -> bool:
-                if name.startswith("_Secure-next-auth.") or name.startswith(
-                    "_Host-next-auth."
-                ):
-                    return False  # aliases for internal lookups only
-                return True
-
-            for name, value in normalized.items():
-                if not should_set_cookie(name):
-                    continue
-                # Ensure path is root so requests includes cookie broadly
-                try:
-                    cookies_to_set = []
-                    # Canonical domains per cookie (based on browser behavior):
-                    # - __Host-next-auth.csrf-token → es.wallapop.com (host-only)
-                    # - __Secure-next-auth.callback-url → es.wallapop.com (host-only)
-                    # - __Secure-next-auth.session-token → .wallapop.com
-                    # - device_id, accessToken (and most others) → .wallapop.com
-                    if (
-                        name == "__Host-next-auth.csrf-token"
-                        or name == "__Secure-next-auth.callback-url"
-                    ):
-                        cookies_to_set.append(
-                            create_cookie(
-                                name=name,
-                                value=value,
-                                domain="es.wallapop.com",
-                                path="/",
-                                secure=True,
-                            )
-                        )
-                    elif (
-                        name == "__Secure-next-auth.session-token"
-                        or name == "device_id"
-                        or name == "accessToken"
-                    ):
-                        cookies_to_set.append(
-                            create_cookie(
-                                name=name,
-                                value=value,
-                                domain=".wallapop.com",
-                                path="/",
-                                secure=True,
-                            )
-                        )
-                    elif name.startswith("__Host-"):
-                        cookies_to_set.append(
-                            create_cookie(
-                                name=name,
-                                value=value,
-                                domain="es.wallapop.com",
-                                path="/",
-                                secure=True,
-                            )
-                        )
-                    else:
-                        cookies_to_set.append(
-                            create_cookie(
-                                name=name,
-                                value=value,
-                                domain=".wallapop.com",
-                                path="/",
-                                secure=True,
-                            )
-                        )
-
-                    # Remove any existing cookie entries with the same name across domains/paths (best effort)
-                    try:
-                        for c in list(self.session.cookies):
-                            if c.name == name:
-                                with contextlib.suppress(Exception):
-                                    self.session.cookies.clear(
-                                        domain=c.domain, path=c.path, name=c.name
-                                    )
-                    except Exception:
-                        pass
-                    for ck in cookies_to_set:
-                        self.session.cookies.set_cookie(ck)
-                except Exception:
-                    # Fallback to simple set with canonical domain
-                    try:
-                        domain = (
-                            "es.wallapop.com"
-                            if name
-                            in (
-                                "__Host-next-auth.csrf-token",
-                                "__Secure-next-auth.callback-url",
-                            )
-                            else ".wallapop.com"
-                        )
-                        self.session.cookies.set(
-                            name, value, domain=domain, path="/", secure=True
-                        )
-                    except Exception:
-                        self.session.cookies.set(name, value)
+            normalized = normalize_cookies(cookies)
+            install_cookies(self.session.cookies, normalized)
 
             # Log presence and lengths of key cookies for diagnostics
             try:
@@ -279,22 +322,7 @@ class SessionPersistenceManager:
                 pass
 
             # Set realistic default headers for browser-like requests
-            self.session.headers.update(
-                {
-                    "accept": "application/json, text/plain, */*",
-                    "accept-language": "en-US,en;q=0.9",
-                    "cache-control": "no-cache",
-                    "pragma": "no-cache",
-                    "referer": "https://es.wallapop.com/app/catalog/published",
-                    "origin": "https://es.wallapop.com",
-                    "sec-fetch-dest": "empty",
-                    "sec-fetch-mode": "cors",
-                    "sec-fetch-site": "same-origin",
-                    "sec-gpc": "1",
-                    "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36",
-                    "dnt": "1",
-                }
-            )
+            self.session.headers.update(DEFAULT_SESSION_HEADERS)
 
             self.logger.info("Session loaded successfully")
             return True
@@ -373,600 +401,798 @@ class SessionPersistenceManager:
 
         return now >= refresh_time
 
-    def refresh_access_token(self) -> Tuple[bool, Optional[str]]:
-        """
-        Refresh the access token using persistent session
+    # Order in which refresh strategies are tried on a full (cold) refresh
+    REFRESH_STRATEGIES = (
+        "federated_session",
+        "federated_session_query",
+        "federated_session_after_provoke",
+        "http2",
+        "fallback_endpoints",
+        "federated_session_retry",
+        "access_refresh",
+        "nudge",
+        "browser",
+    )
+
+    def _refresh_headers(self) -> Dict[str, str]:
+        """Browser-like headers for the refresh calls; also installs alias cookies."""
+        # Use browser-like headers (important for some endpoints)
+        headers = {
+            "accept": "application/json, text/plain, */*",
+            # Include br,zstd like browser; server may ignore if unsupported
+            "accept-encoding": "gzip, deflate, br, zstd",
+            "accept-language": "en-US,en;q=0.9,ru;q=0.8,fr-FR;q=0.7,fr;q=0.6,pl;q=0.5,es;q=0.4",
+            "cache-control": "no-cache",
+            "pragma": "no-cache",
+            "referer": "https://es.wallapop.com/app/chat",
+            "origin": "https://es.wallapop.com",
+            "sec-ch-ua": '"Chromium";v="140", "Not=A?Brand";v="24", "Google Chrome";v="140"',
+            "sec-ch-ua-mobile": "?0",
+            "sec-ch-ua-platform": '"macOS"',
+            "sec-fetch-dest": "empty",
+            "sec-fetch-mode": "cors",
+            "sec-fetch-site": "same-origin",
+            "sec-gpc": "1",
+            "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36",
+            "dnt": "1",
+            "priority": "u=1, i",
+            "x-requested-with": "XMLHttpRequest",
+            # no 'origin' header in HAR for this GET
+        }
 
-        Returns:
-            Tuple[bool, Optional[str]]: (success, token_or_error_message)
-        """
-        if not self.session:
-            return False, "No session available"
+        # Rely on session cookie handling (avoid manual Cookie header to not drop host-only cookies)
+        headers_with_cookies = dict(headers)
+        # Add x-csrf-token when available (extra parity)
+        try:
+            _csrf_tmp = self.session.cookies.get(
+                "__Host-next-auth.csrf-token", domain="es.wallapop.com", path="/"
+            )
+            if _csrf_tmp:
+                headers_with_cookies["x-csrf-token"] = _csrf_tmp
+        except Exception:
+            pass
+        try:
+            jar = self.session.cookies
+            cb = jar.get(
+                "__Secure-next-auth.callback-url",
+                domain="es.wallapop.com",
+                path="/",
+            )
+            st = jar.get(
+                "__Secure-next-auth.session-token", domain=".wallapop.com", path="/"
+            ) or jar.get(
+                "__Secure-next-auth.session-token",
+                domain="es.wallapop.com",
+                path="/",
+            )
+            csrf = jar.get(
+                "__Host-next-auth.csrf-token", domain="es.wallapop.com", path="/"
+            )
+            self.logger.debug(
+                f"Cookie jar snapshot: callback-url={'yes' if cb else 'no'}; session-token={'yes' if st else 'no'}; csrf={'yes' if csrf else 'no'}"
+            )
+        except Exception:
+            pass
 
+        # Install alias cookie names (some backends may read non-prefixed names)
         try:
-            self.logger.info("Refreshing access token...")
+            from requests.cookies import create_cookie
 
-            # Use browser-like headers (important for some endpoints)
-            headers = {
-                "accept": "application/json, text/plain, */*",
-                # Include br,zstd like browser; server may ignore if unsupported
-                "accept-encoding": "gzip, deflate, br, zstd",
-                "accept-language": "en-US,en;q=0.9,ru;q=0.8,fr-FR;q=0.7,fr;q=0.6,pl;q=0.5,es;q=0.4",
-                "cache-control": "no-cache",
-                "pragma": "no-cache",
-                "referer": "https://es.wallapop.com/app/chat",
-                "origin": "https://es.wallapop.com",
-                "sec-ch-ua": '"Chromium";v="140", "Not=A?Brand";v="24", "Google Chrome";v="140"',
-                "sec-ch-ua-mobile": "?0",
-                "sec-ch-ua-platform": '"macOS"',
-                "sec-fetch-dest": "empty",
-                "sec-fetch-mode": "cors",
-                "sec-fetch-site": "same-origin",
-                "sec-gpc": "1",
-                "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36",
-                "dnt": "1",
-                "priority": "u=1, i",
-                "x-requested-with": "XMLHttpRequest",
-                # no 'origin' header in HAR for this GET
-            }
+            alias_pairs = [
+                ("next-auth.session-token", "__Secure-next-auth.session-token"),
+                ("next-auth.csrf-token", "__Host-next-auth.csrf-token"),
+                ("next-auth.callback-url", "__Secure-next-auth.callback-url"),
+            ]
+            for alias, canon in alias_pairs:
+                if canon.endswith("session-token"):
+                    val = self.session.cookies.get(
+                        canon, domain=".wallapop.com", path="/"
+                    ) or self.session.cookies.get(
+                        canon, domain="es.wallapop.com", path="/"
+                    )
+                elif canon.endswith("csrf-token") or canon.endswith("callback-url"):
+                    val = self.session.cookies.get(
+                        canon, domain="es.wallapop.com", path="/"
+                    )
+                else:
+                    val = self.session.cookies.get(canon)
+                if val and not self.session.cookies.get(alias):
+                    ck = create_cookie(
+                        name=alias,
+                        value=val,
+                        domain="es.wallapop.com",
+                        path="/",
+                        secure=True,
+                    )
+                    self.session.cookies.set_cookie(ck)
+        except Exception:
+            pass
 
-            # Rely on session cookie handling (avoid manual Cookie header to not drop host-only cookies)
-            headers_with_cookies = dict(headers)
-            # Add x-csrf-token when available (extra parity)
-            try:
-                _csrf_tmp = self.session.cookies.get(
-                    "__Host-next-auth.csrf-token", domain="es.wallapop.com", path="/"
-                )
-                if _csrf_tmp:
-                    headers_with_cookies["x-csrf-token"] = _csrf_tmp
-            except Exception:
-                pass
+        # If we already have an accessToken cookie, surface it as X-RefreshSession (webapp behavior)
+        try:
+            existing_access = self.session.cookies.get(
+                "accessToken", domain=".wallapop.com", path="/"
+            )
+            if existing_access:
+                headers_with_cookies["X-RefreshSession"] = existing_access
+        except Exception:
+            pass
+        return headers_with_cookies
+
+    def _refresh_warmup(self, headers_with_cookies: Dict[str, str]) -> None:
+        """Mirror browser initialization before federated-session (per HAR)."""
+        # Feature-flag warmups (as seen in HAR) to mirror browser initialization
+        try:
+            # Ensure callback-url points to app/chat like in HAR
             try:
-                jar = self.session.cookies
-                cb = jar.get(
+                self.session.cookies.set(
                     "__Secure-next-auth.callback-url",
+                    "https%3A%2F%2Fes.wallapop.com%2Fapp%2Fchat",
                     domain="es.wallapop.com",
                     path="/",
-                )
-                st = jar.get(
-                    "__Secure-next-auth.session-token", domain=".wallapop.com", path="/"
-                ) or jar.get(
-                    "__Secure-next-auth.session-token",
-                    domain="es.wallapop.com",
-                    path="/",
-                )
-                csrf = jar.get(
-                    "__Host-next-auth.csrf-token", domain="es.wallapop.com", path="/"
-                )
-                self.logger.debug(
-                    f"Cookie jar snapshot: callback-url={'yes' if cb else 'no'}; session-token={'yes' if st else 'no'}; csrf={'yes' if csrf else 'no'}"
+                    secure=True,
                 )
             except Exception:
                 pass
+            ff_headers = dict(headers_with_cookies)
+            ff_headers["referer"] = "https://es.wallapop.com/app/chat"
+            ff_headers["sec-fetch-site"] = "cross-site"
+            ff_headers.pop("origin", None)
+            for ff in (
+                "https://feature-flag.wallapop.com/api/v3/featureflag?featureFlags=tns_platform_keycloak_web_email_login",
+                "https://feature-flag.wallapop.com/api/v3/featureflag?featureFlags=tns_platform_keycloak_web_disable_recaptcha_login",
+            ):
+                with contextlib.suppress(Exception):
+                    self._http("GET", ff, headers=ff_headers, timeout=10)
+        except Exception:
+            pass
 
-            # Install alias cookie names (some backends may read non-prefixed names)
+        # Warm up app/chat as referer context (per HAR)
+        try:
+            self._http(
+                "GET",
+                "https://es.wallapop.com/app/chat",
+                headers=headers_with_cookies,
+                timeout=10,
+            )
+        except Exception:
+            pass
+
+        # Also hit /api/auth/session before federated-session (observed in HAR)
+        try:
+            self._http(
+                "GET",
+                "https://es.wallapop.com/api/auth/session",
+                headers=headers_with_cookies,
+                timeout=10,
+            )
+        except Exception:
+            pass
+
+    @staticmethod
+    def _extract_token_from_json(data: Dict[str, any]) -> Optional[str]:
+        if not isinstance(data, dict):
+            return None
+        if "token" in data and data["token"]:
+            return data["token"]
+        if "accessToken" in data and data["accessToken"]:
+            return data["accessToken"]
+        return None
+
+    def _extract_token_from_response(self, resp: requests.Response) -> Optional[str]:
+        # Try response.cookies first
+        try:
+            v = resp.cookies.get("accessToken")
+            if v:
+                return v
+        except Exception:
+            pass
+        # Then iterate all Set-Cookie headers
+        try:
+            headers_list = []
+            # urllib3 header dict
             try:
-                from requests.cookies import create_cookie
-
-                alias_pairs = [
-                    ("next-auth.session-token", "__Secure-next-auth.session-token"),
-                    ("next-auth.csrf-token", "__Host-next-auth.csrf-token"),
-                    ("next-auth.callback-url", "__Secure-next-auth.callback-url"),
-                ]
-                for alias, canon in alias_pairs:
-                    if canon.endswith("session-token"):
-                        val = self.session.cookies.get(
-                            canon, domain=".wallapop.com", path="/"
-                        ) or self.session.cookies.get(
-                            canon, domain="es.wallapop.com", path="/"
-                        )
-                    elif canon.endswith("csrf-token") or canon.endswith("callback-url"):
-                        val = self.session.cookies.get(
-                            canon, domain="es.wallapop.com", path="/"
-                        )
-                    else:
-                        val = self.session.cookies.get(canon)
-                    if val and not self.session.cookies.get(alias):
-                        ck = create_cookie(
-                            name=alias,
-                            value=val,
-                            domain="es.wallapop.com",
-                            path="/",
-                            secure=True,
-                        )
-                        self.session.cookies.set_cookie(ck)
+                headers_list = resp.raw.headers.getlist("Set-Cookie")  # type: ignore[attr-defined]
             except Exception:
                 pass
-
-            # If we already have an accessToken cookie, surface it as X-RefreshSession (webapp behavior)
+            # http.client.HTTPMessage
             try:
-                existing_access = self.session.cookies.get(
-                    "accessToken", domain=".wallapop.com", path="/"
-                )
-                if existing_access:
-                    headers_with_cookies["X-RefreshSession"] = existing_access
+                orig = getattr(resp.raw, "_original_response", None)
+                if orig is not None:
+                    hdrs = getattr(orig, "headers", None)
+                    if hdrs is not None:
+                        get_all = getattr(hdrs, "get_all", None)
+                        if callable(get_all):
+                            headers_list = headers_list + (get_all("Set-Cookie") or [])
             except Exception:
                 pass
-
-            # Feature-flag warmups (as seen in HAR) to mirror browser initialization
-            try:
-                # Ensure callback-url points to app/chat like in HAR
+            # Fallback single header
+            if not headers_list:
+                single = resp.headers.get("Set-Cookie")
+                if single:
+                    headers_list = [single]
+            if headers_list:
+                self.logger.debug(f"Set-Cookie headers present: {len(headers_list)}")
+                # Log cookie names for diagnostics
                 try:
-                    self.session.cookies.set(
-                        "__Secure-next-auth.callback-url",
-                        "https%3A%2F%2Fes.wallapop.com%2Fapp%2Fchat",
-                        domain="es.wallapop.com",
-                        path="/",
-                        secure=True,
-                    )
+                    names = []
+                    for sc in headers_list:
+                        nv = sc.split("=", 1)[0]
+                        names.append(nv.strip())
+                    self.logger.debug(f"Set-Cookie names: {names}")
                 except Exception:
                     pass
-                ff_headers = dict(headers_with_cookies)
-                ff_headers["referer"] = "https://es.wallapop.com/app/chat"
-                ff_headers["sec-fetch-site"] = "cross-site"
-                ff_headers.pop("origin", None)
-                for ff in (
-                    "https://feature-flag.wallapop.com/api/v3/featureflag?featureFlags=tns_platform_keycloak_web_email_login",
-                    "https://feature-flag.wallapop.com/api/v3/featureflag?featureFlags=tns_platform_keycloak_web_disable_recaptcha_login",
-                ):
-                    with contextlib.suppress(Exception):
-                        self.session.get(ff, headers=ff_headers, timeout=10)
-            except Exception:
-                pass
-
-            # Warm up app/chat as referer context (per HAR)
-            try:
-                self.session.get(
-                    "https://es.wallapop.com/app/chat",
-                    headers=headers_with_cookies,
-                    timeout=10,
-                )
-            except Exception:
-                pass
+            for sc in headers_list:
+                if "accessToken=" in sc:
+                    part = sc.split("accessToken=", 1)[1]
+                    return part.split(";", 1)[0]
+        except Exception:
+            pass
+        return None
 
-            # Also hit /api/auth/session before federated-session (observed in HAR)
-            try:
-                self.session.get(
-                    "https://es.wallapop.com/api/auth/session",
-                    headers=headers_with_cookies,
-                    timeout=10,
+    @staticmethod
+    def _extract_token_from_cookiejar(
+        jar: requests.cookies.RequestsCookieJar,
+    ) -> Optional[str]:
+        try:
+            for c in jar:
+                if c.name == "accessToken" and c.value:
+                    return c.value
+        except Exception:
+            pass
+        try:
+            return jar.get("accessToken")
+        except Exception:
+            return None
+
+    def _token_from_ok_response(
+        self, resp: requests.Response
+    ) -> Optional[Tuple[str, Optional[Dict[str, any]]]]:
+        """Token from a 200 response: JSON body first, then Set-Cookie, then the jar."""
+        if resp.status_code != 200:
+            return None
+        try:
+            data = resp.json() if resp.text else {}
+        except json.JSONDecodeError:
+            data = {}
+        token = self._extract_token_from_json(data)
+        if token:
+            return token, data
+        # Some flows set token only as cookie without JSON body
+        access_cookie = self._extract_token_from_response(
+            resp
+        ) or self._extract_token_from_cookiejar(self.session.cookies)
+        if access_cookie:
+            return access_cookie, None
+        return None
+
+    def _strategy_federated_session(self, headers_with_cookies: Dict[str, str]):
+        # First federated-session call with cache revalidation header (per HAR presence of If-None-Match)
+        headers_first = dict(headers_with_cookies)
+        # Use an ETag value observed in HAR to force content return versus minimal {}
+        headers_first["if-none-match"] = '"5c00u7sozwqp"'
+        # Add cache-busting param to avoid CloudFront cached minimal body
+        response = self._http(
+            "GET",
+            self.token_refresh_url,
+            headers=headers_first,
+            params={"_": str(int(time.time() * 1000))},
+        )
+        self._last_refresh_status = response.status_code
+        if response.status_code == 401:
+            raise _SessionExpired("Session cookies have expired - need fresh login")
+        if response.status_code != 200:
+            self.logger.warning(
+                f"federated-session returned {response.status_code}: {response.text[:200]}"
+            )
+            return None
+        found = self._token_from_ok_response(response)
+        if found:
+            if found[1] is None:
+                self.logger.info(
+                    "Token obtained from accessToken cookie after federated-session"
                 )
-            except Exception:
-                pass
-
-            # First federated-session call with cache revalidation header (per HAR presence of If-None-Match)
-            headers_first = dict(headers_with_cookies)
-            # Use an ETag value observed in HAR to force content return versus minimal {}
-            headers_first["if-none-match"] = '"5c00u7sozwqp"'
-            # Add cache-busting param to avoid CloudFront cached minimal body
-            import time as _time
-
-            response = self.session.get(
+            return found
+        try:
+            data = response.json() if response.text else {}
+        except json.JSONDecodeError:
+            data = {}
+        try:
+            hdr_names = list(response.headers.keys())[:20]
+            jar_names = [c.name for c in self.session.cookies]
+            self.logger.warning(f"No token in federated-session response: {data}")
+            self.logger.debug(f"Response headers (first 20): {hdr_names}")
+            self.logger.debug(f"Cookie jar names: {jar_names}")
+        except Exception:
+            self.logger.warning(f"No token in federated-session response: {data}")
+        return None
+
+    def _strategy_federated_session_query(self, headers_with_cookies: Dict[str, str]):
+        # Fallback: call federated-session with session token as query param
+        # Support both single and double underscore variants
+        session_cookie = (
+            self.session.cookies.get(
+                "_Secure-next-auth.session-token",
+                domain=".wallapop.com",
+                path="/",
+            )
+            or self.session.cookies.get(
+                "__Secure-next-auth.session-token",
+                domain=".wallapop.com",
+                path="/",
+            )
+            or self.session.cookies.get(
+                "_Secure-next-auth.session-token",
+                domain="es.wallapop.com",
+                path="/",
+            )
+            or self.session.cookies.get(
+                "__Secure-next-auth.session-token",
+                domain="es.wallapop.com",
+                path="/",
+            )
+        )
+        if not session_cookie:
+            return None
+        try:
+            resp_q = self._http(
+                "GET",
                 self.token_refresh_url,
-                headers=headers_first,
-                params={"_": str(int(_time.time() * 1000))},
+                headers=headers_with_cookies,
+                params={"token": session_cookie},
             )
+            found = self._token_from_ok_response(resp_q)
+            if found:
+                self.logger.info("Token obtained from federated-session?token=...")
+            return found
+        except Exception as qe:
+            self.logger.debug(f"Query token fallback error: {qe}")
+            return None
+
+    def _strategy_federated_session_after_provoke(
+        self, headers_with_cookies: Dict[str, str]
+    ):
+        # Provoke refresh path AFTER first federated-session (per HAR)
+        try:
+            csrf = self.session.cookies.get(
+                "__Host-next-auth.csrf-token", domain="es.wallapop.com", path="/"
+            )
+            provoke_headers = dict(headers_with_cookies)
+            provoke_headers["referer"] = "https://es.wallapop.com/app/chat"
+            provoke_headers["origin"] = "https://es.wallapop.com"
+            if csrf:
+                provoke_headers["x-csrf-token"] = csrf
+            device_id = self.session.cookies.get("device_id")
+            if device_id:
+                provoke_headers["X-DeviceID"] = device_id
+            provoke_headers["DeviceOS"] = "0"
+            provoke_headers["X-DeviceOS"] = "0"
+            provoke_headers["X-AppVersion"] = "810840"
+            provoke_headers["sec-fetch-site"] = "same-site"
+            provoke_headers["sec-fetch-mode"] = "cors"
+            provoke_headers["sec-fetch-dest"] = "empty"
+            for purl in (
+                "https://api.wallapop.com/api/v3/instant-messaging/messages/unread",
+                "https://api.wallapop.com/api/v3/users/me/",
+            ):
+                with contextlib.suppress(Exception):
+                    self._http("GET", purl, headers=provoke_headers, timeout=10)
+        except Exception:
+            pass
 
-            def _extract_token_from_json(data: Dict[str, any]) -> Optional[str]:
-                if not isinstance(data, dict):
-                    return None
-                if "token" in data and data["token"]:
-                    return data["token"]
-                if "accessToken" in data and data["accessToken"]:
-                    return data["accessToken"]
-                return None
-
-            def _extract_token_from_response(resp: requests.Response) -> Optional[str]:
-                # Try response.cookies first
-                try:
-                    v = resp.cookies.get("accessToken")
-                    if v:
-                        return v
-                except Exception:
-                    pass
-                # Then iterate all Set-Cookie headers
-                try:
-                    headers_list = []
-                    # urllib3 header dict
-                    try:
-                        headers_list = resp.raw.headers.getlist("Set-Cookie")  # type: ignore[attr-defined]
-                    except Exception:
-                        pass
-                    # http.client.HTTPMessage
-                    try:
-                        orig = getattr(resp.raw, "_original_response", None)
-                        if orig is not None:
-                            hdrs = getattr(orig, "headers", None)
-                            if hdrs is not None:
-                                get_all = getattr(hdrs, "get_all", None)
-                                if callable(get_all):
-                                    headers_list = headers_list + (
-                                        get_all("Set-Cookie") or []
-                                    )
-                    except Exception:
-                        pass
-                    # Fallback single header
-                    if not headers_list:
-                        single = resp.headers.get("Set-Cookie")
-                        if single:
-                            headers_list = [single]
-                    if headers_list:
-                        self.logger.debug(
-                            f"Set-Cookie headers present: {len(headers_list)}"
-                        )
-                        # Log cookie names for diagnostics
-                        try:
-                            names = []
-                            for sc in headers_list:
-                                nv = sc.split("=", 1)[0]
-                                names.append(nv.strip())
-                            self.logger.debug(f"Set-Cookie names: {names}")
-                        except Exception:
-                            pass
-                    for sc in headers_list:
-                        if "accessToken=" in sc:
-                            part = sc.split("accessToken=", 1)[1]
-                            return part.split(";", 1)[0]
-                except Exception:
-                    pass
-                return None
+        # Second federated-session attempt (mirrors HAR pattern)
+        response = self._http(
+            "GET",
+            self.token_refresh_url,
+            headers=headers_with_cookies,
+            params={"_": str(int(time.time() * 1000))},
+        )
+        self._last_refresh_status = response.status_code
+        return self._token_from_ok_response(response)
 
-            def _extract_token_from_cookiejar(
-                jar: requests.cookies.RequestsCookieJar,
-            ) -> Optional[str]:
-                try:
-                    for c in jar:
-                        if c.name == "accessToken" and c.value:
-                            return c.value
-                except Exception:
-                    pass
-                try:
-                    return jar.get("accessToken")
-                except Exception:
-                    return None
-
-            def _handle_success(
-                token: str, extra_info: Optional[Dict[str, any]] = None
-            ) -> Tuple[bool, Optional[str]]:
-                self.current_token = token
-                # Set token expiration (5 minutes from now)
-                self.token_expires_at = datetime.now() + timedelta(
-                    minutes=self.token_lifetime_minutes
-                )
-                if extra_info and "expires" in extra_info:
-                    self.logger.info(f"Session expires: {extra_info.get('expires')}")
-                self.logger.info("Token refreshed successfully")
-                self.logger.info(f"Token expires at: {self.token_expires_at}")
-                # Also set cookie (some flows expect it)
-                try:
-                    self.session.cookies.set(
-                        "accessToken", token, domain=".wallapop.com"
-                    )
-                except Exception:
-                    pass
-                return True, token
+    def _strategy_http2(self, headers_with_cookies: Dict[str, str]):
+        # Try HTTP/2 call via httpx as a fallback if available; mirror headers and cookies
+        if not self._http2_available:
+            return None
+        try:
+            import httpx  # type: ignore
 
-            # Parse federated-session response
-            if response.status_code == 200:
-                try:
-                    data = response.json() if response.text else {}
-                except json.JSONDecodeError:
-                    data = {}
-                token = _extract_token_from_json(data)
-                if token:
-                    return _handle_success(token, data)
-                # Some flows set token only as cookie without JSON body
-                access_cookie = _extract_token_from_response(
-                    response
-                ) or _extract_token_from_cookiejar(self.session.cookies)
-                if access_cookie:
-                    self.logger.info(
-                        "Token obtained from accessToken cookie after federated-session"
-                    )
-                    return _handle_success(access_cookie)
+            # Build cookie dict from jar
+            jar_cookies = {}
+            for c in self.session.cookies:
+                jar_cookies[c.name] = c.value
+            with httpx.Client(
+                http2=True,
+                headers=headers_with_cookies,
+                cookies=jar_cookies,
+                timeout=10.0,
+            ) as hx:
+                started = time.perf_counter()
                 try:
-                    hdr_names = list(response.headers.keys())[:20]
-                    jar_names = [c.name for c in self.session.cookies]
-                    self.logger.warning(
-                        f"No token in federated-session response: {data}"
-                    )
-                    self.logger.debug(f"Response headers (first 20): {hdr_names}")
-                    self.logger.debug(f"Cookie jar names: {jar_names}")
+                    hresp = hx.get(self.token_refresh_url)
                 except Exception:
-                    self.logger.warning(
-                        f"No token in federated-session response: {data}"
-                    )
-                # Fallback: call federated-session with session token as query param
-                # Support both single and double underscore variants
-                session_cookie = (
-                    self.session.cookies.get(
-                        "_Secure-next-auth.session-token",
-                        domain=".wallapop.com",
-                        path="/",
-                    )
-                    or self.session.cookies.get(
-                        "__Secure-next-auth.session-token",
-                        domain=".wallapop.com",
-                        path="/",
-                    )
-                    or self.session.cookies.get(
-                        "_Secure-next-auth.session-token",
-                        domain="es.wallapop.com",
-                        path="/",
-                    )
-                    or self.session.cookies.get(
-                        "__Secure-next-auth.session-token",
-                        domain="es.wallapop.com",
-                        path="/",
+                    self.metrics.record(
+                        "GET",
+                        self.token_refresh_url,
+                        "error",
+                        time.perf_counter() - started,
                     )
+                    raise
+                self.metrics.record(
+                    "GET",
+                    self.token_refresh_url,
+                    hresp.status_code,
+                    time.perf_counter() - started,
                 )
-                if session_cookie:
+                if hresp.status_code == 200:
                     try:
-                        resp_q = self.session.get(
-                            self.token_refresh_url,
-                            headers=headers_with_cookies,
-                            params={"token": session_cookie},
+                        hdata = hresp.json() if hresp.text else {}
+                    except Exception:
+                        hdata = {}
+                    htok = hdata.get("token") or hdata.get("accessToken")
+                    if htok:
+                        self.logger.info(
+                            "Token obtained from federated-session over HTTP/2 (httpx)"
                         )
-                        if resp_q.status_code == 200:
-                            try:
-                                d2 = resp_q.json() if resp_q.text else {}
-                            except json.JSONDecodeError:
-                                d2 = {}
-                            tok2 = _extract_token_from_json(d2)
-                            if tok2:
-                                self.logger.info(
-                                    "Token obtained from federated-session?token=..."
-                                )
-                                return _handle_success(tok2, d2)
-                            # Check cookie again
-                            acc2 = _extract_token_from_response(
-                                resp_q
-                            ) or _extract_token_from_cookiejar(self.session.cookies)
-                            if acc2:
-                                self.logger.info(
-                                    "Token cookie set after federated-session?token=..."
-                                )
-                                return _handle_success(acc2)
-                    except Exception as qe:
-                        self.logger.debug(f"Query token fallback error: {qe}")
-            elif response.status_code == 401:
-                error_msg = "Session cookies have expired - need fresh login"
-                self.logger.error(error_msg)
-                return False, error_msg
-            else:
-                self.logger.warning(
-                    f"federated-session returned {response.status_code}: {response.text[:200]}"
-                )
+                        return htok, hdata
+                    # Check cookies from httpx response
+                    acc = hresp.cookies.get("accessToken")
+                    if acc:
+                        self.logger.info("Token cookie from httpx HTTP/2 response")
+                        return acc, None
+        except Exception as e:
+            self.logger.debug(f"httpx HTTP/2 fallback error: {e}")
+        return None
+
+    def _strategy_fallback_endpoints(self, headers_with_cookies: Dict[str, str]):
+        # Fallback attempts (seen in HAR/old client)
+        fallback_endpoints = [
+            ("https://es.wallapop.com/api/auth/session", "session"),
+            ("https://es.wallapop.com/api/auth/token", "token"),
+            ("https://es.wallapop.com/api/auth/refresh", "refresh"),
+            ("https://es.wallapop.com/api/v3/me", "me"),
+            ("https://es.wallapop.com/api/v3/general/navigation", "navigation"),
+            # Mimic webapp navigations which, per HAR, precede successful token issuance
+            ("https://es.wallapop.com/app/chat", "app_chat"),
+            (
+                "https://es.wallapop.com/app/catalog/published",
+                "app_catalog_published",
+            ),
+        ]
+        for url, name in fallback_endpoints:
+            try:
+                resp = self._http("GET", url, headers=headers_with_cookies)
+                if resp.status_code == 200:
+                    # Sometimes hitting these endpoints sets cookies used by federated-session
+                    found = self._token_from_ok_response(resp)
+                    if found:
+                        self.logger.info(f"Token obtained from {name} endpoint")
+                        return found
+                else:
+                    self.logger.debug(f"{name} endpoint status {resp.status_code}")
+            except Exception as e:
+                self.logger.debug(f"{name} endpoint error: {e}")
+        return None
+
+    def _strategy_federated_session_retry(self, headers_with_cookies: Dict[str, str]):
+        # As a last resort, try federated-session once more after fallbacks
+        response2 = self._http(
+            "GET", self.token_refresh_url, headers=headers_with_cookies
+        )
+        return self._token_from_ok_response(response2)
 
-            # Provoke refresh path AFTER first federated-session (per HAR)
+    def _strategy_access_refresh(self, headers_with_cookies: Dict[str, str]):
+        # Webapp also references an access refresh endpoint under API v3; try it explicitly
+        try:
+            refresh_url = "https://api.wallapop.com/api/v3/access/refresh"
+            headers_refresh = dict(headers_with_cookies)
+            # Prefer deviceAccessToken cookie if present; fallback to device_id
+            device_access = None
             try:
-                csrf = self.session.cookies.get(
-                    "__Host-next-auth.csrf-token", domain="es.wallapop.com", path="/"
+                device_access = self.session.cookies.get(
+                    "deviceAccessToken", domain=".wallapop.com", path="/"
                 )
-                provoke_headers = dict(headers_with_cookies)
-                provoke_headers["referer"] = "https://es.wallapop.com/app/chat"
-                provoke_headers["origin"] = "https://es.wallapop.com"
-                if csrf:
-                    provoke_headers["x-csrf-token"] = csrf
-                device_id = self.session.cookies.get("device_id")
-                if device_id:
-                    provoke_headers["X-DeviceID"] = device_id
-                provoke_headers["DeviceOS"] = "0"
-                provoke_headers["X-DeviceOS"] = "0"
-                provoke_headers["X-AppVersion"] = "810840"
-                provoke_headers["sec-fetch-site"] = "same-site"
-                provoke_headers["sec-fetch-mode"] = "cors"
-                provoke_headers["sec-fetch-dest"] = "empty"
-                for purl in (
-                    "https://api.wallapop.com/api/v3/instant-messaging/messages/unread",
-                    "https://api.wallapop.com/api/v3/users/me/",
-                ):
-                    with contextlib.suppress(Exception):
-                        self.session.get(purl, headers=provoke_headers, timeout=10)
             except Exception:
-                pass
+                device_access = None
+            device_id = self.session.cookies.get("device_id")
+            if device_access:
+                headers_refresh["X-DeviceToken"] = device_access
+            elif device_id:
+                headers_refresh["X-DeviceToken"] = device_id
+            # Send both referer/origin as webapp
+            headers_refresh["referer"] = "https://es.wallapop.com/app/catalog/published"
+            headers_refresh["origin"] = "https://es.wallapop.com"
+            headers_refresh["content-type"] = "application/json"
+            # Try POST first (405 observed on GET)
+            rresp = self._http("POST", refresh_url, headers=headers_refresh, json={})
+            if rresp.status_code == 405:
+                # Fallback to GET if POST not allowed
+                rresp = self._http("GET", refresh_url, headers=headers_refresh)
+            if rresp.status_code == 200:
+                found = self._token_from_ok_response(rresp)
+                if found:
+                    self.logger.info("Token obtained from api/v3/access/refresh")
+                return found
+            self.logger.debug(f"access/refresh status {rresp.status_code}")
+        except Exception as e:
+            self.logger.debug(f"access/refresh error: {e}")
+        return None
 
-            # Second federated-session attempt (mirrors HAR pattern)
-            response = self.session.get(
-                self.token_refresh_url,
-                headers=headers_with_cookies,
-                params={"_": str(int(_time.time() * 1000))},
+    def _strategy_nudge(self, headers_with_cookies: Dict[str, str]):
+        # One more nudge: call /api/v3/users/me which often forces access token refresh
+        try:
+            csrf = self.session.cookies.get("__Host-next-auth.csrf-token")
+            headers_nudge = dict(headers_with_cookies)
+            if csrf:
+                headers_nudge["x-csrf-token"] = csrf
+            nudge = self._http(
+                "GET",
+                "https://api.wallapop.com/api/v3/users/me/",
+                headers=headers_nudge,
             )
+            if nudge.status_code == 200:
+                nudge_token = self._extract_token_from_response(
+                    nudge
+                ) or self._extract_token_from_cookiejar(self.session.cookies)
+                if nudge_token:
+                    self.logger.info("Token obtained after nudge /api/v3/users/me")
+                    return nudge_token, None
+            # Retry federated-session once more after nudge
+            response3 = self._http(
+                "GET", self.token_refresh_url, headers=headers_with_cookies
+            )
+            return self._token_from_ok_response(response3)
+        except Exception:
+            return None
+
+    def _strategy_browser(self, headers_with_cookies: Dict[str, str]):
+        # Final attempt: try a headless browser to mimic the app precisely
+        success, token = self._browser_fallback_fetch_token()
+        if success and token:
+            return token, None
+        return None
+
+    def _handle_refresh_success(
+        self, token: str, extra_info: Optional[Dict[str, any]] = None
+    ) -> Tuple[bool, Optional[str]]:
+        self.current_token = token
+        # Prefer the JWT exp claim; otherwise assume the usual 5-minute lifetime
+        self.token_expires_at = _jwt_expiry(token) or (
+            datetime.now() + timedelta(minutes=self.token_lifetime_minutes)
+        )
+        if extra_info and "expires" in extra_info:
+            self.logger.info(f"Session expires: {extra_info.get('expires')}")
+        self.logger.info("Token refreshed successfully")
+        self.logger.info(f"Token expires at: {self.token_expires_at}")
+        # Also set cookie (some flows expect it)
+        try:
+            self.session.cookies.set("accessToken", token, domain=".wallapop.com")
+        except Exception:
+            pass
+        self._save_token()
+        return True, token
 
-            # Try HTTP/2 call via httpx as a fallback if available; mirror headers and cookies
-            if self._http2_available:
-                try:
-                    import httpx  # type: ignore
-
-                    # Build cookie dict from jar
-                    jar_cookies = {}
-                    for c in self.session.cookies:
-                        jar_cookies[c.name] = c.value
-                    with httpx.Client(
-                        http2=True,
-                        headers=headers_with_cookies,
-                        cookies=jar_cookies,
-                        timeout=10.0,
-                    ) as hx:
-                        hresp = hx.get(self.token_refresh_url)
-                        if hresp.status_code == 200:
-                            try:
-                                hdata = hresp.json() if hresp.text else {}
-                            except Exception:
-                                hdata = {}
-                            htok = hdata.get("token") or hdata.get("accessToken")
-                            if htok:
-                                self.logger.info(
-                                    "Token obtained from federated-session over HTTP/2 (httpx)"
-                                )
-                                return _handle_success(htok, hdata)
-                            # Check cookies from httpx response
-                            acc = hresp.cookies.get("accessToken")
-                            if acc:
-                                self.logger.info(
-                                    "Token cookie from httpx HTTP/2 response"
-                                )
-                                return _handle_success(acc)
-                except Exception as e:
-                    self.logger.debug(f"httpx HTTP/2 fallback error: {e}")
-
-            # Fallback attempts (seen in HAR/old client)
-            fallback_endpoints = [
-                ("https://es.wallapop.com/api/auth/session", "session"),
-                ("https://es.wallapop.com/api/auth/token", "token"),
-                ("https://es.wallapop.com/api/auth/refresh", "refresh"),
-                ("https://es.wallapop.com/api/v3/me", "me"),
-                ("https://es.wallapop.com/api/v3/general/navigation", "navigation"),
-                # Mimic webapp navigations which, per HAR, precede successful token issuance
-                ("https://es.wallapop.com/app/chat", "app_chat"),
-                (
-                    "https://es.wallapop.com/app/catalog/published",
-                    "app_catalog_published",
+    def _load_refresh_stats(self) -> Dict[str, Dict[str, float]]:
+        if self._refresh_stats is None:
+            self._refresh_stats = {}
+            try:
+                if self.refresh_stats_file.exists():
+                    with open(self.refresh_stats_file, "r") as f:
+                        data = json.load(f)
+                    if isinstance(data, dict):
+                        self._refresh_stats = data
+            except Exception as e:
+                self.logger.debug(f"Ignoring unreadable refresh stats: {e}")
+        return self._refresh_stats
+
+    def _record_refresh_attempt(
+        self, strategy: str, success: bool, seconds: float
+    ) -> None:
+        stats = self._load_refresh_stats()
+        entry = stats.setdefault(
+            strategy,
+            {
+                "successes": 0,
+                "failures": 0,
+                "success_seconds": 0.0,
+                "last_success": None,
+            },
+        )
+        if success:
+            entry["successes"] += 1
+            entry["success_seconds"] += seconds
+            entry["last_success"] = datetime.now().isoformat()
+        else:
+            entry["failures"] += 1
+
+    def _save_refresh_stats(self) -> None:
+        if self._refresh_stats is None:
+            return
+        try:
+            tmp_path = self.refresh_stats_file.with_name(
+                self.refresh_stats_file.name + ".tmp"
+            )
+            with open(tmp_path, "w") as f:
+                json.dump(self._refresh_stats, f, indent=2)
+            os.replace(tmp_path, self.refresh_stats_file)
+        except Exception as e:
+            self.logger.debug(f"Could not save refresh stats: {e}")
+
+    def get_refresh_stats(self) -> Dict[str, Dict[str, any]]:
+        """Per-strategy refresh statistics (attempt counts and mean success latency)."""
+        summary = {}
+        for name, entry in self._load_refresh_stats().items():
+            successes = entry.get("successes", 0)
+            summary[name] = {
+                "successes": successes,
+                "failures": entry.get("failures", 0),
+                "mean_success_seconds": (
+                    entry.get("success_seconds", 0.0) / successes if successes else None
                 ),
-            ]
-            for url, name in fallback_endpoints:
-                try:
-                    resp = self.session.get(url, headers=headers_with_cookies)
-                    if resp.status_code == 200:
-                        try:
-                            d = resp.json() if resp.text else {}
-                        except json.JSONDecodeError:
-                            d = {}
-                        token = _extract_token_from_json(d)
-                        if token:
-                            self.logger.info(f"Token obtained from {name} endpoint")
-                            return _handle_success(token, d)
-                        # Sometimes hitting these endpoints sets cookies used by federated-session
-                        current_access_cookie = _extract_token_from_response(
-                            resp
-                        ) or _extract_token_from_cookiejar(self.session.cookies)
-                        if current_access_cookie:
-                            self.logger.info(
-                                f"Found accessToken cookie after hitting {name} endpoint"
-                            )
-                            return _handle_success(current_access_cookie)
-                    else:
-                        self.logger.debug(f"{name} endpoint status {resp.status_code}")
-                except Exception as e:
-                    self.logger.debug(f"{name} endpoint error: {e}")
+                "last_success": entry.get("last_success"),
+            }
+        return summary
 
-            # As a last resort, try federated-session once more after fallbacks
-            response2 = self.session.get(
-                self.token_refresh_url, headers=headers_with_cookies
+    def preferred_refresh_strategy(self) -> Optional[str]:
+        """Historically fastest strategy that usually succeeds, if any.
+
+        The browser fallback is never preferred: it is orders of magnitude slower and
+        only meant as the last step of the full sequence.
+        """
+        best, best_seconds = None, None
+        for name, entry in self.get_refresh_stats().items():
+            if name == "browser" or name not in self.REFRESH_STRATEGIES:
+                continue
+            if not entry["successes"] or entry["failures"] > entry["successes"]:
+                continue
+            if best_seconds is None or entry["mean_success_seconds"] < best_seconds:
+                best, best_seconds = name, entry["mean_success_seconds"]
+        return best
+
+    def _run_refresh_strategy(
+        self, name: str, headers_with_cookies: Dict[str, str]
+    ) -> Optional[Tuple[str, Optional[Dict[str, any]]]]:
+        started = time.perf_counter()
+        found = None
+        try:
+            found = getattr(self, f"_strategy_{name}")(headers_with_cookies)
+        finally:
+            self._record_refresh_attempt(
+                name, bool(found), time.perf_counter() - started
             )
-            if response2.status_code == 200:
-                try:
-                    data2 = response2.json() if response2.text else {}
-                except json.JSONDecodeError:
-                    data2 = {}
-                token2 = _extract_token_from_json(data2)
-                if token2:
-                    return _handle_success(token2, data2)
-                # Final cookie check from response/jar
-                acc3 = _extract_token_from_response(
-                    response2
-                ) or _extract_token_from_cookiejar(self.session.cookies)
-                if acc3:
-                    return _handle_success(acc3)
-            # Webapp also references an access refresh endpoint under API v3; try it explicitly
-            try:
-                refresh_url = "https://api.wallapop.com/api/v3/access/refresh"
-                headers_refresh = dict(headers_with_cookies)
-                # Prefer deviceAccessToken cookie if present; fallback to device_id
-                device_access = None
-                try:
-                    device_access = self.session.cookies.get(
-                        "deviceAccessToken", domain=".wallapop.com", path="/"
-                    )
-                except Exception:
-                    device_access = None
-                if device_access:
-                    headers_refresh["X-DeviceToken"] = device_access
-                elif device_id:
-                    headers_refresh["X-DeviceToken"] = device_id
-                # Send both referer/origin as webapp
-                headers_refresh["referer"] = (
-                    "https://es.wallapop.com/app/catalog/published"
-                )
-                headers_refresh["origin"] = "https://es.wallapop.com"
-                headers_refresh["content-type"] = "application/json"
-                # Try POST first (405 observed on GET)
-                rresp = self.session.post(refresh_url, headers=headers_refresh, json={})
-                if rresp.status_code == 405:
-                    # Fallback to GET if POST not allowed
-                    rresp = self.session.get(refresh_url, headers=headers_refresh)
-                if rresp.status_code == 200:
-                    try:
-                        rdata = rresp.json() if rresp.text else {}
-                    except json.JSONDecodeError:
-                        rdata = {}
-                    rtoken = _extract_token_from_json(rdata)
-                    if rtoken:
-                        self.logger.info("Token obtained from api/v3/access/refresh")
-                        return _handle_success(rtoken, rdata)
-                    racc = _extract_token_from_response(
-                        rresp
-                    ) or _extract_token_from_cookiejar(self.session.cookies)
-                    if racc:
-                        self.logger.info("Token cookie set by api/v3/access/refresh")
-                        return _handle_success(racc)
-                else:
-                    self.logger.debug(f"access/refresh status {rresp.status_code}")
-            except Exception as e:
-                self.logger.debug(f"access/refresh error: {e}")
-            # One more nudge: call /api/v3/users/me which often forces access token refresh
-            try:
-                csrf = self.session.cookies.get("__Host-next-auth.csrf-token")
-                headers_nudge = dict(headers_with_cookies)
-                if csrf:
-                    headers_nudge["x-csrf-token"] = csrf
-                nudge = self.session.get(
-                    "https://api.wallapop.com/api/v3/users/me/", headers=headers_nudge
-                )
-                if nudge.status_code == 200:
-                    nudge_token = _extract_token_from_response(
-                        nudge
-                    ) or _extract_token_from_cookiejar(self.session.cookies)
-                    if nudge_token:
-                        self.logger.info("Token obtained after nudge /api/v3/users/me")
-                        return _handle_success(nudge_token)
-                # Retry federated-session once more after nudge
-                response3 = self.session.get(
-                    self.token_refresh_url, headers=headers_with_cookies
-                )
-                if response3.status_code == 200:
-                    try:
-                        data3 = response3.json() if response3.text else {}
-                    except json.JSONDecodeError:
-                        data3 = {}
-                    token3 = _extract_token_from_json(data3)
-                    if token3:
-                        return _handle_success(token3, data3)
-                    token3c = _extract_token_from_response(
-                        response3
-                    ) or _extract_token_from_cookiejar(self.session.cookies)
-                    if token3c:
-                        return _handle_success(token3c)
-            except Exception:
-                pass
+        if found:
+            self.last_refresh_strategy = name
+        return found
+
+    def refresh_access_token(self) -> Tuple[bool, Optional[str]]:
+        """
+        Refresh the access token using persistent session
+
+        The strategy that succeeded most quickly in previous runs is tried first,
+        without the warmup calls. If it fails (or there is no history yet), the full
+        HAR-mirroring sequence runs: warmups followed by every strategy in
+        REFRESH_STRATEGIES order.
 
-            # Final attempt: try a headless browser to mimic the app precisely
-            success, token = self._browser_fallback_fetch_token()
-            if success and token:
-                return _handle_success(token)
-            error_msg = f"Token refresh failed after fallbacks: {response.status_code}"
+        Returns:
+            Tuple[bool, Optional[str]]: (success, token_or_error_message)
+        """
+        if not self.session:
+            return False, "No session available"
+
+        try:
+            self.logger.info("Refreshing access token...")
+            self._last_refresh_status = None
+            headers_with_cookies = self._refresh_headers()
+
+            preferred = self.preferred_refresh_strategy()
+            if preferred:
+                self.logger.debug(f"Trying fast-path refresh strategy: {preferred}")
+                found = self._run_refresh_strategy(preferred, headers_with_cookies)
+                if found:
+                    return self._handle_refresh_success(*found)
+
+            self._refresh_warmup(headers_with_cookies)
+            for name in self.REFRESH_STRATEGIES:
+                found = self._run_refresh_strategy(name, headers_with_cookies)
+                if found:
+                    return self._handle_refresh_success(*found)
+
+            error_msg = (
+                f"Token refresh failed after fallbacks: {self._last_refresh_status}"
+            )
             self.logger.error(error_msg)
             return False, error_msg
 
+        except _SessionExpired as e:
+            error_msg = str(e)
+            self.logger.error(error_msg)
+            return False, error_msg
         except Exception as e:
             error_msg = f"Token refresh error: {e}"
             self.logger.error(error_msg)
             return False, error_msg
+        finally:
+            self._save_refresh_stats()
+
+    def session_identity(self) -> Optional[str]:
+        """Hash of the NextAuth session-token cookie identifying the logged-in account.
+
+        Also part of the WallapopClient HTTP cache key, so one account never
+        gets another account's cached listing.
+        """
+        if not self.session:
+            return None
+        try:
+            value = None
+            for c in self.session.cookies:
+                if c.name in (
+                    "__Secure-next-auth.session-token",
+                    "_Secure-next-auth.session-token",
+                ):
+                    value = c.value
+                    break
+            if not value:
+                return None
+            return hashlib.sha256(value.encode("utf-8")).hexdigest()
+        except Exception:
+            return None
+
+    def _save_token(self) -> None:
+        """Persist the current access token and its expiry (owner-only permissions)."""
+        if not self.current_token or not self.token_expires_at:
+            return
+        data = {
+            "token": self.current_token,
+            "expires_at": self.token_expires_at.timestamp(),
+            "session": self.session_identity(),
+        }
+        tmp_path = self.token_file.with_name(self.token_file.name + ".tmp")
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.token_file)
+            with contextlib.suppress(Exception):
+                os.chmod(self.token_file, 0o600)
+        except Exception as e:
+            self.logger.debug(f"Could not persist access token: {e}")
+            with contextlib.suppress(Exception):
+                os.unlink(tmp_path)
+
+    def _load_token(self) -> bool:
+        """Reuse an access token saved by a previous run if it belongs to this session and is still valid."""
+        try:
+            if not self.token_file.exists():
+                return False
+            with open(self.token_file, "r") as f:
+                data = json.load(f)
+            token = data.get("token")
+            expires_at = datetime.fromtimestamp(float(data.get("expires_at")))
+            identity = self.session_identity()
+            if not token or not identity or data.get("session") != identity:
+                return False
+            if datetime.now() >= expires_at - timedelta(
+                seconds=self.refresh_buffer_seconds
+            ):
+                return False
+        except Exception as e:
+            self.logger.debug(f"Ignoring saved access token: {e}")
+            return False
+
+        self.current_token = token
+        self.token_expires_at = expires_at
+        with contextlib.suppress(Exception):
+            self.session.cookies.set("accessToken", token, domain=".wallapop.com")
+        self.logger.info(f"Reusing saved access token (expires at {expires_at})")
+        return True
 
     def get_valid_token(self) -> Tuple[bool, Optional[str]]:
         """
         Get a valid access token, refreshing if necessary
 
+        Concurrent callers that find the token expired share a single refresh
+        (see refresh_token_single_flight).
+
         Returns:
             Tuple[bool, Optional[str]]: (success, token_or_error_message)
         """
@@ -974,16 +1200,89 @@ class SessionPersistenceManager:
             if not self.load_session():
                 return False, "Failed to load session"
 
-        # Check if we need to refresh the token
-        if self.needs_token_refresh():
-            return self.refresh_access_token()
+        # Check if we need to refresh the token (a token saved by a previous run may still be valid)
+        if self.needs_token_refresh() and not self._load_token():
+            return self.refresh_token_single_flight()
 
         # Return current token if still valid
         if self.current_token:
             return True, self.current_token
 
         # First time - need to get initial token
-        return self.refresh_access_token()
+        return self.refresh_token_single_flight()
+
+    def refresh_token_single_flight(
+        self, stale_token: Optional[str] = None
+    ) -> Tuple[bool, Optional[str]]:
+        """Refresh the token, coalescing concurrent callers onto one refresh.
+
+        Callers that arrive while a refresh is in flight wait for it and receive its
+        result instead of starting their own. ``stale_token`` is the token a caller
+        saw rejected (e.g. on 401): if another thread already replaced it, the new
+        token is returned without refreshing again. Every forced refresh (sync and
+        async 401 handling, WallapopClient.refresh_session) goes through here; only
+        the login flows that have just stored new cookies refresh directly.
+        """
+        generation = self._refresh_generation
+        with self._refresh_lock:
+            if self._refresh_generation != generation and self._last_refresh_result:
+                # Joined a refresh that completed while we were waiting
+                return self._last_refresh_result
+            if (
+                self.current_token
+                and self.current_token != stale_token
+                and not self.needs_token_refresh()
+            ):
+                return True, self.current_token
+            result = self.refresh_access_token()
+            self._last_refresh_result = result
+            self._refresh_generation += 1
+            return result
+
+    def start_background_refresh(self, lead_seconds: Optional[float] = None) -> None:
+        """Renew the access token in a daemon thread ahead of its expiry.
+
+        The token is refreshed ``lead_seconds`` (default: twice the refresh buffer)
+        before it expires, so request threads never hit the refresh inline.
+        """
+        if self._background_thread and self._background_thread.is_alive():
+            return
+        lead = (
+            lead_seconds
+            if lead_seconds is not None
+            else 2 * self.refresh_buffer_seconds
+        )
+        self._background_stop.clear()
+
+        def run():
+            while not self._background_stop.is_set():
+                expires_at = self.token_expires_at
+                if self.current_token and expires_at:
+                    wait = (expires_at - datetime.now()).total_seconds() - lead
+                else:
+                    wait = 0
+                if wait > 0:
+                    # Wake up early at most every minute in case the token was replaced
+                    self._background_stop.wait(min(wait, 60))
+                    continue
+                ok, error = self.refresh_token_single_flight(
+                    stale_token=self.current_token
+                )
+                if not ok:
+                    self.logger.warning(f"Background token refresh failed: {error}")
+                    self._background_stop.wait(self.background_retry_seconds)
+
+        self._background_thread = threading.Thread(
+            target=run, name="wallapop-token-refresh", daemon=True
+        )
+        self._background_thread.start()
+
+    def stop_background_refresh(self, timeout: Optional[float] = 5.0) -> None:
+        """Stop the background refresher started by start_background_refresh."""
+        self._background_stop.set()
+        if self._background_thread:
+            self._background_thread.join(timeout)
+            self._background_thread = None
 
     def load_from_cookies_dict(self, cookies: Dict[str, str]) -> bool:
         """Initialize a requests session from a cookies dict (no file read/write).
@@ -993,141 +1292,9 @@ class SessionPersistenceManager:
         """
         try:
             self.session = requests.Session()
-            # Sanitize values
-            sanitized: Dict[str, str] = {}
-            for k, v in cookies.items():
-                if isinstance(v, str):
-                    vv = v.strip()
-                    if (vv.startswith('"') and vv.endswith('"')) or (
-                        vv.startswith("'") and vv.endswith("'")
-                    ):
-                        vv = vv[1:-1]
-                    sanitized[k] = vv
-                else:
-                    sanitized[k] = v
-            cookies = sanitized
-
-            # Normalize aliases
-            normalized: Dict[str, str] = dict(cookies)
-            mapping_pairs = [
-                ("_Secure-next-auth.session-token", "__Secure-next-auth.session-token"),
-                ("_Host-next-auth.csrf-token", "__Host-next-auth.csrf-token"),
-                ("_Secure-next-auth.callback-url", "__Secure-next-auth.callback-url"),
-            ]
-            for single, double in mapping_pairs:
-                if single in cookies and double not in normalized:
-                    normalized[double] = cookies[single]
-                if double in cookies and single not in normalized:
-                    normalized[single] = cookies[double]
-
-            from requests.cookies import create_cookie
-
-            def should_set_cookie(name: str) -> bool:
-                if name.startswith("_Secure-next-auth.") or name.startswith(
-                    "_Host-next-auth."
-                ):
-                    return False
-                return True
-
-            for name, value in normalized.items():
-                if not should_set_cookie(name):
-                    continue
-                try:
-                    cookies_to_set = []
-                    # Canonical domains per browser behavior
-                    if (
-                        name == "__Host-next-auth.csrf-token"
-                        or name == "__Secure-next-auth.callback-url"
-                    ):
-                        cookies_to_set.append(
-                            create_cookie(
-                                name=name,
-                                value=value,
-                                domain="es.wallapop.com",
-                                path="/",
-                                secure=True,
-                            )
-                        )
-                    elif (
-                        name == "__Secure-next-auth.session-token"
-                        or name == "device_id"
-                        or name == "accessToken"
-                    ):
-                        cookies_to_set.append(
-                            create_cookie(
-                                name=name,
-                                value=value,
-                                domain=".wallapop.com",
-                                path="/",
-                                secure=True,
-                            )
-                        )
-                    elif name.startswith("__Host-"):
-                        cookies_to_set.append(
-                            create_cookie(
-                                name=name,
-                                value=value,
-                                domain="es.wallapop.com",
-                                path="/",
-                                secure=True,
-                            )
-                        )
-                    else:
-                        cookies_to_set.append(
-                            create_cookie(
-                                name=name,
-                                value=value,
-                                domain=".wallapop.com",
-                                path="/",
-                                secure=True,
-                            )
-                        )
-                    # Clear duplicates across domains/paths for this name
-                    try:
-                        for c in list(self.session.cookies):
-                            if c.name == name:
-                                with contextlib.suppress(Exception):
-                                    self.session.cookies.clear(
-                                        domain=c.domain, path=c.path, name=c.name
-                                    )
-                    except Exception:
-                        pass
-                    for ck in cookies_to_set:
-                        self.session.cookies.set_cookie(ck)
-                except Exception:
-                    try:
-                        domain = (
-                            "es.wallapop.com"
-                            if name
-                            in (
-                                "__Host-next-auth.csrf-token",
-                                "__Secure-next-auth.callback-url",
-                            )
-                            else ".wallapop.com"
-                        )
-                        self.session.cookies.set(
-                            name, value, domain=domain, path="/", secure=True
-                        )
-                    except Exception:
-                        self.session.cookies.set(name, value)
-
-            # Set default headers
-            self.session.headers.update(
-                {
-                    "accept": "application/json, text/plain, */*",
-                    "accept-language": "en-US,en;q=0.9",
-                    "cache-control": "no-cache",
-                    "pragma": "no-cache",
-                    "referer": "https://es.wallapop.com/app/catalog/published",
-                    "origin": "https://es.wallapop.com",
-                    "sec-fetch-dest": "empty",
-                    "sec-fetch-mode": "cors",
-                    "sec-fetch-site": "same-origin",
-                    "sec-gpc": "1",
-                    "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36",
-                    "dnt": "1",
-                }
-            )
+            normalized = normalize_cookies(cookies)
+            install_cookies(self.session.cookies, normalized)
+            self.session.headers.update(DEFAULT_SESSION_HEADERS)
 
             # Record ephemeral session_data (not persisted)
             now = datetime.now()
@@ -1145,6 +1312,9 @@ class SessionPersistenceManager:
     def _browser_fallback_fetch_token(self) -> Tuple[bool, Optional[str]]:
         """Use undetected-chromedriver in headless mode to hit federated-session and harvest accessToken.
 
+        With WALLAPOP_BROWSER_POOL=1 the browser is kept running (one per
+        session directory) and reused by later fallbacks; see browser_pool.
+
         Returns (success, token)
         """
         if not os.getenv("WALLAPOP_USE_BROWSER_FALLBACK", "1"):
@@ -1157,8 +1327,7 @@ class SessionPersistenceManager:
             self.logger.debug(f"Browser fallback unavailable: {e}")
             return False, None
 
-        try:
-            self.logger.info("Attempting browser fallback to refresh token...")
+        def launch(user_data_dir: Optional[Path] = None):
             options = uc.ChromeOptions()
             options.add_argument("--headless=new")
             options.add_argument("--disable-gpu")
@@ -1171,117 +1340,181 @@ class SessionPersistenceManager:
             )
             caps = DesiredCapabilities.CHROME
             caps["pageLoadStrategy"] = "eager"
-            driver = uc.Chrome(options=options, desired_capabilities=caps)
+            if user_data_dir is None:
+                return uc.Chrome(options=options, desired_capabilities=caps)
+            return uc.Chrome(
+                options=options,
+                desired_capabilities=caps,
+                user_data_dir=str(user_data_dir),
+            )
+
+        try:
+            self.logger.info("Attempting browser fallback to refresh token...")
+            pool = get_browser_pool()
+            if pool is not None:
+                profile_dir = self.browser_profile_dir
+                with pool.lease(
+                    str(profile_dir), lambda: launch(profile_dir)
+                ) as driver:
+                    return self._fetch_token_in_browser(driver)
+            driver = launch()
             try:
-                # Open domain to allow setting cookies
-                driver.get("https://es.wallapop.com/")
+                return self._fetch_token_in_browser(driver)
+            finally:
+                with contextlib.suppress(Exception):
+                    driver.quit()
+        except Exception as e:
+            self.logger.debug(f"Browser fallback failed: {e}")
+            return False, None
 
-                # Set essential cookies from our session jar
-                def add_cookie(name: str, value: str):
-                    try:
-                        # Host-only: do not set domain
-                        driver.add_cookie(
-                            {"name": name, "value": value, "path": "/", "secure": True}
-                        )
-                    except Exception:
-                        try:
-                            driver.add_cookie({"name": name, "value": value})
-                        except Exception:
-                            pass
+    def _fetch_token_in_browser(self, driver) -> Tuple[bool, Optional[str]]:
+        """Copy the session cookies into ``driver`` and read a fresh accessToken."""
+        # A pooled browser is usually still on the site: skip the page loads
+        on_site = str(getattr(driver, "current_url", "") or "").startswith(
+            "https://es.wallapop.com/"
+        )
+        if not on_site:
+            # Open domain to allow setting cookies
+            driver.get("https://es.wallapop.com/")
 
-                jar = self.session.cookies if self.session else None
-                names = [
-                    "__Secure-next-auth.session-token",
+        # Set essential cookies from our session jar
+        def add_cookie(name: str, value: str):
+            try:
+                # Host-only: do not set domain
+                driver.add_cookie(
+                    {"name": name, "value": value, "path": "/", "secure": True}
+                )
+            except Exception:
+                try:
+                    driver.add_cookie({"name": name, "value": value})
+                except Exception:
+                    pass
+
+        jar = self.session.cookies if self.session else None
+        names = [
+            "__Secure-next-auth.session-token",
+            "__Host-next-auth.csrf-token",
+            "__Secure-next-auth.callback-url",
+            "device_id",
+        ]
+        for nm in names:
+            try:
+                if not jar:
+                    val = None
+                elif nm == "__Secure-next-auth.session-token":
+                    val = jar.get(nm, domain=".wallapop.com", path="/") or jar.get(
+                        nm, domain="es.wallapop.com", path="/"
+                    )
+                elif nm in (
                     "__Host-next-auth.csrf-token",
                     "__Secure-next-auth.callback-url",
-                    "device_id",
-                ]
-                for nm in names:
-                    try:
-                        if not jar:
-                            val = None
-                        elif nm == "__Secure-next-auth.session-token":
-                            val = jar.get(
-                                nm, domain=".wallapop.com", path="/"
-                            ) or jar.get(nm, domain="es.wallapop.com", path="/")
-                        elif nm in (
-                            "__Host-next-auth.csrf-token",
-                            "__Secure-next-auth.callback-url",
-                        ):
-                            val = jar.get(nm, domain="es.wallapop.com", path="/")
-                        else:
-                            val = jar.get(nm, domain=".wallapop.com", path="/")
-                        if val:
-                            add_cookie(nm, val)
-                    except Exception:
-                        pass
-                # Navigate to app page
-                driver.get("https://es.wallapop.com/app/chat")
-                # Trigger federated-session via XHR from page context to mirror HAR
+                ):
+                    val = jar.get(nm, domain="es.wallapop.com", path="/")
+                else:
+                    val = jar.get(nm, domain=".wallapop.com", path="/")
+                if val:
+                    add_cookie(nm, val)
+            except Exception:
+                pass
+        if not on_site:
+            # Navigate to app page
+            driver.get("https://es.wallapop.com/app/chat")
+        # Trigger federated-session via XHR from page context to mirror HAR
+        try:
+            js = """
+            return fetch('/api/auth/federated-session', {
+                method: 'GET',
+                headers: {
+                    'accept': 'application/json, text/plain, */*',
+                },
+                credentials: 'include'
+            }).then(r => r.text()).then(t => ({ ok: true, text: t })).catch(e => ({ ok: false, error: String(e) }));
+            """
+            res = driver.execute_script(js)
+            if isinstance(res, dict) and res.get("ok") and res.get("text"):
                 try:
-                    js = """
-                    return fetch('/api/auth/federated-session', {
-                        method: 'GET',
-                        headers: {
-                            'accept': 'application/json, text/plain, */*',
-                        },
-                        credentials: 'include'
-                    }).then(r => r.text()).then(t => ({ ok: true, text: t })).catch(e => ({ ok: false, error: String(e) }));
-                    """
-                    res = driver.execute_script(js)
-                    if isinstance(res, dict) and res.get("ok") and res.get("text"):
+                    data = json.loads(res["text"])
+                    token = data.get("token") or data.get("accessToken")
+                    if token:
                         try:
-                            data = json.loads(res["text"])
-                            token = data.get("token") or data.get("accessToken")
-                            if token:
-                                try:
-                                    self.session.cookies.set(
-                                        "accessToken",
-                                        token,
-                                        domain=".wallapop.com",
-                                        path="/",
-                                    )
-                                except Exception:
-                                    pass
-                                self.logger.info(
-                                    "Token obtained via browser fallback (XHR)"
-                                )
-                                return True, token
+                            self.session.cookies.set(
+                                "accessToken",
+                                token,
+                                domain=".wallapop.com",
+                                path="/",
+                            )
                         except Exception:
                             pass
+                        self.logger.info("Token obtained via browser fallback (XHR)")
+                        return True, token
                 except Exception:
                     pass
-                # Inspect cookies
-                cookies = {c.get("name"): c.get("value") for c in driver.get_cookies()}
-                token = cookies.get("accessToken")
-                if not token:
-                    # Try document.cookie as a last resort
-                    try:
-                        dc = driver.execute_script("return document.cookie") or ""
-                        for part in dc.split(";"):
-                            part = part.strip()
-                            if part.startswith("accessToken="):
-                                token = part.split("=", 1)[1]
-                                break
-                    except Exception:
-                        pass
-                if token:
-                    try:
-                        # persist into our requests session too
-                        self.session.cookies.set(
-                            "accessToken", token, domain=".wallapop.com", path="/"
-                        )
-                    except Exception:
-                        pass
-                    self.logger.info("Token obtained via browser fallback")
-                    return True, token
-                return False, None
-            finally:
-                with contextlib.suppress(Exception):
-                    driver.quit()
-        except Exception as e:
-            self.logger.debug(f"Browser fallback failed: {e}")
-            return False, None
+        except Exception:
+            pass
+        # Inspect cookies
+        cookies = {c.get("name"): c.get("value") for c in driver.get_cookies()}
+        token = cookies.get("accessToken")
+        if not token:
+            # Try document.cookie as a last resort
+            try:
+                dc = driver.execute_script("return document.cookie") or ""
+                for part in dc.split(";"):
+                    part = part.strip()
+                    if part.startswith("accessToken="):
+                        token = part.split("=", 1)[1]
+                        break
+            except Exception:
+                pass
+        if token:
+            try:
+                # persist into our requests session too
+                self.session.cookies.set(
+                    "accessToken", token, domain=".wallapop.com", path="/"
+                )
+            except Exception:
+                pass
+            self.logger.info("Token obtained via browser fallback")
+            return True, token
+        return False, None
+
+    def _http(
+        self, method: str, url: str, rate_limited: bool = False, **kwargs
+    ) -> requests.Response:
+        """Send a request on the session with default timeouts and retries.
+
+        With ``rate_limited`` every attempt (including retries) first waits for
+        the read or write budget of ``self.rate_limiter``. The number of retries
+        used is available as ``response.retries``. Every attempt is recorded
+        in ``self.metrics``.
+        """
+        attempts = 0
+
+        def send(method, url, **kw):
+            nonlocal attempts
+            retry = attempts > 0
+            attempts += 1
+            if rate_limited:
+                self.rate_limiter.acquire(method)
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kw)
+            except Exception:
+                self.metrics.record(
+                    method, url, "error", time.perf_counter() - started, retry
+                )
+                raise
+            self.metrics.record(
+                method,
+                url,
+                response.status_code,
+                time.perf_counter() - started,
+                retry,
+            )
+            if rate_limited:
+                self.rate_limiter.observe(method, response)
+            return response
+
+        return request_with_retries(send, method, url, self.retry_policy, **kwargs)
 
     def make_authenticated_request(
         self, method: str, url: str, **kwargs
@@ -1307,19 +1540,21 @@ class SessionPersistenceManager:
         headers["Authorization"] = f"Bearer {token_or_error}"
         kwargs["headers"] = headers
 
-        # Make request
-        response = self.session.request(method, url, **kwargs)
+        # Make request (transient failures are retried by the retry policy)
+        response = self._http(method, url, rate_limited=True, **kwargs)
 
         # If we get 401, try refreshing token once
         if response.status_code == 401:
             self.logger.info("Got 401, attempting token refresh...")
 
-            success, new_token_or_error = self.refresh_access_token()
+            success, new_token_or_error = self.refresh_token_single_flight(
+                stale_token=token_or_error
+            )
             if success:
                 # Retry with new token
                 headers["Authorization"] = f"Bearer {new_token_or_error}"
                 kwargs["headers"] = headers
-                response = self.session.request(method, url, **kwargs)
+                response = self._http(method, url, rate_limited=True, **kwargs)
             else:
                 self.logger.error(f"Token refresh failed: {new_token_or_error}")
 
@@ -1355,8 +1590,8 @@ class SessionPersistenceManager:
 class SessionManager(SessionPersistenceManager):
     """Legacy session manager for backwards compatibility"""
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, base_dir: Optional[Path] = None):
+        super().__init__(base_dir=base_dir)
         self.logger = logging.getLogger(__name__)
 
     def save_session(self, cookies_dict: Dict[str, str]):
@@ -1378,3 +1613,41 @@ class SessionManager(SessionPersistenceManager):
         except Exception as e:
             self.logger.error(f"Failed to save session: {e}")
             return False
+
+
+# One live session manager per session directory, shared by the CLI login
+# path, the cookie guide and every client of the same account
+_registry: Dict[Path, SessionPersistenceManager] = {}
+_registry_lock = threading.Lock()
+# Bound at import so a class replaced by a test double is not registered
+_MANAGER_TYPE = SessionPersistenceManager
+
+
+def shared_session_manager(
+    base_dir: Optional[Path] = None, factory=None
+) -> SessionPersistenceManager:
+    """The process-wide session manager for ``base_dir`` (default home).
+
+    Every caller for the same directory gets the same instance, and with it
+    the same requests.Session, connection pool and access token, so a run
+    authenticates once. ``factory`` builds the instance on first use; it
+    defaults to SessionManager, which is also used in place of a plain
+    SessionPersistenceManager. Objects of other types (e.g. test doubles)
+    are returned without being registered.
+    """
+    if factory is None or factory is _MANAGER_TYPE:
+        factory = SessionManager
+    key = Path(base_dir or default_session_dir()).expanduser().resolve()
+    with _registry_lock:
+        manager = _registry.get(key)
+        if manager is None:
+            manager = factory(base_dir=base_dir) if base_dir else factory()
+            if isinstance(manager, _MANAGER_TYPE):
+                _registry[key] = manager
+        return manager
+
+
+def clear_session_registry() -> None:
+    """Forget all shared session managers (their sessions stay usable)."""
+    with _registry_lock:
+        _registry.clear()
@@ -0,0 +1,328 @@
+"""
+SQLite-backed product state store.
+
+Drop-in alternative to the JSON ConfigManager for large catalogues: each
+product is one row (indexed by product id and by last_modified), so per-product
+changes are single-row statements instead of rewriting the whole file, and the
+sold-product sweep is done by the database. Settings live in a small key/value
+table. import_json()/export_json() convert to and from products_config.json.
+"""
+
+import atexit
+import json
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from wallapop_auto_adjust.config import (
+    DEFAULT_SETTINGS,
+    SECONDS_PER_DAY,
+    iso_last_modified,
+    write_json_atomic,
+)
+from wallapop_auto_adjust.product import to_epoch_seconds
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    product_id TEXT PRIMARY KEY,
+    name TEXT,
+    -- no type affinity so numeric multipliers round-trip as numbers
+    adjustment NOT NULL DEFAULT 'keep',
+    last_modified TEXT,
+    last_modified_ts REAL,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_products_last_modified
+    ON products (last_modified_ts);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Product entry keys stored in their own columns; anything else goes in "extra"
+_COLUMNS = ("name", "adjustment", "last_modified")
+
+
+class SQLiteConfigManager:
+    """ConfigManager interface on top of a SQLite database file."""
+
+    def __init__(
+        self,
+        config_path: str = "products_config.db",
+        write_behind: bool = False,
+        flush_interval: float = 5.0,
+    ):
+        """
+        Args:
+            config_path: Path of the SQLite database (created if missing)
+            write_behind: When True, save_config() only commits once
+                ``flush_interval`` seconds have passed since the last commit;
+                flush(), close() and interpreter exit commit pending changes.
+                There is no background timer.
+            flush_interval: Minimum seconds between commits in write-behind mode
+        """
+        self.config_path = config_path
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(config_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        if self._conn.execute("SELECT COUNT(*) FROM settings").fetchone()[0] == 0:
+            for key, value in DEFAULT_SETTINGS.items():
+                self._set_setting(key, value)
+        self._conn.commit()
+        self._last_flush = time.monotonic()
+        if write_behind:
+            atexit.register(self.flush)
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.flush)
+        self._conn.close()
+
+    @property
+    def dirty(self) -> bool:
+        return self._conn.in_transaction
+
+    def save_config(self):
+        if not self.write_behind:
+            self._conn.commit()
+            self._last_flush = time.monotonic()
+            return
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Commit pending changes (write-behind mode)."""
+        if self._conn.in_transaction:
+            self._conn.commit()
+        self._last_flush = time.monotonic()
+
+    # Settings
+    def _set_setting(self, key: str, value: Any):
+        self._conn.execute(
+            "INSERT INTO settings (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value)),
+        )
+
+    def get_settings(self) -> Dict[str, Any]:
+        rows = self._conn.execute("SELECT key, value FROM settings").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def set_setting(self, key: str, value: Any):
+        self._set_setting(key, value)
+        self.save_config()
+
+    def get_delay_days(self) -> int:
+        row = self._conn.execute(
+            "SELECT value FROM settings WHERE key = 'delay_days'"
+        ).fetchone()
+        return json.loads(row[0]) if row else 1
+
+    def get_rules(self) -> List[Dict[str, Any]]:
+        """Pricing rules for unattended runs (see policy.PolicyEngine)."""
+        return self.get_settings().get("rules", [])
+
+    # Products
+    def _row_to_entry(self, row) -> Dict[str, Any]:
+        name, adjustment, last_modified, extra = row
+        entry = json.loads(extra) if extra else {}
+        entry.update(
+            {"name": name, "adjustment": adjustment, "last_modified": last_modified}
+        )
+        return entry
+
+    def _upsert_entry(self, product_id: str, entry: Dict[str, Any]):
+        extra = {k: v for k, v in entry.items() if k not in _COLUMNS}
+        # Numeric timestamps (older products_config.json files) are stored as
+        # ISO text, parsed the same way as the JSON store does
+        last_modified = iso_last_modified(entry.get("last_modified"))
+        self._conn.execute(
+            "INSERT INTO products "
+            "(product_id, name, adjustment, last_modified, last_modified_ts, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(product_id) DO UPDATE SET name = excluded.name, "
+            "adjustment = excluded.adjustment, "
+            "last_modified = excluded.last_modified, "
+            "last_modified_ts = excluded.last_modified_ts, extra = excluded.extra",
+            (
+                product_id,
+                entry.get("name"),
+                entry.get("adjustment") or "keep",
+                last_modified,
+                to_epoch_seconds(last_modified),
+                json.dumps(extra) if extra else None,
+            ),
+        )
+
+    def update_products(self, products: List[Dict[str, Any]]):
+        """Update config with new products, preserving existing settings"""
+        for product in products:
+            last_mod = iso_last_modified(product.get("last_modified"))
+            # New rows start with "keep"; existing rows keep their adjustment and
+            # only take a new last_modified when the listing reports one
+            self._conn.execute(
+                "INSERT INTO products "
+                "(product_id, name, adjustment, last_modified, last_modified_ts) "
+                "VALUES (?, ?, 'keep', ?, ?) "
+                "ON CONFLICT(product_id) DO UPDATE SET name = excluded.name, "
+                "last_modified = COALESCE(excluded.last_modified, last_modified), "
+                "last_modified_ts = COALESCE(excluded.last_modified_ts, "
+                "last_modified_ts)",
+                (product["id"], product["name"], last_mod, to_epoch_seconds(last_mod)),
+            )
+
+    def remove_sold_products(self, current_products: List[Dict[str, Any]]) -> List[str]:
+        """Remove products that are no longer in the current product list (i.e., sold)
+
+        Args:
+            current_products: List of products currently returned by API
+
+        Returns:
+            List of display strings in the format "<name> (<id>)" for removed products
+        """
+        conn = self._conn
+        conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS current_ids (id TEXT PRIMARY KEY)"
+        )
+        conn.execute("DELETE FROM current_ids")
+        conn.executemany(
+            "INSERT OR IGNORE INTO current_ids (id) VALUES (?)",
+            ((product["id"],) for product in current_products),
+        )
+        sold = conn.execute(
+            "SELECT product_id, name, extra FROM products "
+            "WHERE product_id NOT IN (SELECT id FROM current_ids) "
+            "ORDER BY product_id"
+        ).fetchall()
+        removed_products = []
+        for product_id, name, extra in sold:
+            title = (json.loads(extra) if extra else {}).get("title")
+            product_name = name or title or f"Product {product_id}"
+            removed_products.append(f"{product_name} ({product_id})")
+        conn.executemany(
+            "DELETE FROM products WHERE product_id = ?", ((pid,) for pid, _, _ in sold)
+        )
+        conn.execute("DELETE FROM current_ids")
+        return removed_products
+
+    def get_product_config(self, product_id: str) -> Dict[str, Any]:
+        row = self._conn.execute(
+            "SELECT name, adjustment, last_modified, extra FROM products "
+            "WHERE product_id = ?",
+            (product_id,),
+        ).fetchone()
+        return self._row_to_entry(row) if row else {}
+
+    def set_adjustment(self, product_id: str, adjustment: str):
+        self._conn.execute(
+            "UPDATE products SET adjustment = ? WHERE product_id = ?",
+            (adjustment, product_id),
+        )
+        self.save_config()
+
+    def update_last_modified(self, product_id: str, date: str = None):
+        if date is None:
+            date = datetime.now().astimezone().isoformat()
+        cur = self._conn.execute(
+            "UPDATE products SET last_modified = ?, last_modified_ts = ? "
+            "WHERE product_id = ?",
+            (date, to_epoch_seconds(date), product_id),
+        )
+        if cur.rowcount:
+            self.save_config()
+
+    def products_modified_before(self, timestamp: float) -> List[str]:
+        """Ids of products last modified before ``timestamp`` (epoch seconds).
+
+        Products that were never modified are included. Uses the last_modified
+        index.
+        """
+        rows = self._conn.execute(
+            "SELECT product_id FROM products WHERE last_modified_ts IS NULL "
+            "UNION ALL SELECT product_id FROM products WHERE last_modified_ts < ?",
+            (timestamp,),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def last_modified_timestamp(self, product_id: str) -> float:
+        """Parsed last_modified of a product (-inf if never modified)."""
+        row = self._conn.execute(
+            "SELECT last_modified_ts FROM products WHERE product_id = ?",
+            (product_id,),
+        ).fetchone()
+        return row[0] if row and row[0] is not None else float("-inf")
+
+    def is_due(
+        self,
+        product_id: str,
+        now: Optional[float] = None,
+        delay_days: Optional[int] = None,
+    ) -> bool:
+        """Whether at least ``delay_days`` (default: setting) passed since the last change."""
+        if delay_days is None:
+            delay_days = self.get_delay_days()
+        if delay_days == 0:
+            return True
+        now = time.time() if now is None else now
+        return now - self.last_modified_timestamp(product_id) >= (
+            delay_days * SECONDS_PER_DAY
+        )
+
+    def due_product_ids(
+        self, now: Optional[float] = None, delay_days: Optional[int] = None
+    ) -> List[str]:
+        """Ids of all products that are due, oldest change first (index range scan)."""
+        if delay_days is None:
+            delay_days = self.get_delay_days()
+        if delay_days == 0:
+            rows = self._conn.execute(
+                "SELECT product_id FROM products "
+                "ORDER BY last_modified_ts, product_id"
+            ).fetchall()
+        else:
+            now = time.time() if now is None else now
+            # NULLs (never modified) sort first, as -inf does in the JSON store
+            rows = self._conn.execute(
+                "SELECT product_id FROM products "
+                "WHERE last_modified_ts IS NULL OR last_modified_ts <= ? "
+                "ORDER BY last_modified_ts, product_id",
+                (now - delay_days * SECONDS_PER_DAY,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """Snapshot of the store in products_config.json form (read-only)."""
+        rows = self._conn.execute(
+            "SELECT product_id, name, adjustment, last_modified, extra FROM products"
+        ).fetchall()
+        return {
+            "products": {row[0]: self._row_to_entry(row[1:]) for row in rows},
+            "settings": self.get_settings(),
+        }
+
+    # JSON import/export
+    def import_json(self, json_path: str) -> int:
+        """Load products and settings from a products_config.json file.
+
+        Returns:
+            Number of products imported
+        """
+        with open(json_path, "r") as f:
+            data = json.load(f)
+        products = data.get("products", {})
+        with self._conn:
+            for key, value in data.get("settings", {}).items():
+                self._set_setting(key, value)
+            for product_id, entry in products.items():
+                self._upsert_entry(product_id, entry)
+        self._last_flush = time.monotonic()
+        return len(products)
+
+    def export_json(self, json_path: str):
+        """Write the store to a products_config.json-compatible file."""
+        write_json_atomic(json_path, self.config)
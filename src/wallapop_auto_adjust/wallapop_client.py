@@ -1,13 +1,23 @@
 import requests
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Iterator, Optional
+import contextvars
 import json
 import sys
 import os
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+from wallapop_auto_adjust.browser_pool import get_browser_pool
+from wallapop_auto_adjust.details_cache import EditDetailsCache
+from wallapop_auto_adjust.http_cache import HttpCache
+from wallapop_auto_adjust.product import Product
 from wallapop_auto_adjust.session_persistence import (
     SessionPersistenceManager,
     SessionManager as _CompatSessionManager,
+    shared_session_manager,
 )
 
 
@@ -24,25 +34,261 @@ Backwards-compatibility notes:
 SessionManager = _CompatSessionManager
 
 
+def _clean_payload(value: Any) -> Any:
+    """Remove None values and empty containers from nested structures."""
+    if isinstance(value, dict):
+        cleaned = {}
+        for key, nested in value.items():
+            cleaned_value = _clean_payload(nested)
+            if cleaned_value in (None, {}, []):
+                continue
+            cleaned[key] = cleaned_value
+        return cleaned
+    if isinstance(value, list):
+        cleaned_list = [_clean_payload(item) for item in value if item is not None]
+        return [item for item in cleaned_list if item not in ({}, [])]
+    return value
+
+
+def build_price_update_payload(
+    details: Dict[str, Any], new_price: float
+) -> Dict[str, Any]:
+    """Build the PUT /api/v3/items/{id} payload from edit details and a new price.
+
+    The structure mirrors the payload sent by the web interface (see HAR captures).
+    """
+    data = details
+
+    # Extract the proper field values based on actual API response structure
+    title = (
+        data.get("title", {}).get("original")
+        if isinstance(data.get("title"), dict)
+        else data.get("title")
+    )
+    description = (
+        data.get("description", {}).get("original")
+        if isinstance(data.get("description"), dict)
+        else data.get("description")
+    )
+
+    # Get category from taxonomy if available - use the most specific one (last in array)
+    category_leaf_id = None
+    taxonomy = data.get("taxonomy", [])
+    if taxonomy and len(taxonomy) > 0:
+        category_leaf_id = taxonomy[-1].get("id")
+
+    # Get condition from type_attributes and map to API expected values
+    condition = None
+    type_attributes = data.get("type_attributes", {})
+    if "condition" in type_attributes:
+        api_condition = type_attributes["condition"].get("value")
+        # Map API response conditions to expected values (see HAR payloads)
+        condition_mapping = {
+            "as_good_as_new": "good",
+        }
+        condition = condition_mapping.get(api_condition, api_condition)
+
+    # Extract location data
+    location = data.get("location", {})
+
+    # Extract delivery/shipping info
+    shipping = data.get("shipping", {})
+    delivery_info = {
+        "allowed_by_user": shipping.get("user_allows_shipping"),
+        "max_weight_kg": shipping.get("max_weight_kg")
+        or shipping.get("max_weight")
+        or shipping.get("weight"),
+    }
+
+    # Extract any brand info if available
+    brand = None
+    if "brand" in type_attributes:
+        brand = type_attributes["brand"].get("value")
+
+    payload = {
+        "attributes": {
+            "title": title,
+            "description": description,
+            "condition": condition,
+        },
+        "category_leaf_id": category_leaf_id,
+        "price": {
+            "cash_amount": round(new_price, 2),
+            "currency": "EUR",
+            "apply_discount": False,
+        },
+        "location": {
+            "latitude": location.get("latitude"),
+            "longitude": location.get("longitude"),
+            "approximated": location.get("approximated", False),
+        },
+        "delivery": delivery_info,
+    }
+
+    # Add brand if available
+    if brand:
+        payload["attributes"]["brand"] = brand
+
+    return _clean_payload(payload)
+
+
+def listing_headers(cookies: Any) -> Dict[str, str]:
+    """HAR-aligned headers for GET /api/v3/user/items."""
+    mpid = cookies.get("MPID", "")
+    device_id = cookies.get("device_id", "")
+    extra_headers = {
+        "Referer": "https://es.wallapop.com/",
+        "Origin": "https://es.wallapop.com",
+        "X-AppVersion": "810840",
+        "X-DeviceID": device_id or "",
+        "X-DeviceOS": "0",
+        "DeviceOS": "0",
+    }
+    if mpid:
+        extra_headers["MPID"] = mpid
+    return extra_headers
+
+
+def details_headers(cookies: Any) -> Dict[str, str]:
+    """Headers for GET /api/v3/items/{id}/edit."""
+    mpid = cookies.get("MPID", "")
+    device_id = cookies.get("device_id", "")
+    extra_headers = {
+        "Referer": "https://es.wallapop.com/",
+        "X-AppVersion": "89340",
+        "X-DeviceOS": "0",
+    }
+    if mpid:
+        extra_headers["MPID"] = mpid
+    if device_id:
+        extra_headers["X-DeviceID"] = device_id
+    return extra_headers
+
+
+def update_headers(cookies: Any) -> Dict[str, str]:
+    """Headers used by the web interface for the item update PUT."""
+    extra_headers = {
+        "Accept": "application/vnd.upload-v2+json",
+        "Content-Type": "application/json",
+        "Referer": "https://es.wallapop.com/",
+        "Origin": "https://es.wallapop.com",
+        "X-AppVersion": "811030",
+        "X-DeviceOS": "0",
+        "DeviceOS": "0",
+    }
+    if cookies is not None:
+        device_id = cookies.get("device_id", "")
+        if device_id:
+            extra_headers["X-DeviceID"] = device_id
+    return extra_headers
+
+
+def extract_items(raw: Any) -> List[Dict[str, Any]]:
+    """Return the list of item payloads from any of the known listing shapes."""
+    items: List[Dict[str, Any]] = []
+    if isinstance(raw, list):
+        items = raw
+    elif isinstance(raw, dict):
+        if isinstance(raw.get("data"), list):
+            items = raw.get("data") or []
+        elif isinstance(raw.get("data"), dict) and isinstance(
+            raw["data"].get("products"), list
+        ):
+            items = raw["data"].get("products") or []
+        elif isinstance(raw.get("products"), list):
+            items = raw.get("products") or []
+    return items
+
+
+def next_page_params(response: Any, raw: Any) -> Optional[Dict[str, str]]:
+    """Query parameters for the next listing page, or None on the last page.
+
+    The cursor may come as an ``X-NextPage`` header (e.g. ``since=<cursor>``) or in
+    the body as ``next_page``/``next``/``meta.next``/``pagination.next``; a bare
+    value is sent back as ``since``. Full URLs are reduced to their query string.
+    """
+    cursor = None
+    try:
+        header = response.headers.get("X-NextPage")
+        if isinstance(header, str) and header.strip():
+            cursor = header.strip()
+    except Exception:
+        cursor = None
+    if cursor is None and isinstance(raw, dict):
+        for container in (raw, raw.get("meta"), raw.get("pagination")):
+            if not isinstance(container, dict):
+                continue
+            for key in ("next_page", "next", "next_cursor", "since"):
+                value = container.get(key)
+                if isinstance(value, (str, int)) and str(value).strip():
+                    cursor = str(value).strip()
+                    break
+            if cursor is not None:
+                break
+    if cursor is None:
+        return None
+    if "://" in cursor:
+        cursor = urlsplit(cursor).query
+    if "=" in cursor:
+        return {k: v[-1] for k, v in parse_qs(cursor).items() if v}
+    return {"since": cursor}
+
+
+def normalize_product(p: Dict[str, Any], include_raw: bool = True) -> Product:
+    """Normalize an item payload for downstream code into a compact Product.
+
+    The Product also supports the dict API (id, name, price as float,
+    last_modified, status, reserved, flags). With ``include_raw=False`` the
+    original payload is not kept under ``_raw``.
+    """
+    return Product.from_payload(p, include_raw=include_raw)
+
+
 class WallapopClient:
     """Modern Wallapop API client using persistent session management"""
 
-    def __init__(self):
-        """Initialize the Wallapop client with modern session management"""
-        # Use the compatibility SessionManager so tests can patch this symbol
-        self.session_manager = SessionManager()
+    def __init__(self, session_dir: Optional[Path] = None):
+        """Initialize the Wallapop client with modern session management
+
+        Args:
+            session_dir: Directory for this account's session files (defaults
+                to ~/.wallapop-auto-adjust)
+        """
+        # Share the account's live session and token with the rest of the run;
+        # built from the compatibility SessionManager so tests can patch this symbol
+        self.session_manager = shared_session_manager(
+            session_dir, factory=SessionManager
+        )
         self.base_url = "https://api.wallapop.com"
         self.web_url = "https://es.wallapop.com"
         # Lazily load session when needed; do not raise during __init__ (tests patch behavior)
         self.session = None
-        # Use the same home session directory as SessionPersistenceManager (no env override)
-        self.session_dir = Path.home() / ".wallapop-auto-adjust"
+        # Use the same session directory as SessionPersistenceManager (no env override)
+        self.session_dir = (
+            Path(session_dir) if session_dir else Path.home() / ".wallapop-auto-adjust"
+        )
         try:
             self.session_dir.mkdir(parents=True, exist_ok=True)
         except Exception:
             pass
         self.fingerprint_file = self.session_dir / "fingerprint.json"
         # Do not set headers yet; headers are applied when the session is actually loaded
+        # Batch update concurrency (see update_prices_batch)
+        self.max_workers = int(os.getenv("WALLAPOP_MAX_WORKERS", "4"))
+        self.per_host_limit = int(os.getenv("WALLAPOP_PER_HOST_LIMIT", "4"))
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_slots_lock = threading.Lock()
+        # Whether the last product listing fetched every page (see iter_user_products)
+        self.last_listing_complete = False
+        # Edit details reused to build price-update payloads (see _get_edit_details)
+        self.details_cache = EditDetailsCache()
+        # Conditional-GET cache for listing pages (WALLAPOP_HTTP_CACHE=0 disables)
+        self.http_cache: Optional[HttpCache] = None
+        if os.getenv("WALLAPOP_HTTP_CACHE", "1") != "0":
+            cache_mb = float(os.getenv("WALLAPOP_HTTP_CACHE_MB", "20"))
+            self.http_cache = HttpCache(
+                self.session_dir / "http_cache", max_bytes=int(cache_mb * 2**20)
+            )
 
     def _make_authenticated_request(
         self, method: str, url: str, **kwargs
@@ -50,6 +296,33 @@ class WallapopClient:
         """Make an authenticated request using the session manager"""
         return self.session_manager.make_authenticated_request(method, url, **kwargs)
 
+    def _conditional_get(self, url: str, **kwargs) -> Optional[requests.Response]:
+        """Authenticated GET through the HTTP cache.
+
+        Sends If-None-Match / If-Modified-Since for a cached response and serves
+        the stored body when the server answers 304 Not Modified.
+        """
+        cache = self.http_cache
+        if cache is None:
+            return self._make_authenticated_request("GET", url, **kwargs)
+        identity = self.session_manager.session_identity()
+        key = cache.key(
+            url, kwargs.get("params"), identity if isinstance(identity, str) else ""
+        )
+        headers = dict(kwargs.get("headers") or {})
+        kwargs["headers"] = {**headers, **cache.conditional_headers(key)}
+        response = self._make_authenticated_request("GET", url, **kwargs)
+        if response is not None and response.status_code == 304:
+            cached = cache.cached_response(key, response)
+            if cached is not None:
+                return cached
+            # Cached body is gone; ask again without validators
+            kwargs["headers"] = headers
+            response = self._make_authenticated_request("GET", url, **kwargs)
+        if response is not None and response.status_code == 200:
+            cache.store(key, response)
+        return response
+
     # -----------------------------
     # Backwards-compatible helpers
     # -----------------------------
@@ -74,6 +347,27 @@ class WallapopClient:
                     "Sec-Fetch-Site": "same-site",
                 }
             )
+        # Size the connection pool for batch updates once per session
+        self._ensure_pool_size(max(self.max_workers, self.per_host_limit))
+
+    def _ensure_pool_size(self, size: int) -> None:
+        """Grow the session's https:// connection pool to at least ``size``.
+
+        The adapter is replaced only when it is requests' stock HTTPAdapter and
+        its pool is smaller, so pooled keep-alive connections survive repeated
+        batches and adapters mounted by callers are left alone.
+        """
+        if not isinstance(self.session, requests.Session):
+            return
+        adapter = self.session.adapters.get("https://")
+        if type(adapter) is not requests.adapters.HTTPAdapter:
+            return
+        if getattr(adapter, "_pool_maxsize", 0) >= size:
+            return
+        self.session.mount(
+            "https://",
+            requests.adapters.HTTPAdapter(pool_connections=size, pool_maxsize=size),
+        )
 
     def _get_session_fingerprint(self) -> Dict[str, Any]:
         """Generate or load a simple browser fingerprint for the session.
@@ -180,10 +474,20 @@ class WallapopClient:
             options.add_argument(f"--user-agent={ua}")
         options.add_argument(f"--window-size={width},{height}")
 
+        # With the browser pool, log in on this account's pooled profile so the
+        # headless fallback browser starts out logged in; Chrome locks a
+        # profile, so the pooled browser for it is closed first
+        chrome_kwargs = {}
+        pool = get_browser_pool()
+        if pool is not None:
+            profile_dir = self.session_dir / "browser_profile"
+            pool.discard(str(profile_dir))
+            chrome_kwargs["user_data_dir"] = str(profile_dir)
+
         driver = None
         try:
             print("Starting browser for automatic login...")
-            driver = uc.Chrome(options=options)
+            driver = uc.Chrome(options=options, **chrome_kwargs)
             driver.get("https://es.wallapop.com/auth/signin")
 
             # Wait for the page body to load
@@ -353,136 +657,73 @@ class WallapopClient:
             "source": getattr(self.session_manager, "cookies_file", "session"),
         }
 
-    def get_user_products(self) -> List[Dict[str, Any]]:
-        """Fetch all products for the authenticated user"""
+    def iter_user_products(
+        self, include_raw: bool = True, max_pages: int = 1000
+    ) -> Iterator[Product]:
+        """Yield the authenticated user's products page by page as they arrive.
+
+        Follows the listing's pagination cursor until the last page. Afterwards
+        ``self.last_listing_complete`` tells whether every page was fetched; it is
+        False when a page failed, so callers must not treat missing items as sold.
+        """
+        self.last_listing_complete = False
         try:
             self._ensure_session()
-            # HAR-aligned headers that appear in app calls
-            mpid = self.session.cookies.get("MPID", "")
-            device_id = self.session.cookies.get("device_id", "")
-            extra_headers = {
-                "Referer": "https://es.wallapop.com/",
-                "Origin": "https://es.wallapop.com",
-                "X-AppVersion": "810840",
-                "X-DeviceID": device_id or "",
-                "X-DeviceOS": "0",
-                "DeviceOS": "0",
-            }
-            if mpid:
-                extra_headers["MPID"] = mpid
-
-            # Make authenticated request to get user products
-            response = self._make_authenticated_request(
-                "GET", f"{self.base_url}/api/v3/user/items", headers=extra_headers
-            )
-
-            if response and response.status_code == 200:
-                raw = response.json()
-                items: List[Dict[str, Any]] = []
-                if isinstance(raw, list):
-                    items = raw
-                elif isinstance(raw, dict):
-                    if isinstance(raw.get("data"), list):
-                        items = raw.get("data") or []
-                    elif isinstance(raw.get("data"), dict) and isinstance(
-                        raw["data"].get("products"), list
-                    ):
-                        items = raw["data"].get("products") or []
-                    elif isinstance(raw.get("products"), list):
-                        items = raw.get("products") or []
-
-                # Normalize shape for downstream code: id, name, price (float), last_modified
-                normalized: List[Dict[str, Any]] = []
-
-                def extract_flag(value: Any) -> bool:
-                    if isinstance(value, dict):
-                        return bool(value.get("flag"))
-                    return bool(value)
-
-                for p in items:
-                    pid = p.get("id") or p.get("item_id")
-                    title = p.get("title") or p.get("name") or ""
-                    price_raw = p.get("price")
-                    price: float
-                    if isinstance(price_raw, dict) and "amount" in price_raw:
-                        price = float(price_raw.get("amount") or 0)
-                    else:
+            headers = listing_headers(self.session.cookies)
+            url = f"{self.base_url}/api/v3/user/items"
+            params: Optional[Dict[str, str]] = None
+            seen_cursors = set()
+
+            for _ in range(max_pages):
+                # Make authenticated request to get user products
+                kwargs: Dict[str, Any] = {"headers": dict(headers)}
+                if params:
+                    kwargs["params"] = params
+                response = self._conditional_get(url, **kwargs)
+
+                if not (response and response.status_code == 200):
+                    # Log a short snippet of the body for diagnostics
+                    body = ""
+                    if response is not None:
                         try:
-                            price = (price_raw or 0) / 100.0
+                            body = response.text[:300]
                         except Exception:
-                            price = 0.0
-                    last_mod = p.get("modified_date") or p.get("last_modified")
-
-                    reserved_flag = extract_flag(p.get("reserved"))
-                    sold_flag = extract_flag(p.get("sold"))
-                    pending_flag = extract_flag(p.get("pending"))
-                    blocked_flag = extract_flag(p.get("blocked"))
-                    on_hold_flag = extract_flag(p.get("on_hold") or p.get("onhold"))
-
-                    flags = {
-                        "reserved": reserved_flag,
-                        "sold": sold_flag,
-                        "pending": pending_flag,
-                        "blocked": blocked_flag,
-                        "on_hold": on_hold_flag,
-                    }
-
-                    for key, value in p.items():
-                        if key in flags:
-                            continue
-                        if isinstance(value, dict) and "flag" in value:
-                            flags[key] = bool(value.get("flag"))
-
-                    normalized.append(
-                        {
-                            "id": pid,
-                            "name": title,
-                            "price": price,
-                            "last_modified": last_mod,
-                            "status": "reserved" if reserved_flag else "available",
-                            "reserved": reserved_flag,
-                            "flags": flags,
-                            # keep original too for any custom needs
-                            "_raw": p,
-                        }
+                            body = ""
+                    print(
+                        f"Failed to fetch products: {response.status_code if response else 'No response'} {body}"
                     )
-                return normalized
-            else:
-                # Log a short snippet of the body for diagnostics
-                body = ""
-                if response is not None:
-                    try:
-                        body = response.text[:300]
-                    except Exception:
-                        body = ""
-                print(
-                    f"Failed to fetch products: {response.status_code if response else 'No response'} {body}"
-                )
-                return []
+                    return
+
+                raw = response.json()
+                items = extract_items(raw)
+                for p in items:
+                    product = normalize_product(p, include_raw=include_raw)
+                    # Drop cached edit details of items changed since
+                    self.details_cache.observe(product.id, product.last_modified)
+                    yield product
+
+                params = next_page_params(response, raw)
+                cursor_key = tuple(sorted(params.items())) if params else None
+                if not items or not params or cursor_key in seen_cursors:
+                    self.last_listing_complete = True
+                    return
+                seen_cursors.add(cursor_key)
+            print(f"Stopped fetching products after {max_pages} pages")
 
         except Exception as e:
             print(f"Error fetching user products: {e}")
-            return []
+
+    def get_user_products(self, include_raw: bool = True) -> List[Product]:
+        """Fetch all products for the authenticated user"""
+        return list(self.iter_user_products(include_raw=include_raw))
 
     def get_product_details(self, product_id: str) -> Dict[str, Any]:
         """Get detailed product information for editing"""
         try:
-            mpid = self.session.cookies.get("MPID", "")
-            device_id = self.session.cookies.get("device_id", "")
-            extra_headers = {
-                "Referer": "https://es.wallapop.com/",
-                "X-AppVersion": "89340",
-                "X-DeviceOS": "0",
-            }
-            if mpid:
-                extra_headers["MPID"] = mpid
-            if device_id:
-                extra_headers["X-DeviceID"] = device_id
-
             response = self._make_authenticated_request(
                 "GET",
                 f"{self.base_url}/api/v3/items/{product_id}/edit?language=es",
-                headers=extra_headers,
+                headers=details_headers(self.session.cookies),
             )
 
             if response and response.status_code == 200:
@@ -497,136 +738,70 @@ class WallapopClient:
             print(f"Error getting product details: {e}")
             return {}
 
+    def _get_edit_details(self, product_id: str) -> Dict[str, Any]:
+        """Edit details for a price update, from the cache or fetched once."""
+        details = self.details_cache.get(product_id)
+        if details:
+            return details
+        details = self.get_product_details(product_id)
+        if details:
+            self.details_cache.put(product_id, details)
+        return details
+
+    def prefetch_product_details(
+        self, product_ids: List[str], max_workers: Optional[int] = None
+    ) -> int:
+        """Fetch edit details for many items concurrently into the cache.
+
+        Items already cached are skipped. Returns how many items are cached.
+        """
+        self._ensure_session()
+        missing = [pid for pid in product_ids if pid not in self.details_cache]
+        if missing:
+            workers = max(1, min(max_workers or self.max_workers, len(missing)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # Workers run in the caller's context (e.g. its output prefix)
+                futures = [
+                    pool.submit(
+                        contextvars.copy_context().run, self._get_edit_details, pid
+                    )
+                    for pid in missing
+                ]
+                for future in futures:
+                    future.result()
+        return sum(1 for pid in product_ids if pid in self.details_cache)
+
+    def _update_headers(self) -> Dict[str, str]:
+        """Headers used by the web interface for the item update PUT."""
+        return update_headers(getattr(self.session, "cookies", None))
+
+    def _put_product_price(
+        self, product_id: str, new_price: float, details: Dict[str, Any]
+    ) -> Optional[requests.Response]:
+        """Send the PUT that changes the price, rebuilding the payload from edit details."""
+        payload = build_price_update_payload(details, new_price)
+        url = f"{self.base_url}/api/v3/items/{product_id}"
+        response = self._make_authenticated_request(
+            "PUT", url, json=payload, headers=self._update_headers()
+        )
+        if response is not None and response.status_code in (200, 204):
+            # The item changed; its cached details are no longer current
+            self.details_cache.invalidate(product_id)
+        return response
+
     def update_product_price(self, product_id: str, new_price: float) -> bool:
         """Update product price"""
         try:
             self._ensure_session()
-            # First get current product details
-            current_details = self.get_product_details(product_id)
+            # First get current product details (cached when already known)
+            current_details = self._get_edit_details(product_id)
             if not current_details:
                 print("Could not get current product details")
                 return False
 
-            # Extract required fields and update price using the correct API payload structure
-            data = current_details
-
-            # Extract the proper field values based on actual API response structure
-            title = (
-                data.get("title", {}).get("original")
-                if isinstance(data.get("title"), dict)
-                else data.get("title")
-            )
-            description = (
-                data.get("description", {}).get("original")
-                if isinstance(data.get("description"), dict)
-                else data.get("description")
-            )
-
-            # Get category from taxonomy if available - use the most specific one (last in array)
-            category_leaf_id = None
-            taxonomy = data.get("taxonomy", [])
-            if taxonomy and len(taxonomy) > 0:
-                category_leaf_id = taxonomy[-1].get("id")
-
-            # Get condition from type_attributes and map to API expected values
-            condition = None
-            type_attributes = data.get("type_attributes", {})
-            if "condition" in type_attributes:
-                api_condition = type_attributes["condition"].get("value")
-                # Map API response conditions to expected values (see HAR payloads)
-                condition_mapping = {
-                    "as_good_as_new": "good",
-                }
-                condition = condition_mapping.get(api_condition, api_condition)
-
-            # Extract location data
-            location = data.get("location", {})
-
-            # Extract delivery/shipping info
-            shipping = data.get("shipping", {})
-            delivery_info = {
-                "allowed_by_user": shipping.get("user_allows_shipping"),
-                "max_weight_kg": shipping.get("max_weight_kg")
-                or shipping.get("max_weight")
-                or shipping.get("weight"),
-            }
-
-            # Extract any brand info if available
-            brand = None
-            if "brand" in type_attributes:
-                brand = type_attributes["brand"].get("value")
-
-            # Build the correct payload structure as shown in the HAR file
-            payload = {
-                "attributes": {
-                    "title": title,
-                    "description": description,
-                    "condition": condition,
-                },
-                "category_leaf_id": category_leaf_id,
-                "price": {
-                    "cash_amount": round(
-                        new_price, 2
-                    ),
-                    "currency": "EUR",
-                    "apply_discount": False,
-                },
-                "location": {
-                    "latitude": location.get("latitude"),
-                    "longitude": location.get("longitude"),
-                    "approximated": location.get("approximated", False),
-                },
-                "delivery": delivery_info,
-            }
-
-            # Add brand if available
-            if brand:
-                payload["attributes"]["brand"] = brand
-
-            # Remove None values from nested structures
-            def clean_dict(value):
-                if isinstance(value, dict):
-                    cleaned = {}
-                    for key, nested in value.items():
-                        cleaned_value = clean_dict(nested)
-                        if cleaned_value in (None, {}, []):
-                            continue
-                        cleaned[key] = cleaned_value
-                    return cleaned
-                if isinstance(value, list):
-                    cleaned_list = [
-                        clean_dict(item) for item in value if item is not None
-                    ]
-                    return [item for item in cleaned_list if item not in ({}, [])]
-                return value
-
-            payload = clean_dict(payload)
-
             print(f"Updating product {product_id} price to €{new_price}")
 
-            # Make authenticated PUT request to update the product with correct headers
-            url = f"{self.base_url}/api/v3/items/{product_id}"
-
-            # Add the specific headers used by the web interface
-            extra_headers = {
-                "Accept": "application/vnd.upload-v2+json",
-                "Content-Type": "application/json",
-                "Referer": "https://es.wallapop.com/",
-                "Origin": "https://es.wallapop.com",
-                "X-AppVersion": "811030",
-                "X-DeviceOS": "0",
-                "DeviceOS": "0",
-            }
-
-            # Add device ID if available from session
-            if hasattr(self.session, "cookies"):
-                device_id = self.session.cookies.get("device_id", "")
-                if device_id:
-                    extra_headers["X-DeviceID"] = device_id
-
-            response = self._make_authenticated_request(
-                "PUT", url, json=payload, headers=extra_headers
-            )
+            response = self._put_product_price(product_id, new_price, current_details)
 
             if response and response.status_code in [200, 204]:
                 print(f"✓ Price updated successfully to €{new_price}")
@@ -643,10 +818,120 @@ class WallapopClient:
             print(f"Error updating product price: {e}")
             return False
 
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """Return the semaphore bounding in-flight requests to the host of ``url``."""
+        host = urlsplit(url).netloc
+        with self._host_slots_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_slots[host] = slot
+            return slot
+
+    def _update_one_for_batch(
+        self,
+        product_id: str,
+        new_price: float,
+        check: Optional[Callable[[str, Dict[str, Any]], Optional[str]]] = None,
+    ) -> Dict[str, Any]:
+        """Fetch edit details and PUT the new price for a single batch item."""
+        started = time.perf_counter()
+        result: Dict[str, Any] = {
+            "success": False,
+            "price": new_price,
+            "status_code": None,
+            "error": None,
+        }
+        try:
+            with self._host_slot(self.base_url):
+                details = self._get_edit_details(product_id)
+            if not details:
+                result["error"] = "Could not get current product details"
+                return result
+            skipped = check(product_id, details) if check is not None else None
+            if skipped:
+                result["skipped"] = skipped
+                return result
+            with self._host_slot(self.base_url):
+                response = self._put_product_price(product_id, new_price, details)
+            if response is None:
+                result["error"] = "No response"
+                return result
+            result["status_code"] = response.status_code
+            if response.status_code in (200, 204):
+                result["success"] = True
+            else:
+                body = ""
+                try:
+                    body = (response.text or "")[:200]
+                except Exception:
+                    body = ""
+                result["error"] = f"HTTP {response.status_code} {body}".strip()
+        except Exception as e:
+            result["error"] = str(e)
+        finally:
+            result["elapsed"] = time.perf_counter() - started
+        return result
+
+    def update_prices_batch(
+        self,
+        changes: Dict[str, float],
+        max_workers: Optional[int] = None,
+        check: Optional[Callable[[str, Dict[str, Any]], Optional[str]]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Update many prices concurrently.
+
+        Items whose edit details are cached (by prefetch_product_details)
+        need only the PUT; for the rest the details
+        GET is made first, and the worker pool keeps several items in flight so
+        one item's PUT overlaps with the next items' detail fetches. Concurrency is bounded by
+        ``max_workers`` (default ``self.max_workers``) and by
+        ``self.per_host_limit`` simultaneous requests per host.
+
+        ``check(product_id, details)`` runs after the details are known and
+        before the PUT; a non-empty return value skips the item and is
+        reported as ``skipped``.
+
+        Returns a report keyed by product id with ``success``, ``price``,
+        ``status_code``, ``error`` and ``elapsed`` (seconds) for every item.
+        """
+        if not changes:
+            return {}
+        self._ensure_session()
+        workers = max(1, min(max_workers or self.max_workers, len(changes)))
+
+        # Only remounts when more workers are requested than the pool was sized for
+        self._ensure_pool_size(max(workers, self.per_host_limit))
+
+        # Obtain the token once up front so workers don't race to refresh it
+        try:
+            self.session_manager.get_valid_token()
+        except Exception:
+            pass
+
+        report: Dict[str, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Workers run in the caller's context (e.g. its output prefix)
+            futures = {
+                pool.submit(
+                    contextvars.copy_context().run,
+                    self._update_one_for_batch,
+                    pid,
+                    price,
+                    check,
+                ): pid
+                for pid, price in changes.items()
+            }
+            for future in as_completed(futures):
+                report[futures[future]] = future.result()
+        return report
+
     def refresh_session(self) -> bool:
         """Refresh the session if needed"""
-        # Backwards compatibility: delegate to access token refresh
-        ok, _ = self.session_manager.refresh_access_token()
+        # Backwards compatibility: delegate to access token refresh, joining
+        # any refresh already in flight for the current token
+        spm = self.session_manager
+        ok, _ = spm.refresh_token_single_flight(stale_token=spm.current_token)
         return ok
 
     # Allow tests to patch this method directly
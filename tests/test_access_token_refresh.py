@@ -1,4 +1,5 @@
 import json
+from datetime import datetime
 from typing import Callable, Dict, Optional
 
 from requests.cookies import RequestsCookieJar
@@ -299,3 +300,338 @@ def test_make_authenticated_request_retries_on_401():
         if c[1].startswith("https://api.wallapop.com/api/v3/users/me/")
     ]
     assert len(user_calls) >= 2
+
+
+def _make_jwt(exp: float) -> str:
+    import base64
+
+    def part(obj):
+        raw = base64.urlsafe_b64encode(json.dumps(obj).encode()).decode()
+        return raw.rstrip("=")
+
+    return f"{part({'alg': 'none'})}.{part({'exp': exp})}.sig"
+
+
+def test_refreshed_token_is_persisted_and_reused():
+    import os
+    import stat
+    import time
+
+    jwt = _make_jwt(time.time() + 3600)
+
+    def responder(url: str, kwargs: Dict):
+        if url.endswith("/api/auth/federated-session"):
+            return FakeResponse(200, data={"token": jwt})
+        return FakeResponse(200, data={})
+
+    spm = SessionPersistenceManager()
+    spm._http2_available = False
+    spm.session = FakeSession(responder)
+    seed_required_cookies(spm.session.cookies)
+
+    ok, token = spm.get_valid_token()
+    assert ok is True and token == jwt
+    # Expiry comes from the JWT exp claim rather than the 5-minute default
+    assert spm.token_expires_at.timestamp() > time.time() + 3000
+    assert spm.token_file.exists()
+    assert stat.S_IMODE(os.stat(spm.token_file).st_mode) == 0o600
+
+    # A new manager with the same session cookies reuses the token without network calls
+    spm2 = SessionPersistenceManager()
+    spm2.session = FakeSession(responder)
+    seed_required_cookies(spm2.session.cookies)
+    ok2, token2 = spm2.get_valid_token()
+    assert ok2 is True and token2 == jwt
+    assert spm2.session.calls == []
+
+
+def test_saved_token_ignored_for_other_session_or_when_expired():
+    import time
+
+    def responder(url: str, kwargs: Dict):
+        if url.endswith("/api/auth/federated-session"):
+            return FakeResponse(200, data={"token": "FRESH"})
+        return FakeResponse(200, data={})
+
+    spm = SessionPersistenceManager()
+    spm.session = FakeSession(responder)
+    seed_required_cookies(spm.session.cookies)
+    spm.current_token = _make_jwt(time.time() + 3600)
+    spm.token_expires_at = datetime.fromtimestamp(time.time() + 3600)
+    spm._save_token()
+
+    # Different account (session-token) must not reuse it
+    other = SessionPersistenceManager()
+    other._http2_available = False
+    other.session = FakeSession(responder)
+    seed_required_cookies(other.session.cookies)
+    other.session.cookies.set(
+        "__Secure-next-auth.session-token", "X" * 1200, domain="es.wallapop.com"
+    )
+    assert other._load_token() is False
+
+    # Expired token must not be reused either
+    spm.token_expires_at = datetime.fromtimestamp(time.time() - 10)
+    spm._save_token()
+    again = SessionPersistenceManager()
+    again._http2_available = False
+    again.session = FakeSession(responder)
+    seed_required_cookies(again.session.cookies)
+    ok, token = again.get_valid_token()
+    assert ok is True and token == "FRESH"
+
+
+def test_refresh_records_strategy_and_prefers_it_next_time():
+    def responder(url: str, kwargs: Dict):
+        if url.endswith("/api/auth/federated-session"):
+            params = kwargs.get("params") or {}
+            if "token" in params:
+                return FakeResponse(200, data={"accessToken": "QUERY_TOKEN"})
+            return FakeResponse(200, data={})
+        return FakeResponse(200, data={})
+
+    spm = SessionPersistenceManager()
+    spm._http2_available = False
+    spm.session = FakeSession(responder)
+    seed_required_cookies(spm.session.cookies)
+
+    ok, _ = spm.refresh_access_token()
+    assert ok is True
+    assert spm.last_refresh_strategy == "federated_session_query"
+    stats = spm.get_refresh_stats()
+    assert stats["federated_session_query"]["successes"] == 1
+    assert stats["federated_session"]["failures"] == 1
+    assert stats["federated_session_query"]["mean_success_seconds"] is not None
+    assert spm.refresh_stats_file.exists()
+
+    # A later manager loads the stats and goes straight to the winning strategy
+    spm2 = SessionPersistenceManager()
+    spm2._http2_available = False
+    spm2.session = FakeSession(responder)
+    seed_required_cookies(spm2.session.cookies)
+    assert spm2.preferred_refresh_strategy() == "federated_session_query"
+
+    ok2, token2 = spm2.refresh_access_token()
+    assert ok2 is True and token2 == "QUERY_TOKEN"
+    urls = [url for _, url, _ in spm2.session.calls]
+    assert len(urls) == 1
+    assert not any(url.endswith("/app/chat") for url in urls)
+
+
+def test_fast_path_failure_falls_back_to_full_sequence():
+    state = {"query_works": True}
+
+    def responder(url: str, kwargs: Dict):
+        if url.endswith("/api/auth/federated-session"):
+            params = kwargs.get("params") or {}
+            if "token" in params and state["query_works"]:
+                return FakeResponse(200, data={"accessToken": "QUERY_TOKEN"})
+            return FakeResponse(200, data={})
+        if "/api/v3/users/me" in url:
+            return FakeResponse(
+                200,
+                data={},
+                set_cookie="accessToken=NUDGE_TKN; Path=/; Domain=.wallapop.com",
+            )
+        return FakeResponse(200, data={})
+
+    spm = SessionPersistenceManager()
+    spm._http2_available = False
+    spm.session = FakeSession(responder)
+    seed_required_cookies(spm.session.cookies)
+    spm._refresh_stats = {
+        "federated_session_query": {
+            "successes": 3,
+            "failures": 0,
+            "success_seconds": 0.3,
+            "last_success": None,
+        }
+    }
+    state["query_works"] = False
+
+    ok, token = spm.refresh_access_token()
+    assert ok is True and token == "NUDGE_TKN"
+    # Warmups ran once the fast path failed
+    assert any(url.endswith("/app/chat") for _, url, _ in spm.session.calls)
+    assert spm.get_refresh_stats()["federated_session_query"]["failures"] >= 1
+
+
+def test_concurrent_callers_share_one_refresh():
+    import threading
+    import time
+
+    state = {"fed_calls": 0}
+
+    def responder(url: str, kwargs: Dict):
+        if url.endswith("/api/auth/federated-session"):
+            state["fed_calls"] += 1
+            time.sleep(0.05)
+            return FakeResponse(200, data={"token": "SHARED_TOKEN"})
+        return FakeResponse(200, data={})
+
+    spm = SessionPersistenceManager()
+    spm._http2_available = False
+    spm.session = FakeSession(responder)
+    seed_required_cookies(spm.session.cookies)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(spm.get_valid_token()))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [(True, "SHARED_TOKEN")] * 8
+    assert state["fed_calls"] == 1
+
+
+def test_client_refresh_session_joins_refresh_in_flight():
+    import threading
+    import time
+
+    from wallapop_auto_adjust.wallapop_client import WallapopClient
+
+    spm = SessionPersistenceManager()
+    spm.current_token = "OLD"
+    refreshes = []
+
+    def refresh_access_token():
+        refreshes.append(1)
+        time.sleep(0.1)
+        spm.current_token = "NEW"
+        return True, "NEW"
+
+    spm.refresh_access_token = refresh_access_token
+    client = WallapopClient()
+    client.session_manager = spm
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(client.refresh_session()))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [True] * 5
+    assert len(refreshes) == 1
+
+
+def test_background_refresh_renews_before_expiry():
+    import time
+    from datetime import timedelta
+
+    tokens = iter(["BG_1", "BG_2", "BG_3"])
+
+    def responder(url: str, kwargs: Dict):
+        if url.endswith("/api/auth/federated-session"):
+            return FakeResponse(200, data={"token": next(tokens, "BG_N")})
+        return FakeResponse(200, data={})
+
+    spm = SessionPersistenceManager()
+    spm._http2_available = False
+    spm.session = FakeSession(responder)
+    seed_required_cookies(spm.session.cookies)
+    spm.current_token = "OLD"
+    spm.token_expires_at = datetime.now() + timedelta(seconds=1)
+
+    spm.start_background_refresh(lead_seconds=0.5)
+    try:
+        deadline = time.time() + 3
+        while spm.current_token == "OLD" and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        spm.stop_background_refresh()
+
+    assert spm.current_token == "BG_1"
+    assert spm._background_thread is None
+
+
+def test_make_authenticated_request_retries_transient_errors():
+    from wallapop_auto_adjust.http_retry import RetryPolicy
+
+    statuses = [503, 429, 200]
+
+    def responder(url: str, kwargs: Dict):
+        if url.endswith("/api/auth/federated-session"):
+            return FakeResponse(200, data={"token": "TOKEN"})
+        if url.endswith("/api/v3/user/items"):
+            return FakeResponse(statuses.pop(0), data={})
+        return FakeResponse(200, data={})
+
+    spm = SessionPersistenceManager()
+    spm._http2_available = False
+    spm.retry_policy = RetryPolicy(backoff_base=0)
+    spm.session = FakeSession(responder)
+    seed_required_cookies(spm.session.cookies)
+
+    resp = spm.make_authenticated_request(
+        "GET", "https://api.wallapop.com/api/v3/user/items"
+    )
+    assert resp.status_code == 200
+    assert resp.retries == 2
+    # Every call made on the session carries a timeout
+    assert all(kw.get("timeout") for (_, _, kw) in spm.session.calls)
+
+
+def test_authenticated_requests_draw_from_rate_limiter():
+    from wallapop_auto_adjust.rate_limit import RateLimiter
+
+    def responder(url: str, kwargs: Dict):
+        if url.endswith("/api/auth/federated-session"):
+            return FakeResponse(200, data={"token": "TOKEN"})
+        return FakeResponse(200, data={})
+
+    class RecordingLimiter(RateLimiter):
+        def __init__(self):
+            super().__init__()
+            self.acquired = []
+
+        def acquire(self, method, sleep=None):
+            self.acquired.append(method)
+            return 0.0
+
+    spm = SessionPersistenceManager()
+    spm._http2_available = False
+    spm.rate_limiter = RecordingLimiter()
+    spm.session = FakeSession(responder)
+    seed_required_cookies(spm.session.cookies)
+
+    spm.make_authenticated_request("GET", "https://api.wallapop.com/api/v3/user/items")
+    spm.make_authenticated_request("POST", "https://api.wallapop.com/api/v3/items/1")
+    # Only the API calls are limited, not the token refresh round-trips
+    assert spm.rate_limiter.acquired == ["GET", "POST"]
+
+
+def test_shared_session_manager_authenticates_once_per_account(tmp_path):
+    import time
+
+    from wallapop_auto_adjust.cookie_extraction_guide import CookieExtractionGuide
+    from wallapop_auto_adjust.session_persistence import shared_session_manager
+    from wallapop_auto_adjust.wallapop_client import WallapopClient
+
+    spm = shared_session_manager()
+    assert WallapopClient().session_manager is spm
+    assert shared_session_manager(tmp_path / "shop") is not spm
+    assert WallapopClient(session_dir=tmp_path / "shop").session_manager is (
+        shared_session_manager(tmp_path / "shop")
+    )
+
+    jwt = _make_jwt(time.time() + 3600)
+    spm.session = FakeSession(
+        lambda url, kwargs: FakeResponse(200, data={"token": jwt})
+    )
+    seed_required_cookies(spm.session.cookies)
+    assert spm.get_valid_token() == (True, jwt)
+    calls = len(spm.session.calls)
+
+    # The guide and a client built later reuse the live token: no new refresh
+    assert CookieExtractionGuide().run() is True
+    client = WallapopClient()
+    assert client.session_manager.get_valid_token() == (True, jwt)
+    assert len(spm.session.calls) == calls
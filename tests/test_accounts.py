@@ -0,0 +1,96 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from wallapop_auto_adjust.accounts import (
+    AccountProfile,
+    accounts_dir,
+    discover_profiles,
+    run_accounts,
+)
+from wallapop_auto_adjust.metrics import RequestMetrics
+from wallapop_auto_adjust.session_persistence import SessionPersistenceManager
+from wallapop_auto_adjust.wallapop_client import WallapopClient
+
+
+def test_profiles_keep_session_files_apart():
+    shop = AccountProfile.named("shop-1")
+    assert shop.session_dir == accounts_dir() / "shop-1"
+    assert shop.config_path == str(shop.session_dir / "products_config.json")
+    with pytest.raises(ValueError):
+        AccountProfile.named("../elsewhere")
+
+    spm = SessionPersistenceManager(base_dir=shop.session_dir)
+    assert spm.token_file == shop.session_dir / "token.json"
+    assert spm.session_file.parent == shop.session_dir
+    default = SessionPersistenceManager()
+    assert (
+        default.session_file == Path.home() / ".wallapop-auto-adjust/session_data.json"
+    )
+
+    client = WallapopClient(session_dir=shop.session_dir)
+    assert client.session_manager.cookies_file == shop.session_dir / "cookies.json"
+    assert client.fingerprint_file.parent == shop.session_dir
+    assert client.session_manager.rate_limiter is not spm.rate_limiter
+
+    (shop.session_dir / "products.db").touch()
+    assert shop.config_path.endswith("products.db")
+    (accounts_dir() / "b-shop").mkdir()
+    assert [p.name for p in discover_profiles()] == ["b-shop", "shop-1"]
+
+
+def test_run_accounts_caps_concurrency_and_aggregates(capsys):
+    profiles = [AccountProfile.named(n) for n in ("a", "b", "c", "d")]
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def process(profile, apply):
+        with lock:
+            active.append(profile.name)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.remove(profile.name)
+        if profile.name == "c":
+            raise RuntimeError("no saved session")
+        print(f"planning\nfor {profile.name}")
+        return {
+            "products": 3,
+            "planned": 2,
+            "updated": 2 if apply else 0,
+            "requests": 5,
+            "retries": 1,
+        }
+
+    report = run_accounts(profiles, apply=True, max_parallel=2, process=process)
+
+    assert max(peak) == 2
+    assert report["accounts"]["c"] == {"success": False, "error": "no saved session"}
+    assert report["accounts"]["a"]["updated"] == 2
+    assert report["totals"] == {
+        "accounts": 4,
+        "succeeded": 3,
+        "failed": 1,
+        "products": 9,
+        "planned": 6,
+        "updated": 6,
+        "requests": 15,
+        "retries": 3,
+    }
+    out = capsys.readouterr().out.splitlines()
+    for name in "abd":
+        assert f"[{name}] planning" in out
+        assert f"[{name}] for {name}" in out
+    assert "[c] failed: no saved session" in out
+
+
+def test_account_metrics_feed_the_process_totals():
+    total = RequestMetrics()
+    account = RequestMetrics(parent=total)
+    account.record("GET", "https://api.wallapop.com/api/v3/user/items", 200, 0.1)
+    total.record("GET", "https://api.wallapop.com/api/v3/user/items", 200, 0.1)
+    assert account.summary()["requests"] == 1
+    assert total.summary()["requests"] == 2
@@ -0,0 +1,176 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from wallapop_auto_adjust.async_client import AsyncWallapopClient
+from wallapop_auto_adjust.http_retry import RetryPolicy
+
+
+class StubSessionManager:
+    def __init__(self):
+        self.session = object()
+        self.refreshes = 0
+
+    def get_valid_token(self):
+        return True, "ASYNC_TOKEN"
+
+    def refresh_access_token(self):
+        self.refreshes += 1
+        return True, "REFRESHED_TOKEN"
+
+    def refresh_token_single_flight(self, stale_token=None):
+        return self.refresh_access_token()
+
+
+def make_client(handler):
+    client = AsyncWallapopClient(
+        session_manager=StubSessionManager(), retry_policy=RetryPolicy(backoff_base=0)
+    )
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_get_user_products_normalizes_listing():
+    def handler(request):
+        assert request.headers["Authorization"] == "Bearer ASYNC_TOKEN"
+        return httpx.Response(
+            200,
+            json=[
+                {
+                    "id": "p1",
+                    "title": "Lamp",
+                    "price": {"amount": 12.5},
+                    "reserved": {"flag": True},
+                }
+            ],
+        )
+
+    async def scenario():
+        client = make_client(handler)
+        try:
+            return await client.get_user_products()
+        finally:
+            await client.aclose()
+
+    products = asyncio.run(scenario())
+    assert products[0]["id"] == "p1"
+    assert products[0]["price"] == 12.5
+    assert products[0]["status"] == "reserved"
+
+
+def test_get_user_products_follows_next_page_cursor():
+    pages = {
+        None: ([{"id": "p1", "price": {"amount": 1}}], {"X-NextPage": "since=c2"}),
+        "c2": ([{"id": "p2", "price": {"amount": 2}}], {}),
+    }
+
+    def handler(request):
+        items, headers = pages[request.url.params.get("since")]
+        return httpx.Response(200, json=items, headers=headers)
+
+    async def scenario():
+        client = make_client(handler)
+        try:
+            return await client.get_user_products(), client.last_listing_complete
+        finally:
+            await client.aclose()
+
+    products, complete = asyncio.run(scenario())
+    assert [p["id"] for p in products] == ["p1", "p2"]
+    assert complete
+
+
+def test_update_prices_batch_runs_concurrently_and_builds_payload():
+    puts = {}
+
+    def handler(request):
+        if request.method == "GET":
+            return httpx.Response(
+                200, json={"title": "Lamp", "taxonomy": [{"id": "9"}]}
+            )
+        item_id = request.url.path.rsplit("/", 1)[-1]
+        puts[item_id] = json.loads(request.content)
+        return httpx.Response(500 if item_id == "bad" else 200, text="")
+
+    async def scenario():
+        client = make_client(handler)
+        try:
+            return await client.update_prices_batch(
+                {"a": 5.0, "b": 7.25, "bad": 1.0}, concurrency=2
+            )
+        finally:
+            await client.aclose()
+
+    report = asyncio.run(scenario())
+    assert report["a"]["success"] and report["b"]["success"]
+    assert report["bad"]["success"] is False and report["bad"]["status_code"] == 500
+    assert puts["b"]["price"]["cash_amount"] == 7.25
+    assert puts["a"]["category_leaf_id"] == "9"
+
+
+def test_make_authenticated_request_refreshes_on_401():
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers["Authorization"])
+        if len(seen) == 1:
+            return httpx.Response(401)
+        return httpx.Response(200, json={})
+
+    async def scenario():
+        client = make_client(handler)
+        try:
+            resp = await client.make_authenticated_request("GET", "https://x/y")
+            return client, resp
+        finally:
+            await client.aclose()
+
+    client, resp = asyncio.run(scenario())
+    assert resp.status_code == 200
+    assert seen == ["Bearer ASYNC_TOKEN", "Bearer REFRESHED_TOKEN"]
+    assert client.session_manager.refreshes == 1
+
+
+def test_concurrent_401s_share_one_refresh():
+    from datetime import datetime, timedelta
+
+    from wallapop_auto_adjust.session_persistence import SessionPersistenceManager
+
+    spm = SessionPersistenceManager()
+    spm.session = object()
+    spm.current_token = "OLD"
+    spm.token_expires_at = datetime.now() + timedelta(hours=1)
+    refreshes = []
+
+    def refresh_access_token():
+        refreshes.append(1)
+        spm.current_token = "NEW"
+        spm.token_expires_at = datetime.now() + timedelta(hours=1)
+        return True, "NEW"
+
+    spm.refresh_access_token = refresh_access_token
+
+    def handler(request):
+        if request.headers["Authorization"] == "Bearer OLD":
+            return httpx.Response(401)
+        return httpx.Response(200, json={})
+
+    async def scenario():
+        client = AsyncWallapopClient(session_manager=spm)
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await asyncio.gather(
+                *(
+                    client.make_authenticated_request("GET", "https://x/y")
+                    for _ in range(10)
+                )
+            )
+        finally:
+            await client.aclose()
+
+    responses = asyncio.run(scenario())
+    assert [r.status_code for r in responses] == [200] * 10
+    assert len(refreshes) == 1
@@ -0,0 +1,24 @@
+from wallapop_auto_adjust.benchmark import endpoint_name, percentile, run_benchmark
+
+
+def test_endpoint_names_and_percentiles():
+    assert endpoint_name("GET", "/api/v3/items/abc/edit") == "edit"
+    assert endpoint_name("PUT", "/api/v3/items/abc") == "update"
+    assert endpoint_name("GET", "/api/v3/items/abc") == "other"
+    assert percentile([5, 1, 4, 2, 3], 50) == 3
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([], 50) is None
+
+
+def test_benchmark_runs_real_pipeline_against_mock_server():
+    report = run_benchmark(products=25, page_size=10, latency_ms=0, store="sqlite")
+
+    assert (report["products"], report["planned"], report["updated"]) == (25, 25, 25)
+    counts = report["requests"]["by_endpoint"]
+    assert counts["listing"] == {"200": 3}
+    assert counts["edit"] == {"200": 25}
+    assert counts["update"] == {"200": 25}
+    assert counts["federated-session"] == {"200": 1}
+    assert report["latency_ms"]["update"]["count"] == 25
+    assert set(report["phases"]) == {"token", "listing", "plan", "apply", "flush"}
+    assert report["memory"]["python_heap_peak_kb"] > 0
@@ -0,0 +1,94 @@
+import sys
+from unittest.mock import MagicMock, Mock
+
+from wallapop_auto_adjust import browser_pool
+from wallapop_auto_adjust.browser_pool import BrowserPool
+from wallapop_auto_adjust.session_persistence import SessionPersistenceManager
+
+
+class FakeDriver:
+    def __init__(self):
+        self.alive = True
+        self.quit_calls = 0
+        self.current_url = "data:,"
+
+    @property
+    def window_handles(self):
+        if not self.alive:
+            raise RuntimeError("chrome not reachable")
+        return ["main"]
+
+    def quit(self):
+        self.quit_calls += 1
+        self.alive = False
+
+
+def test_pool_reuses_relaunches_and_reaps():
+    now = [0.0]
+    pool = BrowserPool(idle_timeout=60, max_browsers=2, clock=lambda: now[0])
+    launched = []
+
+    def launch():
+        launched.append(FakeDriver())
+        return launched[-1]
+
+    with pool.lease("a", launch) as first:
+        pass
+    with pool.lease("a", launch) as second:
+        assert second is first
+    assert len(launched) == 1
+
+    # A crashed browser is replaced on the next lease
+    first.alive = False
+    with pool.lease("a", launch) as third:
+        assert third is not first
+    assert pool.stats()["a"] == {"running": True, "launches": 2, "uses": 3}
+
+    # A third account evicts the least recently used idle browser
+    now[0] = 10
+    with pool.lease("b", launch):
+        pass
+    now[0] = 20
+    with pool.lease("c", launch):
+        pass
+    assert not pool.stats()["a"]["running"]
+    assert launched[1].quit_calls == 1
+
+    now[0] = 75
+    assert pool.reap_idle() == 1  # b, idle for 65s
+    assert pool.stats()["c"]["running"]
+    pool.shutdown()
+    assert all(d.quit_calls == 1 for d in launched)
+
+
+def test_browser_fallback_keeps_pooled_browser(monkeypatch, tmp_path):
+    pool = BrowserPool(idle_timeout=600)
+    monkeypatch.setattr(browser_pool, "_pool", pool)
+    monkeypatch.setenv("WALLAPOP_BROWSER_POOL", "1")
+    spm = SessionPersistenceManager(base_dir=tmp_path / "acct")
+    driver = FakeDriver()
+    driver.current_url = "https://es.wallapop.com/app/chat"
+    driver.get = Mock()
+    driver.add_cookie = Mock()
+    driver.execute_script = Mock(return_value={"ok": True, "text": '{"token": "t"}'})
+    uc = Mock(Chrome=Mock(return_value=driver))
+    monkeypatch.setitem(sys.modules, "undetected_chromedriver", uc)
+    for name in (
+        "selenium",
+        "selenium.webdriver",
+        "selenium.webdriver.common",
+        "selenium.webdriver.common.by",
+        "selenium.webdriver.common.desired_capabilities",
+    ):
+        monkeypatch.setitem(sys.modules, name, MagicMock())
+
+    assert spm._browser_fallback_fetch_token() == (True, "t")
+    assert spm._browser_fallback_fetch_token() == (True, "t")
+    uc.Chrome.assert_called_once()
+    assert uc.Chrome.call_args.kwargs["user_data_dir"] == str(
+        tmp_path / "acct" / "browser_profile"
+    )
+    # Already on the site: only the XHR runs, no page navigation
+    driver.get.assert_not_called()
+    assert driver.quit_calls == 0
+    pool.shutdown()
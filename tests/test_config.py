@@ -114,3 +114,141 @@ class TestConfigManager:
         all_removed = config_manager.remove_sold_products([])
         assert set(all_removed) == {"Product 1 (12345)", "Product 3 (11111)"}
         assert config_manager.config["products"] == {}
+
+
+def test_write_behind_batches_writes_until_flush(tmp_path):
+    config_path = tmp_path / "products_config.json"
+    cfg = ConfigManager(str(config_path), write_behind=True, flush_interval=3600)
+    cfg.config["products"]["p1"] = {"name": "A", "adjustment": "keep"}
+
+    cfg.save_config()
+    cfg.update_last_modified("p1", "2024-01-01T00:00:00+00:00")
+
+    assert cfg.dirty is True
+    assert not config_path.exists()
+
+    cfg.flush()
+
+    assert cfg.dirty is False
+    saved = json.loads(config_path.read_text())
+    assert saved["products"]["p1"]["last_modified"] == "2024-01-01T00:00:00+00:00"
+
+
+def test_write_behind_flushes_after_interval(tmp_path):
+    config_path = tmp_path / "products_config.json"
+    cfg = ConfigManager(str(config_path), write_behind=True, flush_interval=0)
+    cfg.save_config()
+    assert config_path.exists()
+    assert cfg.dirty is False
+
+
+def test_atomic_write_keeps_previous_file_on_failure(tmp_path):
+    config_dir = tmp_path / "cfg"
+    config_dir.mkdir()
+    config_path = config_dir / "products_config.json"
+    cfg = ConfigManager(str(config_path))
+    cfg.config["settings"]["delay_days"] = 3
+    cfg.save_config()
+
+    cfg.config["settings"]["bad"] = object()  # not JSON serializable
+    with pytest.raises(TypeError):
+        cfg.save_config()
+
+    assert json.loads(config_path.read_text())["settings"]["delay_days"] == 3
+    assert [p.name for p in config_dir.iterdir()] == ["products_config.json"]
+
+
+def test_atomic_write_names_temp_file_after_target(tmp_path, monkeypatch):
+    import tempfile
+
+    from wallapop_auto_adjust.config import write_json_atomic
+
+    prefixes = []
+    mkstemp = tempfile.mkstemp
+
+    def spy(**kwargs):
+        prefixes.append(kwargs["prefix"])
+        return mkstemp(**kwargs)
+
+    monkeypatch.setattr(tempfile, "mkstemp", spy)
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    write_json_atomic(str(out_dir / "price_plan.json"), {"items": []})
+    assert prefixes == [".price_plan.json."]
+    assert [p.name for p in out_dir.iterdir()] == ["price_plan.json"]
+
+
+def test_write_behind_close_writes_pending_changes(tmp_path):
+    config_path = tmp_path / "products_config.json"
+    cfg = ConfigManager(str(config_path), write_behind=True, flush_interval=3600)
+    cfg.config["settings"]["delay_days"] = 5
+    cfg.save_config()
+    assert not config_path.exists()
+
+    cfg.close()
+    assert json.loads(config_path.read_text())["settings"]["delay_days"] == 5
+
+
+def test_due_index_bisects_and_tracks_updates(tmp_path):
+    cfg = ConfigManager(str(tmp_path / "products_config.json"))
+    day = 86400
+    now = 1_750_000_000.0
+
+    def iso(ts):
+        return datetime.fromtimestamp(ts).astimezone().isoformat()
+
+    cfg.config["products"] = {
+        "old": {"name": "Old", "last_modified": iso(now - 10 * day)},
+        "recent": {"name": "Recent", "last_modified": iso(now - 2 * day)},
+        "never": {"name": "Never", "last_modified": None},
+        "garbage": {"name": "Garbage", "last_modified": "not a date"},
+    }
+
+    assert cfg.due_product_ids(now=now, delay_days=3) == ["garbage", "never", "old"]
+    assert cfg.is_due("recent", now=now, delay_days=2)
+    assert not cfg.is_due("recent", now=now - 1, delay_days=2)
+    assert cfg.is_due("unknown", now=now, delay_days=3)
+
+    # Changes through the manager move the product in the index
+    cfg.update_last_modified("old", iso(now))
+    cfg.update_products([{"id": "new", "name": "New", "last_modified": None}])
+    cfg.remove_sold_products([{"id": pid} for pid in ("old", "recent", "never", "new")])
+    assert cfg.due_product_ids(now=now, delay_days=3) == ["never", "new"]
+
+    # Direct edits of the config dict are picked up by is_due
+    cfg.config["products"]["recent"]["last_modified"] = iso(now - 30 * day)
+    assert cfg.is_due("recent", now=now, delay_days=3)
+    assert cfg.due_product_ids(now=now, delay_days=3)[-1] == "recent"
+    assert cfg.due_product_ids(now=now, delay_days=0) == [
+        "never",
+        "new",
+        "recent",
+        "old",
+    ]
+
+
+def test_due_ids_follow_direct_last_modified_edits(tmp_path):
+    cfg = ConfigManager(str(tmp_path / "products_config.json"))
+    day = 86400
+    now = 1_750_000_000.0
+
+    def iso(ts):
+        return datetime.fromtimestamp(ts).astimezone().isoformat()
+
+    cfg.config["products"] = {
+        "a": {"name": "A", "last_modified": iso(now - 10 * day)},
+        "b": {"name": "B", "last_modified": iso(now - day)},
+    }
+    assert cfg.due_product_ids(now=now, delay_days=3) == ["a"]
+
+    # Edited in the dict only: no is_due or update_last_modified call since
+    cfg.config["products"]["a"]["last_modified"] = iso(now)
+    cfg.config["products"]["b"]["last_modified"] = iso(now - 5 * day)
+    due = cfg.due_product_ids(now=now, delay_days=3)
+    assert due == ["b"]
+    assert due == [pid for pid in ("a", "b") if cfg.is_due(pid, now=now, delay_days=3)]
+
+    # Same product count, different products
+    del cfg.config["products"]["b"]
+    cfg.config["products"]["c"] = {"name": "C", "last_modified": None}
+    assert cfg.due_product_ids(now=now, delay_days=3) == ["c"]
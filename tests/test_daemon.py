@@ -0,0 +1,104 @@
+from datetime import datetime
+
+from wallapop_auto_adjust.config import ConfigManager
+from wallapop_auto_adjust.daemon import PriceDaemon
+from wallapop_auto_adjust.policy import PolicyEngine
+from wallapop_auto_adjust.price_adjuster import PriceAdjuster
+from wallapop_auto_adjust.product import Product
+
+DAY = 86400
+NOW = 1_750_000_000.0
+
+
+def iso(ts):
+    return datetime.fromtimestamp(ts).astimezone().isoformat()
+
+
+class FakeClient:
+    def __init__(self, products):
+        self.products = products
+        self.last_listing_complete = True
+        self.listings = 0
+        self.batches = []
+
+    def get_user_products(self, include_raw=True):
+        self.listings += 1
+        return list(self.products)
+
+    def update_prices_batch(self, changes):
+        self.batches.append(dict(changes))
+        return {pid: {"success": True} for pid in changes}
+
+
+def make_daemon(tmp_path, clock):
+    cfg = ConfigManager(str(tmp_path / "products_config.json"))
+    cfg.config["settings"]["delay_days"] = 3
+    cfg.config["products"] = {
+        "a": {"name": "A", "adjustment": 0.9, "last_modified": iso(NOW - 1 * DAY)},
+        "b": {"name": "B", "adjustment": 0.9, "last_modified": iso(NOW - 5 * DAY)},
+    }
+    products = [
+        Product(id="a", name="A", price_cents=1000),
+        Product(id="b", name="B", price_cents=2000),
+    ]
+    client = FakeClient(products)
+    adjuster = PriceAdjuster(client, cfg)
+    daemon = PriceDaemon(
+        client, cfg, adjuster, PolicyEngine(), listing_interval=3600, clock=clock
+    )
+    return daemon, client, cfg
+
+
+def test_daemon_wakes_each_product_when_its_window_expires(tmp_path, monkeypatch):
+    now = [NOW]
+    daemon, client, cfg = make_daemon(tmp_path, lambda: now[0])
+    # Recorded update times follow the fake clock
+    monkeypatch.setattr(
+        cfg,
+        "update_last_modified",
+        lambda pid, date=None: ConfigManager.update_last_modified(
+            cfg, pid, date or iso(now[0])
+        ),
+    )
+
+    daemon.refresh_listing()
+    assert daemon.next_due_time() == cfg.last_modified_timestamp("b") + 3 * DAY
+
+    # b is overdue now; a only becomes due two days later
+    assert daemon.tick(NOW) == 1
+    assert client.batches == [{"b": 18.0}]
+    assert daemon.products["b"].price == 18.0
+    assert abs(daemon.next_due_time() - (NOW + 2 * DAY)) < 1
+
+    assert daemon.tick(NOW + DAY) == 0
+    now[0] = NOW + 2 * DAY + 1
+    assert daemon.tick() == 1
+    assert client.batches[-1] == {"a": 9.0}
+    # b is next, three days after its own update
+    assert abs(daemon.next_due_time() - (NOW + 3 * DAY)) < 2
+
+
+def test_run_refreshes_listing_and_stops(tmp_path):
+    daemon, client, cfg = make_daemon(tmp_path, lambda: NOW)
+    daemon.apply = False
+    daemon.run(max_ticks=1)
+    assert client.listings == 1
+    assert client.batches == []
+    # Dry run reschedules instead of spinning on the same due product
+    assert daemon.next_due_time() >= NOW + 3600
+
+
+def test_incomplete_listing_keeps_products_from_missing_pages(tmp_path):
+    daemon, client, cfg = make_daemon(tmp_path, lambda: NOW)
+    daemon.refresh_listing()
+    due_a = daemon._scheduled["a"]
+
+    # Only the page with b arrived this time
+    client.products = [Product(id="b", name="B", price_cents=1500)]
+    client.last_listing_complete = False
+    assert daemon.refresh_listing()
+
+    assert set(daemon.products) == {"a", "b"}
+    assert daemon.products["b"].price == 15.0
+    assert daemon._scheduled["a"] == due_a
+    assert "a" in cfg.config["products"]
@@ -0,0 +1,128 @@
+from unittest.mock import Mock
+
+import pytest
+
+from wallapop_auto_adjust.details_cache import EditDetailsCache
+from wallapop_auto_adjust.wallapop_client import WallapopClient
+
+
+def full_item(pid, modified=1700000000000):
+    return {
+        "id": pid,
+        "title": {"original": f"Item {pid}"},
+        "description": {"original": "desc"},
+        "taxonomy": [{"id": "100"}],
+        "location": {"latitude": 40.4, "longitude": -3.7},
+        "shipping": {"user_allows_shipping": True},
+        "type_attributes": {"condition": {"value": "new"}, "brand": {"value": "Acme"}},
+        "price": {"amount": 10.0},
+        "modified_date": modified,
+    }
+
+
+@pytest.fixture()
+def client():
+    client = WallapopClient()
+    client._ensure_session = Mock()
+    client.session = Mock()
+    client.session.cookies = {"MPID": "", "device_id": "dev"}
+    return client
+
+
+def listing_response(items):
+    response = Mock(status_code=200, headers={}, text="")
+    response.json.return_value = items
+    return response
+
+
+def test_cache_drops_entries_for_changed_items():
+    cache = EditDetailsCache()
+    cache.put("a", {"title": "A", "modified_date": 1700000000000})
+    assert cache.get("a", modified=1700000000.0) == {
+        "title": "A",
+        "modified_date": 1700000000000,
+    }
+    cache.observe("a", 1700000999.0)
+    assert "a" not in cache
+
+    cache.put("b", {"title": "B"})
+    cache.invalidate("b")
+    assert cache.get("b") is None
+
+
+def test_update_builds_payload_from_edit_details_not_listing(client):
+    # Listing items carry the same top-level keys as /edit, but not the
+    # nested values the PUT needs (condition value, shipping weight)
+    listed = full_item("a")
+    listed["type_attributes"] = {"condition": {}}
+    edit = full_item("a")
+    edit["shipping"]["max_weight_kg"] = 5
+    put_ok = Mock(status_code=200, text="")
+    client._make_authenticated_request = Mock(
+        side_effect=[listing_response([listed]), put_ok]
+    )
+    client.get_product_details = Mock(return_value=edit)
+
+    assert [p.id for p in client.iter_user_products(include_raw=False)] == ["a"]
+    assert "a" not in client.details_cache
+    assert client.update_product_price("a", 9.0) is True
+
+    client.get_product_details.assert_called_once_with("a")
+    method, url = client._make_authenticated_request.call_args_list[1].args[:2]
+    assert (method, url) == ("PUT", f"{client.base_url}/api/v3/items/a")
+    payload = client._make_authenticated_request.call_args_list[1].kwargs["json"]
+    assert payload["attributes"]["condition"] == "new"
+    assert payload["attributes"]["brand"] == "Acme"
+    assert payload["delivery"]["max_weight_kg"] == 5
+    assert payload["price"]["cash_amount"] == 9.0
+    assert "a" not in client.details_cache
+
+
+def test_listing_drops_details_of_changed_items(client):
+    client.details_cache.put("a", full_item("a"))
+    client._make_authenticated_request = Mock(
+        return_value=listing_response([full_item("a", modified=1700000999000)])
+    )
+
+    list(client.iter_user_products(include_raw=False))
+    assert "a" not in client.details_cache
+
+
+def test_prefetch_fills_cache_once_per_item(client):
+    client.get_product_details = Mock(side_effect=lambda pid: full_item(pid))
+    client._make_authenticated_request = Mock(return_value=Mock(status_code=204))
+
+    assert client.prefetch_product_details(["a", "b"], max_workers=2) == 2
+    assert client.prefetch_product_details(["a", "b"]) == 2
+    assert client.get_product_details.call_count == 2
+
+    report = client.update_prices_batch({"a": 5.0, "b": 6.0})
+    assert all(r["success"] for r in report.values())
+    assert client.get_product_details.call_count == 2
+    assert len(client.details_cache) == 0
+
+
+def test_batches_keep_the_pooled_adapter(client):
+    import requests
+
+    client.session = requests.Session()
+    client.get_product_details = Mock(side_effect=lambda pid: full_item(pid))
+    client._make_authenticated_request = Mock(return_value=Mock(status_code=204))
+
+    client.update_prices_batch({"a": 5.0})
+    adapter = client.session.adapters["https://"]
+    client.update_prices_batch({"b": 6.0})
+    assert client.session.adapters["https://"] is adapter
+
+    # Grows only when more workers than the pool holds are requested
+    client.update_prices_batch({"a": 5.0, "b": 6.0}, max_workers=2)
+    assert client.session.adapters["https://"] is adapter
+    client._ensure_pool_size(32)
+    grown = client.session.adapters["https://"]
+    assert grown is not adapter and grown._pool_maxsize == 32
+
+    # An adapter mounted by the caller is never replaced
+    custom = type("CustomAdapter", (requests.adapters.HTTPAdapter,), {})()
+    client.session.mount("https://", custom)
+    client._ensure_pool_size(64)
+    assert client.session.adapters["https://"] is custom
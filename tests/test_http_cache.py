@@ -0,0 +1,75 @@
+import json
+from unittest.mock import Mock
+
+import requests
+
+from wallapop_auto_adjust.http_cache import HttpCache
+from wallapop_auto_adjust.wallapop_client import WallapopClient
+
+
+def make_response(status, body=b"", headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers.update(headers or {})
+    return response
+
+
+def test_store_and_serve_not_modified(tmp_path):
+    cache = HttpCache(tmp_path / "cache")
+    key = cache.key("https://api/items", {"since": "2"}, "acct")
+    assert key != cache.key("https://api/items", {"since": "2"}, "other")
+    assert cache.conditional_headers(key) == {}
+
+    ok = make_response(
+        200,
+        b'[{"id": "a"}]',
+        {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"},
+    )
+    assert cache.store(key, ok)
+    assert not cache.store(key, make_response(200, b"[]"))  # no validator
+
+    # A fresh instance reads the index from disk
+    cache = HttpCache(tmp_path / "cache")
+    assert cache.conditional_headers(key) == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+    served = cache.cached_response(
+        key, make_response(304, headers={"X-NextPage": "since=3"})
+    )
+    assert served.status_code == 200
+    assert served.json() == [{"id": "a"}]
+    assert served.headers["X-NextPage"] == "since=3"
+    assert served.from_cache
+
+
+def test_lru_eviction_keeps_size_under_cap(tmp_path):
+    cache = HttpCache(tmp_path / "cache", max_bytes=10)
+    for name in ("a", "b", "c"):
+        cache.store(name, make_response(200, b"x" * 4, {"ETag": name}))
+        if name == "b":
+            cache.cached_response("a")  # a becomes more recently used than b
+    assert cache.conditional_headers("b") == {}
+    assert cache.conditional_headers("a") and cache.conditional_headers("c")
+    assert not (tmp_path / "cache" / "b.body").exists()
+
+
+def test_listing_serves_304_from_cache():
+    client = WallapopClient()
+    client._ensure_session = Mock()
+    client.session = Mock()
+    client.session.cookies = {"MPID": "", "device_id": "dev"}
+    body = json.dumps([{"id": "a", "title": "Lamp", "price": 500}]).encode()
+
+    client._make_authenticated_request = Mock(
+        return_value=make_response(200, body, {"ETag": '"v1"'})
+    )
+    assert [p.id for p in client.get_user_products()] == ["a"]
+
+    client._make_authenticated_request = Mock(return_value=make_response(304))
+    products = client.get_user_products()
+    assert [p.id for p in products] == ["a"]
+    assert client.last_listing_complete
+    sent = client._make_authenticated_request.call_args.kwargs["headers"]
+    assert sent["If-None-Match"] == '"v1"'
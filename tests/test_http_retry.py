@@ -0,0 +1,103 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+
+from wallapop_auto_adjust.http_retry import (
+    RetryPolicy,
+    parse_retry_after,
+    request_with_retries,
+)
+
+
+class Resp:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def _sender(outcomes):
+    calls = []
+
+    def send(method, url, **kwargs):
+        calls.append(kwargs)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return send, calls
+
+
+def test_retries_transient_statuses_and_records_count():
+    send, calls = _sender([Resp(503), Resp(429), Resp(200)])
+    sleeps = []
+    response = request_with_retries(
+        send, "GET", "https://x", RetryPolicy(backoff_base=0.1), sleep=sleeps.append
+    )
+    assert response.status_code == 200
+    assert response.retries == 2
+    assert len(sleeps) == 2 and all(0 <= s <= 0.2 for s in sleeps)
+    # Default connect/read timeout is applied to every attempt
+    assert all(kw["timeout"] == (5.0, 30.0) for kw in calls)
+
+
+def test_honours_retry_after_and_gives_up_after_max_retries():
+    send, calls = _sender([Resp(429, {"Retry-After": "7"})] * 3)
+    sleeps = []
+    response = request_with_retries(
+        send,
+        "PUT",
+        "https://x",
+        RetryPolicy(max_retries=2),
+        sleep=sleeps.append,
+        timeout=3,
+    )
+    assert response.status_code == 429
+    assert response.retries == 2
+    assert sleeps == [7.0, 7.0]
+    assert calls[0]["timeout"] == 3
+
+
+def test_non_idempotent_methods_only_retry_429():
+    send, _ = _sender([Resp(500)])
+    response = request_with_retries(
+        send, "POST", "https://x", RetryPolicy(), sleep=lambda s: None
+    )
+    assert response.status_code == 500
+    assert response.retries == 0
+
+    send, _ = _sender([requests.ConnectionError("reset")])
+    with pytest.raises(requests.ConnectionError):
+        request_with_retries(send, "POST", "https://x", RetryPolicy())
+
+
+def test_connection_errors_are_retried_then_raised():
+    send, calls = _sender(
+        [requests.ConnectTimeout("slow"), requests.ConnectionError("reset"), Resp(200)]
+    )
+    response = request_with_retries(
+        send, "GET", "https://x", RetryPolicy(), sleep=lambda s: None
+    )
+    assert response.retries == 2
+
+    send, calls = _sender([requests.ReadTimeout("hung")] * 2)
+    with pytest.raises(requests.ReadTimeout):
+        request_with_retries(
+            send, "GET", "https://x", RetryPolicy(max_retries=1), sleep=lambda s: None
+        )
+    assert len(calls) == 2
+
+
+def test_parse_retry_after_http_date_and_env_policy(monkeypatch):
+    later = datetime.now(timezone.utc) + timedelta(seconds=120)
+    assert 100 < parse_retry_after(format_datetime(later, usegmt=True)) <= 120
+    assert parse_retry_after("garbage") is None
+    assert parse_retry_after(None) is None
+
+    monkeypatch.setenv("WALLAPOP_MAX_RETRIES", "5")
+    monkeypatch.setenv("WALLAPOP_READ_TIMEOUT", "12.5")
+    policy = RetryPolicy.from_env()
+    assert policy.max_retries == 5
+    assert policy.timeout == (5.0, 12.5)
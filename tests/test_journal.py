@@ -0,0 +1,74 @@
+from wallapop_auto_adjust import journal as journal_module
+from wallapop_auto_adjust.config import ConfigManager
+from wallapop_auto_adjust.journal import RunJournal, replay, resume_interrupted
+from wallapop_auto_adjust.price_adjuster import PriceAdjuster
+
+
+class FakeClient:
+    def __init__(self):
+        self.batches = []
+
+    def update_prices_batch(self, changes):
+        self.batches.append(dict(changes))
+        return {pid: {"success": True} for pid in changes}
+
+
+def change(pid, price):
+    return {
+        "id": pid,
+        "name": pid.upper(),
+        "current_price": price,
+        "new_price": price - 1,
+        "adjustment": 0.9,
+        "rule": None,
+        "reason": "adjustment 0.9",
+    }
+
+
+def test_fsync_is_batched(tmp_path, monkeypatch):
+    syncs = []
+    monkeypatch.setattr(journal_module.os, "fsync", syncs.append)
+    journal = RunJournal.begin(tmp_path / "j.jsonl", sync_every=3, sync_interval=60)
+    assert len(syncs) == 1  # the start record
+    for pid in "abcde":
+        journal.record_change(change(pid, 10))
+    assert len(syncs) == 2
+    journal.finish()
+    assert len(syncs) == 3
+    assert replay(tmp_path / "j.jsonl").finished
+
+
+def test_interrupted_run_resumes_only_unfinished_items(tmp_path):
+    path = tmp_path / "run_journal.jsonl"
+    journal = RunJournal.begin(path)
+    for pid, price in (("a", 10), ("b", 20), ("c", 30)):
+        journal.record_change(change(pid, price))
+    journal.record_result("a", True)
+    journal.record_result("b", False, "HTTP 500")
+    journal.close()  # killed before the run ended
+    with open(path, "a") as f:
+        f.write('{"op":"done","id":"c"')  # torn last write
+
+    state = replay(path)
+    assert not state.finished
+    assert list(state.pending) == ["c"]
+    assert state.failed == {"b": "HTTP 500"}
+
+    cfg = ConfigManager(str(tmp_path / "products_config.json"))
+    cfg.config["products"] = {
+        pid: {"name": pid.upper(), "adjustment": 0.9} for pid in "abc"
+    }
+    client = FakeClient()
+    adjuster = PriceAdjuster(client, cfg)
+
+    assert resume_interrupted(path, adjuster) == 2
+    assert client.batches == [{"c": 29}]
+    assert cfg.get_product_config("a").get("last_modified")
+    assert cfg.get_product_config("c").get("last_modified")
+    assert not cfg.get_product_config("b").get("last_modified")
+    state = replay(path)
+    assert state.finished and set(state.done) == {"a", "c"}
+
+    # Nothing left: a completed journal is not resumed again
+    assert resume_interrupted(path, adjuster) is None
+    assert len(client.batches) == 1
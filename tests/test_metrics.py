@@ -0,0 +1,88 @@
+import json
+import urllib.request
+
+import requests
+
+from wallapop_auto_adjust.http_retry import RetryPolicy
+from wallapop_auto_adjust.metrics import RequestMetrics, endpoint_label
+from wallapop_auto_adjust.session_persistence import SessionPersistenceManager
+
+
+def test_endpoint_label_groups_item_ids():
+    assert (
+        endpoint_label("https://api.wallapop.com/api/v3/items/abc123/edit?language=es")
+        == "api.wallapop.com/api/v3/items/{id}/edit"
+    )
+    assert (
+        endpoint_label("https://api.wallapop.com/api/v3/user/items")
+        == "api.wallapop.com/api/v3/user/items"
+    )
+
+
+def test_summary_and_openmetrics(tmp_path):
+    metrics = RequestMetrics()
+    url = "https://api.wallapop.com/api/v3/items/x1"
+    metrics.record("put", url, 503, 0.2)
+    metrics.record("PUT", url, 200, 0.04, retry=True)
+    metrics.record("GET", "https://api.wallapop.com/api/v3/user/items", "error", 3)
+
+    summary = metrics.summary()
+    assert summary["requests"] == 3
+    assert summary["retries"] == 1
+    put = summary["endpoints"]["PUT api.wallapop.com/api/v3/items/{id}"]
+    assert put["statuses"] == {"200": 1, "503": 1}
+    assert put["latency_seconds"]["p50"] == 0.05
+    assert put["latency_seconds"]["max"] == 0.2
+
+    text = metrics.to_openmetrics()
+    assert text.endswith("# EOF\n")
+    assert (
+        'wallapop_http_requests_total{method="PUT",'
+        'endpoint="api.wallapop.com/api/v3/items/{id}",status="503"} 1'
+    ) in text
+    assert (
+        'wallapop_http_request_duration_seconds_bucket{method="GET",'
+        'endpoint="api.wallapop.com/api/v3/user/items",le="2.5"} 0'
+    ) in text
+    assert 'le="+Inf"} 1' in text
+
+    metrics.write_summary(str(tmp_path / "run.json"))
+    assert json.loads((tmp_path / "run.json").read_text()) == summary
+
+    server = metrics.serve(0)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+            assert resp.headers["Content-Type"].startswith(
+                "application/openmetrics-text"
+            )
+            assert resp.read().decode() == metrics.to_openmetrics()
+    finally:
+        server.shutdown()
+
+
+def test_session_requests_record_each_attempt(tmp_path):
+    spm = SessionPersistenceManager(base_dir=tmp_path)
+    spm.metrics = RequestMetrics()
+    spm.retry_policy = RetryPolicy(max_retries=2, backoff_base=0)
+    outcomes = [requests.ConnectionError("reset"), 502, 200]
+
+    def request(method, url, **kwargs):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = requests.Response()
+        response.status_code = outcome
+        return response
+
+    spm.session = requests.Session()
+    spm.session.request = request
+    response = spm._http("GET", "https://api.wallapop.com/api/v3/user/items")
+
+    assert response.retries == 2
+    endpoint = spm.metrics.summary()["endpoints"][
+        "GET api.wallapop.com/api/v3/user/items"
+    ]
+    assert endpoint["requests"] == 3
+    assert endpoint["retries"] == 2
+    assert endpoint["statuses"] == {"200": 1, "502": 1, "error": 1}
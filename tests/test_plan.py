@@ -0,0 +1,123 @@
+from datetime import datetime
+from unittest.mock import Mock
+
+from wallapop_auto_adjust.config import ConfigManager
+from wallapop_auto_adjust.plan import (
+    apply_plan,
+    build_plan,
+    load_plan,
+    payload_input_hash,
+    write_plan,
+)
+from wallapop_auto_adjust.policy import PolicyEngine
+from wallapop_auto_adjust.price_adjuster import PriceAdjuster
+from wallapop_auto_adjust.product import Product
+from wallapop_auto_adjust.wallapop_client import WallapopClient
+
+
+def details(pid, price):
+    return {
+        "id": pid,
+        "title": {"original": f"Item {pid}"},
+        "description": {"original": "desc"},
+        "taxonomy": [{"id": "100"}],
+        "location": {"latitude": 40.4, "longitude": -3.7},
+        "shipping": {"user_allows_shipping": True},
+        "price": {"amount": price, "currency": "EUR"},
+    }
+
+
+def make_client(server):
+    client = WallapopClient()
+    client._ensure_session = Mock()
+    client.session = Mock()
+    client.session.cookies = {"MPID": "", "device_id": "dev"}
+    puts = []
+
+    def request(method, url, **kwargs):
+        pid = url.split("/items/")[1].split("/")[0]
+        if method == "PUT":
+            puts.append(pid)
+            server[pid]["price"]["amount"] = kwargs["json"]["price"]["cash_amount"]
+            return Mock(status_code=200, text="")
+        response = Mock(status_code=200, text="")
+        response.json.return_value = server[pid]
+        return response
+
+    client._make_authenticated_request = request
+    return client, puts
+
+
+def test_plan_then_apply_is_idempotent(tmp_path):
+    cfg = ConfigManager(str(tmp_path / "products_config.json"))
+    old = datetime(2024, 1, 1).astimezone().isoformat()
+    cfg.config["products"] = {
+        pid: {"name": pid.upper(), "adjustment": 0.9, "last_modified": old}
+        for pid in ("a", "b", "c")
+    }
+    products = [
+        Product(id=pid, name=pid.upper(), price_cents=cents)
+        for pid, cents in (("a", 1000), ("b", 2000), ("c", 3000))
+    ]
+    server = {pid: details(pid, p.price) for pid, p in zip("abc", products)}
+    client, puts = make_client(server)
+    adjuster = PriceAdjuster(client, cfg)
+
+    plan = build_plan(client, adjuster, products, PolicyEngine(), account="shop")
+    assert puts == []
+    assert [(i["id"], i["old_price"], i["new_price"]) for i in plan["items"]] == [
+        ("a", 10.0, 9.0),
+        ("b", 20.0, 18.0),
+        ("c", 30.0, 27.0),
+    ]
+    assert plan["items"][0]["input_hash"] == payload_input_hash(server["a"])
+    path = str(tmp_path / "price_plan.json")
+    write_plan(path, plan)
+    plan = load_plan(path)
+
+    # After planning, b is edited on the site and c was already repriced
+    server["b"]["title"] = {"original": "New title"}
+    server["c"]["price"]["amount"] = 27.0
+    counts = apply_plan(client, adjuster, plan)
+
+    assert puts == ["a"]
+    assert counts == {"applied": 1, "stale": 1, "already_applied": 1}
+    assert plan["items"][1]["error"] == "stale: listing edited since planning"
+    assert server["a"]["price"]["amount"] == 9.0
+    assert cfg.get_product_config("c")["last_modified"] != old
+
+    # A second run has nothing left to send
+    assert apply_plan(client, adjuster, plan) == counts
+    assert puts == ["a"]
+
+
+def test_plan_hashes_edit_details_not_listing_items(tmp_path):
+    cfg = ConfigManager(str(tmp_path / "products_config.json"))
+    server = {"a": details("a", 10.0)}
+    server["a"]["shipping"]["max_weight_kg"] = 2
+    server["a"]["type_attributes"] = {"condition": {"value": "new"}}
+    # The listing carries every required field, in a slightly different shape
+    listed = {**details("a", 10.0), "type_attributes": {"condition": {}}}
+    client, puts = make_client(server)
+    edit_request = client._make_authenticated_request
+    edits = []
+
+    def request(method, url, **kwargs):
+        if url.endswith("/api/v3/user/items"):
+            response = Mock(status_code=200, headers={}, text="")
+            response.json.return_value = [listed]
+            return response
+        if method == "GET":
+            edits.append(url)
+        return edit_request(method, url, **kwargs)
+
+    client._make_authenticated_request = request
+    products = client.get_user_products(include_raw=False)
+    cfg.config["products"] = {"a": {"name": "A", "adjustment": 0.9}}
+    adjuster = PriceAdjuster(client, cfg)
+
+    plan = build_plan(client, adjuster, products, PolicyEngine())
+    assert len(edits) == 1
+    assert plan["items"][0]["input_hash"] == payload_input_hash(server["a"])
+    assert apply_plan(client, adjuster, plan) == {"applied": 1}
+    assert puts == ["a"]
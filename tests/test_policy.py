@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from wallapop_auto_adjust.config import ConfigManager
+from wallapop_auto_adjust.policy import PolicyEngine, PriceRule
+from wallapop_auto_adjust.price_adjuster import PriceAdjuster
+
+
+def product(pid, price, name="Item", category_id=None):
+    return {
+        "id": pid,
+        "name": name,
+        "price": price,
+        "status": "available",
+        "reserved": False,
+        "flags": {},
+        "category_id": category_id,
+    }
+
+
+def test_rule_apply_multiplier_step_floor_and_ceiling():
+    rule = PriceRule.from_dict({"multiplier": 0.9, "step": -1, "floor": 20})
+    assert rule.apply(100.0) == 89.0
+    assert rule.apply(21.0) == 20.0
+    # Already below the floor: the floor never raises it, and it is not lowered
+    assert rule.apply(15.0) == 15.0
+    assert PriceRule.from_dict({"multiplier": 1.5, "ceiling": 40}).apply(30.0) == 40
+    assert PriceRule.from_dict({"step": -5}).apply(3.0) == 1.0
+    assert PriceRule.from_dict({"keep": True, "multiplier": 0.5}).apply(8.0) == 8.0
+
+
+def test_rule_validation_errors():
+    with pytest.raises(ValueError, match="unknown key"):
+        PriceRule.from_dict({"name": "x", "multipler": 0.9})
+    with pytest.raises(ValueError, match="must be a number"):
+        PriceRule.from_dict({"step": "lots"})
+    with pytest.raises(ValueError, match="floor"):
+        PriceRule.from_dict({"floor": 10, "ceiling": 5})
+
+
+def test_engine_first_matching_rule_wins(tmp_path):
+    cfg = ConfigManager(str(tmp_path / "products_config.json"))
+    cfg.config["settings"]["rules"] = [
+        {"name": "pinned", "ids": ["a"], "keep": True},
+        {"name": "bikes", "category_id": "17000", "multiplier": 0.95},
+        {"name": "lamps", "name_contains": "LAMP", "step": -2},
+    ]
+    engine = PolicyEngine.from_config(cfg)
+
+    assert engine.rule_for(product("a", 10, category_id="17000")).name == "pinned"
+    assert engine.rule_for(product("b", 10, category_id=17000)).name == "bikes"
+    assert engine.rule_for(product("c", 10, name="Desk lamp")).name == "lamps"
+    assert engine.rule_for(product("d", 10)) is None
+
+
+def test_plan_all_is_unattended(tmp_path, monkeypatch):
+    cfg = ConfigManager(str(tmp_path / "products_config.json"))
+    recent = (datetime.now().astimezone() - timedelta(days=2)).isoformat()
+    cfg.config = {
+        "products": {
+            "a": {"name": "Bike", "adjustment": "keep", "last_modified": recent},
+            "b": {"name": "Lamp", "adjustment": 0.5, "last_modified": None},
+            "c": {"name": "Chair", "adjustment": "keep", "last_modified": None},
+        },
+        "settings": {
+            "delay_days": 1,
+            "rules": [{"name": "bikes", "category_id": "1", "step": -10}],
+        },
+    }
+    monkeypatch.setattr(
+        "builtins.input", lambda *a: pytest.fail("unattended mode prompted")
+    )
+    pa = PriceAdjuster(wallapop_client=None, config_manager=cfg)
+    products = [
+        product("a", 100.0, "Bike", category_id="1"),
+        product("b", 1.5, "Lamp"),
+        product("c", 30.0, "Chair"),
+    ]
+
+    changes = pa.plan_all(products, PolicyEngine.from_config(cfg))
+    assert [(c["id"], c["new_price"]) for c in changes] == [("a", 90.0), ("b", 1.0)]
+    assert changes[0]["rule"] == "bikes"
+    assert changes[1]["reason"] == "adjustment 0.5"
+
+    # A rule's delay_days overrides the global delay
+    cfg.config["settings"]["rules"][0]["delay_days"] = 7
+    changes = pa.plan_all(products[:1], PolicyEngine.from_config(cfg))
+    assert changes == []
+
+
+def test_rule_changes_do_not_switch_adjustment_to_keep(tmp_path):
+    cfg = ConfigManager(str(tmp_path / "products_config.json"))
+    cfg.config["products"]["a"] = {"name": "A", "adjustment": 0.9}
+    pa = PriceAdjuster(wallapop_client=None, config_manager=cfg)
+    change = {
+        "id": "a",
+        "name": "A",
+        "current_price": 3.0,
+        "new_price": 1.0,
+        "adjustment": None,
+        "rule": "clearance",
+    }
+    assert pa.record_price_update(change, True)
+    assert cfg.config["products"]["a"]["adjustment"] == 0.9
@@ -1,7 +1,13 @@
 from datetime import datetime, timedelta
 
+import pytest
+
 from wallapop_auto_adjust.config import ConfigManager
-from wallapop_auto_adjust.price_adjuster import PriceAdjuster
+from wallapop_auto_adjust.price_adjuster import (
+    PriceAdjuster,
+    calculate_new_price,
+    calculate_new_prices,
+)
 
 
 def make_config(tmp_path, delay_days=1):
@@ -150,3 +156,136 @@ def test_adjust_product_price_warns_on_unknown_status(tmp_path, capsys, monkeypa
     pa.adjust_product_price(product)
     out = capsys.readouterr().out
     assert "stalled" in out
+
+
+def test_apply_price_changes_uses_batch_and_records_results(tmp_path):
+    cfg = make_config(tmp_path, delay_days=0)
+    cfg.config["products"] = {
+        "a": {"name": "A", "adjustment": 0.9, "last_modified": None},
+        "b": {"name": "B", "adjustment": 0.5, "last_modified": None},
+        "c": {"name": "C", "adjustment": 0.9, "last_modified": None},
+    }
+
+    class BatchClient:
+        def __init__(self):
+            self.batches = []
+
+        def update_prices_batch(self, changes):
+            self.batches.append(dict(changes))
+            return {
+                "a": {"success": True},
+                "b": {"success": True},
+                "c": {"success": False, "error": "HTTP 500"},
+            }
+
+    client = BatchClient()
+    pa = PriceAdjuster(wallapop_client=client, config_manager=cfg)
+    changes = [
+        {
+            "id": "a",
+            "name": "A",
+            "current_price": 10.0,
+            "new_price": 9.0,
+            "adjustment": 0.9,
+        },
+        {
+            "id": "b",
+            "name": "B",
+            "current_price": 1.5,
+            "new_price": 1.0,
+            "adjustment": 0.5,
+        },
+        {
+            "id": "c",
+            "name": "C",
+            "current_price": 10.0,
+            "new_price": 9.0,
+            "adjustment": 0.9,
+        },
+    ]
+
+    assert pa.apply_price_changes(changes) == 2
+    assert client.batches == [{"a": 9.0, "b": 1.0, "c": 9.0}]
+    assert cfg.config["products"]["a"]["last_modified"] is not None
+    # Minimum reached switches the strategy to keep
+    assert cfg.config["products"]["b"]["adjustment"] == "keep"
+    assert cfg.config["products"]["c"]["last_modified"] is None
+
+
+def _scalar_reference(prices, adjustments):
+    return [calculate_new_price(p, a) for p, a in zip(prices, adjustments)]
+
+
+def test_calculate_new_prices_matches_scalar_cases(tmp_path):
+    pa = PriceAdjuster(wallapop_client=None, config_manager=make_config(tmp_path))
+    prices = [10.0, 10.0, 10.01, 1.2, 7.35]
+    adjustments = ["keep", 1.1, 1.005, 0.5, "0.9"]
+
+    assert pa.calculate_new_prices(prices, adjustments) == [
+        10.0,
+        11.0,
+        10.06,
+        1.0,
+        6.62,
+    ]
+    assert pa.calculate_new_prices(prices, adjustments) == _scalar_reference(
+        prices, adjustments
+    )
+
+
+def test_calculate_new_prices_matches_scalar_exactly_with_fallback(monkeypatch):
+    import random
+
+    from wallapop_auto_adjust import price_adjuster
+
+    rng = random.Random(1234)
+    prices = [round(rng.uniform(0.5, 2000), 2) for _ in range(5000)]
+    adjustments = [
+        "keep" if i % 7 == 0 else rng.choice([0.85, 0.9, 0.95, 1.005, 1.05, 1.1])
+        for i in range(len(prices))
+    ]
+    # Exact ties at the cent boundary exercise the rounding fix-up
+    prices += [10.01, 2.675, 0.125, 1.005]
+    adjustments += [1.005, 1.0, 8.0, 1.0]
+    expected = _scalar_reference(prices, adjustments)
+
+    assert calculate_new_prices(prices, adjustments) == expected
+    monkeypatch.setattr(price_adjuster, "np", None)
+    assert calculate_new_prices(prices, adjustments) == expected
+
+
+def test_calculate_new_prices_returns_array_for_array_input():
+    np = pytest.importorskip("numpy")
+    result = calculate_new_prices(np.array([10.0, 0.5]), [0.9, "keep"])
+    assert isinstance(result, np.ndarray)
+    assert result.tolist() == [9.0, 0.5]
+
+
+def test_plan_all_prefilters_with_due_index(tmp_path, monkeypatch):
+    from wallapop_auto_adjust.policy import PolicyEngine, PriceRule
+
+    cfg = make_config(tmp_path, delay_days=3)
+    recent = datetime.now().astimezone().isoformat()
+    old = (datetime.now().astimezone() - timedelta(days=5)).isoformat()
+    cfg.config["products"] = {
+        "a": {"name": "A", "adjustment": 0.9, "last_modified": recent},
+        "b": {"name": "B", "adjustment": 0.9, "last_modified": old},
+        "c": {"name": "C", "adjustment": 0.9, "last_modified": recent},
+    }
+    products = [
+        {"id": pid, "name": pid.upper(), "price": 10.0} for pid in ("a", "b", "c")
+    ]
+    policy = PolicyEngine(
+        [PriceRule.from_dict({"ids": ["c"], "multiplier": 0.5, "delay_days": 0}, 0)]
+    )
+    pa = PriceAdjuster(wallapop_client=None, config_manager=cfg)
+    checked = []
+    is_due = cfg.is_due
+    monkeypatch.setattr(
+        cfg, "is_due", lambda pid, **kw: checked.append(pid) or is_due(pid, **kw)
+    )
+
+    changes = pa.plan_all(products, policy)
+
+    assert [c["id"] for c in changes] == ["b", "c"]
+    assert checked == ["b", "c"]  # "a" was dropped by the due-index query
@@ -119,3 +119,48 @@ def test_delivery_block_removed_when_empty(client):
     payload = call_kwargs["json"]
 
     assert "delivery" not in payload
+
+
+def test_update_prices_batch_reports_each_item(client):
+    """Batch updates fetch details and PUT every item, reporting per-item results."""
+
+    details = {
+        "title": "Product",
+        "description": "Desc",
+        "taxonomy": [{"id": "7"}],
+        "type_attributes": {},
+        "shipping": {},
+        "location": {},
+    }
+    client.session_manager = Mock()
+    client.get_product_details = Mock(
+        side_effect=lambda pid: {} if pid == "missing" else details
+    )
+
+    def fake_request(method, url, **kwargs):
+        if url.endswith("/broken"):
+            return Mock(status_code=500, text="boom")
+        return Mock(status_code=200, text="")
+
+    client._make_authenticated_request = Mock(side_effect=fake_request)
+
+    report = client.update_prices_batch(
+        {"ok-1": 10.0, "ok-2": 20.5, "broken": 3.0, "missing": 4.0}, max_workers=3
+    )
+
+    assert set(report) == {"ok-1", "ok-2", "broken", "missing"}
+    assert report["ok-1"]["success"] is True
+    assert report["ok-2"]["price"] == 20.5
+    assert report["broken"]["success"] is False
+    assert report["broken"]["status_code"] == 500
+    assert report["missing"]["success"] is False
+    assert "details" in report["missing"]["error"]
+    # Only items with details reach the PUT stage
+    put_urls = sorted(c.args[1] for c in client._make_authenticated_request.mock_calls)
+    assert [u.rsplit("/", 1)[-1] for u in put_urls] == ["broken", "ok-1", "ok-2"]
+    client.session_manager.get_valid_token.assert_called_once()
+
+
+def test_update_prices_batch_empty_is_noop(client):
+    assert client.update_prices_batch({}) == {}
+    client._make_authenticated_request.assert_not_called()
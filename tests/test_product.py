@@ -0,0 +1,68 @@
+import sys
+
+from wallapop_auto_adjust.product import FLAG_BITS, Product, ProductStatus
+
+PAYLOAD = {
+    "id": "p1",
+    "title": "Bicycle",
+    "price": {"amount": 120.5, "currency": "EUR"},
+    "modified_date": 1_700_000_000_000,
+    "reserved": {"flag": True},
+    "bumped": {"flag": True},
+    "mystery": {"flag": True},
+    "quiet": {"flag": False},
+}
+
+
+def test_from_payload_compacts_fields():
+    product = Product.from_payload(PAYLOAD)
+
+    assert product.id == "p1"
+    assert product.price_cents == 12050
+    assert product.price == 120.5
+    assert product.last_modified == 1_700_000_000.0
+    assert product.status is ProductStatus.RESERVED
+    assert product.flag_bits == FLAG_BITS["reserved"] | FLAG_BITS["bumped"]
+    assert product.extra_flags == ("mystery",)
+    assert product.raw == PAYLOAD
+
+
+def test_dict_api_matches_legacy_normalized_shape():
+    product = Product.from_payload(PAYLOAD)
+
+    assert product["price"] == 120.5
+    assert product["status"] == "reserved"
+    assert product.get("status").lower() == "reserved"
+    assert product["reserved"] is True
+    assert product["flags"] == {
+        "reserved": True,
+        "sold": False,
+        "pending": False,
+        "blocked": False,
+        "on_hold": False,
+        "bumped": True,
+        "mystery": True,
+    }
+    assert product["_raw"]["title"] == "Bicycle"
+    assert product.get("missing", "default") == "default"
+    assert "name" in product and "missing" not in product
+
+
+def test_raw_can_be_dropped_and_cents_payload_supported():
+    product = Product.from_payload(
+        {"item_id": "p2", "name": "Helmet", "price": 1599, "onhold": True},
+        include_raw=False,
+    )
+
+    assert product.id == "p2"
+    assert product.price == 15.99
+    assert product.has_flag("on_hold") is True
+    assert product.status is ProductStatus.AVAILABLE
+    assert "_raw" not in product and product.raw is None
+    assert product.to_dict()["name"] == "Helmet"
+
+
+def test_product_is_slotted():
+    product = Product.from_payload(PAYLOAD, include_raw=False)
+    assert not hasattr(product, "__dict__")
+    assert sys.getsizeof(product) < sys.getsizeof(product.to_dict())
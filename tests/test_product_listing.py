@@ -0,0 +1,94 @@
+from unittest.mock import Mock
+
+import pytest
+
+from wallapop_auto_adjust.wallapop_client import WallapopClient, next_page_params
+
+
+def make_response(items, headers=None, body=None):
+    response = Mock()
+    response.status_code = 200
+    response.headers = headers or {}
+    response.json.return_value = body if body is not None else items
+    response.text = ""
+    return response
+
+
+@pytest.fixture()
+def client():
+    client = WallapopClient()
+    client._ensure_session = Mock()
+    client.session = Mock()
+    client.session.cookies = {"MPID": "", "device_id": "dev"}
+    return client
+
+
+def item(pid, cents=1000):
+    return {"id": pid, "title": f"Item {pid}", "price": cents, "modified_date": 1}
+
+
+def test_iter_user_products_follows_next_page_header(client):
+    pages = [
+        make_response([item("a"), item("b")], headers={"X-NextPage": "since=2"}),
+        make_response([item("c")], headers={"X-NextPage": "since=3"}),
+        make_response([]),
+    ]
+    client._make_authenticated_request = Mock(side_effect=pages)
+
+    products = list(client.iter_user_products())
+
+    assert [p["id"] for p in products] == ["a", "b", "c"]
+    assert client.last_listing_complete is True
+    calls = client._make_authenticated_request.call_args_list
+    assert "params" not in calls[0].kwargs
+    assert calls[1].kwargs["params"] == {"since": "2"}
+    assert calls[2].kwargs["params"] == {"since": "3"}
+
+
+def test_iter_user_products_body_cursor_and_raw_opt_out(client):
+    pages = [
+        make_response(None, body={"data": [item("a")], "meta": {"next": "cur-2"}}),
+        make_response(None, body={"data": [item("b")]}),
+    ]
+    client._make_authenticated_request = Mock(side_effect=pages)
+
+    products = list(client.iter_user_products(include_raw=False))
+
+    assert [p["id"] for p in products] == ["a", "b"]
+    assert all("_raw" not in p for p in products)
+    second = client._make_authenticated_request.call_args_list[1]
+    assert second.kwargs["params"] == {"since": "cur-2"}
+
+
+def test_iter_user_products_failed_page_marks_listing_incomplete(client, capsys):
+    failed = Mock(status_code=500, text="oops")
+    client._make_authenticated_request = Mock(
+        side_effect=[
+            make_response([item("a")], headers={"X-NextPage": "since=1"}),
+            failed,
+        ]
+    )
+
+    products = client.get_user_products()
+
+    assert [p["id"] for p in products] == ["a"]
+    assert client.last_listing_complete is False
+    assert "Failed to fetch products: 500" in capsys.readouterr().out
+
+
+def test_iter_user_products_stops_on_repeated_cursor(client):
+    page = make_response([item("a")], headers={"X-NextPage": "since=1"})
+    client._make_authenticated_request = Mock(return_value=page)
+
+    products = list(client.iter_user_products())
+
+    # First page, then the repeated cursor page, then stop
+    assert len(products) == 2
+    assert client._make_authenticated_request.call_count == 2
+
+
+def test_next_page_params_accepts_full_url():
+    response = Mock(headers={})
+    body = {"next_page": "https://api.wallapop.com/api/v3/user/items?since=9&limit=40"}
+    assert next_page_params(response, body) == {"since": "9", "limit": "40"}
+    assert next_page_params(response, [item("x")]) is None
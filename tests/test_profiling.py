@@ -0,0 +1,41 @@
+import json
+import pstats
+
+from wallapop_auto_adjust.metrics import RequestMetrics
+from wallapop_auto_adjust.profiling import PhaseProfiler
+
+
+def test_phases_record_time_requests_memory_and_pstats(tmp_path, capsys):
+    metrics = RequestMetrics()
+    profiler = PhaseProfiler(
+        output_dir=str(tmp_path / "prof"), trace_memory=True, metrics=metrics
+    )
+    profiler.begin("login")
+    metrics.record("POST", "https://api.wallapop.com/api/v3/access/refresh", 200, 0.1)
+    profiler.begin("fetch_products")
+    blob = [bytearray(1024) for _ in range(1024)]
+    for _ in range(2):
+        metrics.record("GET", "https://api.wallapop.com/api/v3/user/items", 200, 0.1)
+    del blob
+    report = profiler.finish()
+
+    login, fetch = report["phases"]
+    assert (login["name"], login["requests"]) == ("login", 1)
+    assert (fetch["name"], fetch["requests"]) == ("fetch_products", 2)
+    assert fetch["peak_memory_bytes"] >= 1024 * 1024
+    assert fetch["peak_memory_bytes"] > login["peak_memory_bytes"]
+    assert report["total"]["requests"] == 3
+    assert fetch["wall_seconds"] >= 0 and fetch["cpu_seconds"] >= 0
+
+    saved = json.loads((tmp_path / "prof" / "phases.json").read_text())
+    assert saved == report
+    assert pstats.Stats(fetch["pstats_file"]).total_calls > 0
+    assert "fetch_products" in capsys.readouterr().out
+
+
+def test_disabled_profiler_is_a_no_op():
+    profiler = PhaseProfiler(enabled=False)
+    profiler.begin("login")
+    profiler.end()
+    assert profiler.finish() is None
+    assert profiler.phases == []
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+from wallapop_auto_adjust.rate_limit import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_burst_then_paces_callers():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=clock)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # Queued callers are spaced 1/rate apart
+    assert bucket.reserve() == 0.5
+    assert bucket.reserve() == 1.0
+
+    clock.now += 10
+    assert bucket.reserve() == 0
+
+
+def test_throttle_halves_rate_honours_retry_after_and_recovers():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=4.0, capacity=4, clock=clock)
+    bucket.throttle(retry_after=3)
+    assert bucket.rate == 2.0
+    assert bucket.reserve() == 3 + 0.5
+
+    for _ in range(100):
+        bucket.recover()
+    assert bucket.rate == 4.0
+
+    for _ in range(10):
+        bucket.throttle()
+    assert bucket.rate == bucket.min_rate == 0.25
+
+
+def test_limiter_uses_separate_read_and_write_budgets():
+    limiter = RateLimiter(read_rate=10, write_rate=1, read_burst=1, write_burst=1)
+    assert limiter.bucket_for("get") is limiter.read
+    assert limiter.bucket_for("PUT") is limiter.write
+    assert limiter.reserve("PUT") == 0
+    # Write budget exhausted does not delay reads
+    assert limiter.reserve("GET") == 0
+    assert limiter.reserve("PUT") > 0.9
+
+    limiter.observe("PUT", SimpleNamespace(status_code=429, headers={}))
+    assert limiter.write.rate == 0.5
+    assert limiter.read.rate == 10
+
+    disabled = RateLimiter(read_rate=0, write_rate=0)
+    assert disabled.reserve("GET") == 0 and disabled.reserve("PUT") == 0
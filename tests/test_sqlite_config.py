@@ -0,0 +1,164 @@
+import json
+
+from wallapop_auto_adjust.config import ConfigManager, create_config_manager
+from wallapop_auto_adjust.sqlite_config import SQLiteConfigManager
+
+
+def _products():
+    return [
+        {"id": "a", "name": "Lamp", "last_modified": 1700000000000},
+        {"id": "b", "name": "Chair", "last_modified": None},
+    ]
+
+
+def test_factory_picks_backend_by_suffix(tmp_path, monkeypatch):
+    assert isinstance(
+        create_config_manager(str(tmp_path / "state.db")), SQLiteConfigManager
+    )
+    assert isinstance(create_config_manager(str(tmp_path / "c.json")), ConfigManager)
+    monkeypatch.setenv("WALLAPOP_CONFIG_PATH", str(tmp_path / "env.sqlite"))
+    assert isinstance(create_config_manager(), SQLiteConfigManager)
+
+
+def test_sqlite_store_matches_json_store(tmp_path):
+    json_cfg = ConfigManager(str(tmp_path / "products_config.json"))
+    db_cfg = SQLiteConfigManager(str(tmp_path / "products.db"))
+    for cfg in (json_cfg, db_cfg):
+        cfg.update_products(_products())
+        cfg.set_adjustment("a", "0.9")
+        cfg.update_products([{"id": "a", "name": "Desk lamp"}])
+        cfg.update_last_modified("b", "2024-01-01T00:00:00+00:00")
+        removed = cfg.remove_sold_products([{"id": "b"}])
+        assert removed == ["Desk lamp (a)"]
+        cfg.save_config()
+
+    assert db_cfg.config == json_cfg.config
+    assert db_cfg.get_product_config("b") == json_cfg.get_product_config("b")
+    assert db_cfg.get_product_config("missing") == {}
+    assert db_cfg.get_delay_days() == 1
+
+
+def test_sqlite_store_persists_across_instances(tmp_path):
+    path = str(tmp_path / "products.db")
+    cfg = SQLiteConfigManager(path)
+    cfg.update_products(_products())
+    cfg.set_adjustment("b", "1.1")
+    cfg.set_setting("delay_days", 3)
+    cfg.close()
+
+    reopened = SQLiteConfigManager(path)
+    assert reopened.get_product_config("b")["adjustment"] == "1.1"
+    assert reopened.get_delay_days() == 3
+
+
+def test_sqlite_write_behind_commits_on_flush(tmp_path):
+    path = str(tmp_path / "products.db")
+    cfg = SQLiteConfigManager(path, write_behind=True, flush_interval=3600)
+    cfg.update_products(_products())
+    cfg.save_config()
+    assert cfg.dirty
+    assert SQLiteConfigManager(path).get_product_config("a") == {}
+
+    cfg.flush()
+    assert not cfg.dirty
+    assert SQLiteConfigManager(path).get_product_config("a")["name"] == "Lamp"
+
+
+def test_json_import_export_roundtrip(tmp_path):
+    source = tmp_path / "products_config.json"
+    data = {
+        "products": {
+            "a": {
+                "name": "Lamp",
+                "adjustment": 0.95,
+                "last_modified": "2024-05-01T10:00:00+00:00",
+                "note": "kept as extra",
+            },
+            "b": {"name": "Chair", "adjustment": "keep", "last_modified": None},
+        },
+        "settings": {"delay_days": 2},
+    }
+    source.write_text(json.dumps(data))
+
+    cfg = SQLiteConfigManager(str(tmp_path / "products.db"))
+    assert cfg.import_json(str(source)) == 2
+    assert cfg.products_modified_before(1714557600 + 1) == ["b", "a"]
+    assert cfg.products_modified_before(1714557600) == ["b"]
+
+    target = tmp_path / "exported.json"
+    cfg.export_json(str(target))
+    assert json.loads(target.read_text()) == data
+
+
+def test_due_queries_match_json_store(tmp_path):
+    now = 1_750_000_000.0
+    json_cfg = ConfigManager(str(tmp_path / "products_config.json"))
+    db_cfg = SQLiteConfigManager(str(tmp_path / "products.db"))
+    for cfg in (json_cfg, db_cfg):
+        cfg.update_products(
+            [
+                {"id": "a", "name": "A", "last_modified": (now - 5 * 86400) * 1000},
+                {"id": "b", "name": "B", "last_modified": now - 86400},
+                {"id": "c", "name": "C", "last_modified": None},
+            ]
+        )
+
+    for delay in (0, 1, 2, 10):
+        assert db_cfg.due_product_ids(now=now, delay_days=delay) == (
+            json_cfg.due_product_ids(now=now, delay_days=delay)
+        )
+        for pid in ("a", "b", "c", "missing"):
+            assert db_cfg.is_due(pid, now=now, delay_days=delay) == json_cfg.is_due(
+                pid, now=now, delay_days=delay
+            )
+
+
+def test_new_database_imports_existing_json_config(tmp_path):
+    json_cfg = ConfigManager(str(tmp_path / "products_config.json"))
+    json_cfg.update_products(_products())
+    json_cfg.set_adjustment("a", 0.9)
+    json_cfg.update_last_modified("b", "2024-01-01T00:00:00+00:00")
+    json_cfg.config["settings"]["delay_days"] = 4
+    json_cfg.save_config()
+
+    db_cfg = create_config_manager(str(tmp_path / "products.db"))
+    assert db_cfg.get_product_config("a")["adjustment"] == 0.9
+    assert db_cfg.get_product_config("b")["last_modified"].startswith("2024-01-01")
+    assert db_cfg.get_delay_days() == 4
+    db_cfg.set_adjustment("a", "keep")
+    db_cfg.close()
+
+    # An existing database is not overwritten by the JSON file again
+    reopened = create_config_manager(str(tmp_path / "products.db"))
+    assert reopened.get_product_config("a")["adjustment"] == "keep"
+
+
+def test_import_parses_numeric_last_modified_like_json_store(tmp_path):
+    now = 1_750_000_000.0
+    source = tmp_path / "products_config.json"
+    source.write_text(
+        json.dumps(
+            {
+                "products": {
+                    "ms": {"name": "A", "last_modified": (now - 5 * 86400) * 1000},
+                    "s": {"name": "B", "last_modified": now - 86400},
+                    "never": {"name": "C", "last_modified": None},
+                },
+                "settings": {},
+            }
+        )
+    )
+    json_cfg = ConfigManager(str(source))
+    db_cfg = SQLiteConfigManager(str(tmp_path / "products.db"))
+    db_cfg.import_json(str(source))
+
+    assert db_cfg.last_modified_timestamp("s") == now - 86400
+    for delay in (1, 2, 10):
+        assert db_cfg.due_product_ids(now=now, delay_days=delay) == (
+            json_cfg.due_product_ids(now=now, delay_days=delay)
+        )
+    # Stored as ISO text, so a re-saved entry parses to the same time
+    entry = db_cfg.get_product_config("s")
+    assert isinstance(entry["last_modified"], str)
+    db_cfg.update_last_modified("s", entry["last_modified"])
+    assert db_cfg.last_modified_timestamp("s") == now - 86400